@@ -0,0 +1,25 @@
+-- Composite indexes for the FIFO/FEFO allocation path and sales history.
+-- Matches the Index() declarations on the Batch, BatchPallet, Sales and
+-- Staging models. Run once against databases created before they existed:
+--   mysql np < DB/migrations/001_allocation_indexes.sql
+
+ALTER TABLE `batch`
+  ADD INDEX `ix_batch_product_expiry` (`product_id`, `expiry_date`),
+  ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE `batch_pallet`
+  ADD INDEX `ix_batch_pallet_batch_stock` (`batch_id`, `quantity_left`, `stored_on`, `pallet_id`),
+  ADD INDEX `ix_batch_pallet_pallet_batch` (`pallet_id`, `batch_id`),
+  ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE `sales`
+  ADD INDEX `ix_sales_product_time` (`product_id`, `sale_timestamp`),
+  ADD INDEX `ix_sales_consumer_time` (`consumer_id`, `sale_timestamp`),
+  ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE `staging`
+  ADD INDEX `ix_staging_product_received` (`product_id`, `received_on`),
+  ALGORITHM=INPLACE, LOCK=NONE;
+
+-- The allocation plans are checked by tests/test_allocation_plans.py
+-- (FIFO moved to ix_batch_pallet_product_fifo in 012_batch_pallet_product.sql).
@@ -0,0 +1,19 @@
+-- Maintained per-product stock counter (ProductStock model).
+-- Creates the table and backfills it from batch_pallet. Afterwards
+-- POST /sales/stock/reconcile reports and repairs any drift.
+
+CREATE TABLE IF NOT EXISTS `product_stock` (
+  `product_id` int NOT NULL,
+  `quantity` int NOT NULL DEFAULT 0,
+  `updated_at` datetime DEFAULT (now()),
+  PRIMARY KEY (`product_id`),
+  CONSTRAINT `product_stock_ibfk_1` FOREIGN KEY (`product_id`) REFERENCES `product` (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+INSERT INTO `product_stock` (`product_id`, `quantity`)
+SELECT b.`product_id`, COALESCE(SUM(bp.`quantity_left`), 0)
+  FROM `batch_pallet` bp
+  JOIN `batch` b ON b.`id` = bp.`batch_id`
+ WHERE b.`product_id` IS NOT NULL
+ GROUP BY b.`product_id`
+ON DUPLICATE KEY UPDATE `quantity` = VALUES(`quantity`);
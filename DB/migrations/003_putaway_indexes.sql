@@ -0,0 +1,18 @@
+-- Indexes for the putaway planner (POST /batch-pallet/putaway).
+-- Free capacity per pallet is one grouped query over a warehouse's pallets;
+-- both sides are answered from these indexes without reading rows.
+--   mysql np < DB/migrations/003_putaway_indexes.sql
+
+ALTER TABLE `pallet`
+  ADD INDEX `ix_pallet_warehouse_capacity` (`warehouse_id`, `capacity`),
+  ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE `batch_pallet`
+  ADD INDEX `ix_batch_pallet_pallet_stock` (`pallet_id`, `quantity_left`),
+  ALGORITHM=INPLACE, LOCK=NONE;
+
+-- EXPLAIN SELECT p.id, p.capacity, COALESCE(SUM(bp.quantity_left), 0) AS stored
+--   FROM pallet p LEFT JOIN batch_pallet bp ON bp.pallet_id = p.id
+--   WHERE p.warehouse_id = 1 AND p.capacity IS NOT NULL
+--   GROUP BY p.id, p.capacity
+--   HAVING p.capacity - stored >= 1;
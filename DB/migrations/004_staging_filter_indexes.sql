@@ -0,0 +1,16 @@
+-- Composite indexes for GET /staging/filter over large receiving histories.
+-- Matches the Index() declarations on the Staging model.
+--   mysql np < DB/migrations/004_staging_filter_indexes.sql
+--
+-- invoice_no and (product_id, received_on) are already indexed; these cover
+-- warehouse/QC status filters with a received_on range, and the count-only
+-- mode is answered from the index alone.
+
+ALTER TABLE `staging`
+  ADD INDEX `ix_staging_warehouse_status_received` (`warehouse_id`, `qc_status`, `received_on`),
+  ADD INDEX `ix_staging_status_received` (`qc_status`, `received_on`),
+  ALGORITHM=INPLACE, LOCK=NONE;
+
+-- EXPLAIN SELECT COUNT(id) FROM staging
+--   WHERE warehouse_id = 1 AND qc_status = 'HOLD'
+--     AND received_on BETWEEN '2025-01-01' AND '2025-03-31';
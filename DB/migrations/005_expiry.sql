@@ -0,0 +1,24 @@
+-- Expiry-window queries (GET /batches/expiring) and the precomputed
+-- near-expiry buckets (ExpiryBucket model, GET /batches/expiring/buckets).
+--   mysql np < DB/migrations/005_expiry.sql
+-- The background job fills expiry_bucket on its first run; POST
+-- /batches/expiring/buckets/refresh fills it immediately.
+
+ALTER TABLE `batch`
+  ADD INDEX `ix_batch_expiry` (`expiry_date`),
+  ALGORITHM=INPLACE, LOCK=NONE;
+
+CREATE TABLE IF NOT EXISTS `expiry_bucket` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `warehouse_id` int DEFAULT NULL,
+  `product_id` int NOT NULL,
+  `bucket` varchar(20) NOT NULL,
+  `quantity` int NOT NULL DEFAULT 0,
+  `batch_count` int NOT NULL DEFAULT 0,
+  `computed_at` datetime DEFAULT (now()),
+  PRIMARY KEY (`id`),
+  KEY `ix_expiry_bucket_id` (`id`),
+  KEY `ix_expiry_bucket_warehouse_product` (`warehouse_id`, `product_id`, `bucket`),
+  CONSTRAINT `expiry_bucket_ibfk_1` FOREIGN KEY (`warehouse_id`) REFERENCES `warehouse` (`id`),
+  CONSTRAINT `expiry_bucket_ibfk_2` FOREIGN KEY (`product_id`) REFERENCES `product` (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,42 @@
+-- Daily sales rollups (SalesDaily, SalesDailyWarehouse models) read by
+-- /sales/analytics. create_bulk_sale and PUT /sales/{id} keep them current;
+-- this creates the tables and backfills them from existing sales.
+--   mysql np < DB/migrations/006_sales_rollups.sql
+-- Run the backfill before deploying the code that writes the rollups, or
+-- sales made in between are counted twice.
+
+CREATE TABLE IF NOT EXISTS `sales_daily` (
+  `day` date NOT NULL,
+  `product_id` int NOT NULL,
+  `consumer_id` int NOT NULL,
+  `units` int NOT NULL DEFAULT 0,
+  `revenue` float NOT NULL DEFAULT 0,
+  `lines` int NOT NULL DEFAULT 0,
+  PRIMARY KEY (`day`, `product_id`, `consumer_id`),
+  CONSTRAINT `sales_daily_ibfk_1` FOREIGN KEY (`product_id`) REFERENCES `product` (`id`),
+  CONSTRAINT `sales_daily_ibfk_2` FOREIGN KEY (`consumer_id`) REFERENCES `consumer` (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS `sales_daily_warehouse` (
+  `day` date NOT NULL,
+  `warehouse_id` int NOT NULL,
+  `units` int NOT NULL DEFAULT 0,
+  `revenue` float NOT NULL DEFAULT 0,
+  `lines` int NOT NULL DEFAULT 0,
+  PRIMARY KEY (`day`, `warehouse_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+INSERT INTO `sales_daily` (`day`, `product_id`, `consumer_id`, `units`, `revenue`, `lines`)
+SELECT DATE(s.`sale_timestamp`), s.`product_id`, s.`consumer_id`,
+       SUM(s.`quantity_sold`), SUM(s.`quantity_sold` * COALESCE(s.`sale_price`, 0)), COUNT(*)
+  FROM `sales` s
+ GROUP BY DATE(s.`sale_timestamp`), s.`product_id`, s.`consumer_id`
+ON DUPLICATE KEY UPDATE `units` = VALUES(`units`), `revenue` = VALUES(`revenue`), `lines` = VALUES(`lines`);
+
+INSERT INTO `sales_daily_warehouse` (`day`, `warehouse_id`, `units`, `revenue`, `lines`)
+SELECT DATE(s.`sale_timestamp`), COALESCE(p.`warehouse_id`, 0),
+       SUM(s.`quantity_sold`), SUM(s.`quantity_sold` * COALESCE(s.`sale_price`, 0)), COUNT(*)
+  FROM `sales` s
+  LEFT JOIN `pallet` p ON p.`id` = s.`pallet_id`
+ GROUP BY DATE(s.`sale_timestamp`), COALESCE(p.`warehouse_id`, 0)
+ON DUPLICATE KEY UPDATE `units` = VALUES(`units`), `revenue` = VALUES(`revenue`), `lines` = VALUES(`lines`);
@@ -0,0 +1,7 @@
+-- Index for incremental exports (GET /exports/sales?since=..., python -m app.export).
+-- after_id watermarks use the primary key and need nothing extra.
+--   mysql np < DB/migrations/007_export_indexes.sql
+
+ALTER TABLE `sales`
+  ADD INDEX `ix_sales_time` (`sale_timestamp`),
+  ALGORITHM=INPLACE, LOCK=NONE;
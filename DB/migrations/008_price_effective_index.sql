@@ -0,0 +1,7 @@
+-- Effective-dated price lookup (GET /prices/current, default sale prices):
+-- latest effective_from per product is read from this index.
+--   mysql np < DB/migrations/008_price_effective_index.sql
+
+ALTER TABLE `price`
+  ADD INDEX `ix_price_product_effective` (`product_id`, `effective_from`),
+  ALGORITHM=INPLACE, LOCK=NONE;
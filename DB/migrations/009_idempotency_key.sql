@@ -0,0 +1,14 @@
+-- Stored results for Idempotency-Key on POST /sales/bulk (IdempotencyKey model).
+-- Rows older than IDEMPOTENCY_KEY_TTL_HOURS are purged by a background job.
+--   mysql np < DB/migrations/009_idempotency_key.sql
+
+CREATE TABLE IF NOT EXISTS `idempotency_key` (
+  `user_id` int NOT NULL,
+  `key` varchar(255) NOT NULL,
+  `request_hash` varchar(64) NOT NULL,
+  `status_code` int DEFAULT NULL,
+  `response_body` mediumtext,
+  `created_at` datetime DEFAULT (now()),
+  PRIMARY KEY (`user_id`, `key`),
+  KEY `ix_idempotency_key_created` (`created_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,19 @@
+-- Transactional outbox of stock movements (OutboxEvent model), read by
+-- GET /events?after= and relayed by the background publisher.
+--   mysql np < DB/migrations/010_outbox.sql
+
+CREATE TABLE IF NOT EXISTS `outbox_event` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `event_type` varchar(30) NOT NULL,
+  `product_id` int DEFAULT NULL,
+  `batch_id` int DEFAULT NULL,
+  `pallet_id` int DEFAULT NULL,
+  `warehouse_id` int DEFAULT NULL,
+  `quantity` int NOT NULL DEFAULT 0,
+  `ref_id` int DEFAULT NULL,
+  `created_at` datetime NOT NULL,
+  `published_at` datetime DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  KEY `ix_outbox_event_id` (`id`),
+  KEY `ix_outbox_event_unpublished` (`published_at`, `id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,59 @@
+-- Append-only stock ledger (StockMovement) with compacted snapshots
+-- (StockSnapshot, StockSnapshotLine), read by GET /ledger/stock?at=.
+--   mysql np < DB/migrations/011_stock_ledger.sql
+
+CREATE TABLE IF NOT EXISTS `stock_movement` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `movement_type` varchar(20) NOT NULL,
+  `product_id` int DEFAULT NULL,
+  `batch_id` int DEFAULT NULL,
+  `pallet_id` int DEFAULT NULL,
+  `quantity` int NOT NULL,
+  `ref_id` int DEFAULT NULL,
+  `occurred_at` datetime NOT NULL,
+  PRIMARY KEY (`id`),
+  KEY `ix_stock_movement_id` (`id`),
+  KEY `ix_stock_movement_time` (`occurred_at`),
+  KEY `ix_stock_movement_product_time` (`product_id`, `occurred_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS `stock_snapshot` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `cutoff` datetime NOT NULL,
+  `taken_at` datetime NOT NULL,
+  `lines` int NOT NULL DEFAULT 0,
+  PRIMARY KEY (`id`),
+  KEY `ix_stock_snapshot_id` (`id`),
+  KEY `ix_stock_snapshot_cutoff` (`cutoff`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS `stock_snapshot_line` (
+  `snapshot_id` int NOT NULL,
+  `product_id` int NOT NULL,
+  `pallet_id` int NOT NULL,
+  `quantity` int NOT NULL,
+  PRIMARY KEY (`snapshot_id`, `product_id`, `pallet_id`),
+  CONSTRAINT `stock_snapshot_line_ibfk_1` FOREIGN KEY (`snapshot_id`) REFERENCES `stock_snapshot` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- Baseline: current pallet stock, so history before the ledger existed is
+-- not lost. Skipped when a snapshot already exists.
+INSERT INTO `stock_snapshot` (`cutoff`, `taken_at`, `lines`)
+SELECT UTC_TIMESTAMP(), UTC_TIMESTAMP(), 0
+FROM DUAL
+WHERE NOT EXISTS (SELECT 1 FROM `stock_snapshot`);
+
+INSERT INTO `stock_snapshot_line` (`snapshot_id`, `product_id`, `pallet_id`, `quantity`)
+SELECT s.`id`, b.`product_id`, bp.`pallet_id`, SUM(bp.`quantity_left`)
+FROM `stock_snapshot` s
+JOIN `batch_pallet` bp
+JOIN `batch` b ON b.`id` = bp.`batch_id`
+WHERE s.`id` = (SELECT MIN(`id`) FROM `stock_snapshot`)
+  AND s.`lines` = 0
+  AND NOT EXISTS (SELECT 1 FROM `stock_snapshot_line` l WHERE l.`snapshot_id` = s.`id`)
+GROUP BY s.`id`, b.`product_id`, bp.`pallet_id`
+HAVING SUM(bp.`quantity_left`) <> 0;
+
+UPDATE `stock_snapshot` s
+SET s.`lines` = (SELECT COUNT(*) FROM `stock_snapshot_line` l WHERE l.`snapshot_id` = s.`id`)
+WHERE s.`lines` = 0;
@@ -0,0 +1,20 @@
+-- batch_pallet.product_id: copy of batch.product_id so FIFO allocation reads
+-- candidates from ix_batch_pallet_product_fifo without a join or filesort.
+-- The application keeps it in step on placement, batch-pallet update and
+-- batch re-assignment.
+--   mysql np < DB/migrations/012_batch_pallet_product.sql
+
+ALTER TABLE `batch_pallet`
+  ADD COLUMN `product_id` int DEFAULT NULL AFTER `pallet_id`,
+  ALGORITHM=INSTANT;
+
+UPDATE `batch_pallet` bp
+JOIN `batch` b ON b.`id` = bp.`batch_id`
+SET bp.`product_id` = b.`product_id`;
+
+ALTER TABLE `batch_pallet`
+  ADD INDEX `ix_batch_pallet_product_fifo` (`product_id`, `stored_on`, `id`, `quantity_left`, `batch_id`, `pallet_id`),
+  ALGORITHM=INPLACE, LOCK=NONE;
+
+-- tests/test_allocation_plans.py checks both allocation plans
+-- (TEST_DATABASE_URL=mysql+pymysql://... pytest tests/test_allocation_plans.py)
@@ -0,0 +1,10 @@
+-- sales_daily_warehouse.shard: each sale adds onto one of SALES_ROLLUP_SHARDS
+-- rows per (day, warehouse) instead of a single hot row, so concurrent sales
+-- from a warehouse stop waiting on each other's row lock. /sales/analytics
+-- sums the shards. Existing rows become shard 0.
+--   mysql np < DB/migrations/013_sales_rollup_shards.sql
+
+ALTER TABLE `sales_daily_warehouse`
+  ADD COLUMN `shard` int NOT NULL DEFAULT 0 AFTER `warehouse_id`,
+  DROP PRIMARY KEY,
+  ADD PRIMARY KEY (`day`, `warehouse_id`, `shard`);
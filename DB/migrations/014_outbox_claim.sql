@@ -0,0 +1,9 @@
+-- outbox_event.claimed_until: the publisher claims a batch and commits before
+-- delivering it, instead of holding FOR UPDATE locks and a pooled connection
+-- while the sink is called. Unpublished events whose claim has run out are
+-- picked up again.
+--   mysql np < DB/migrations/014_outbox_claim.sql
+
+ALTER TABLE `outbox_event`
+  ADD COLUMN `claimed_until` datetime DEFAULT NULL AFTER `published_at`,
+  ALGORITHM=INSTANT;
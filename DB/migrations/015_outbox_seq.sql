@@ -0,0 +1,13 @@
+-- outbox_event.seq: commit-ordered number assigned by the outbox sequencer
+-- job once an event is committed; /events pages on it instead of the insert
+-- id, which a late-committing transaction can hold below events already
+-- served. Existing events are numbered by id.
+--   mysql np < DB/migrations/015_outbox_seq.sql
+
+ALTER TABLE `outbox_event`
+  ADD COLUMN `seq` bigint DEFAULT NULL AFTER `created_at`;
+
+UPDATE `outbox_event` SET `seq` = `id`;
+
+ALTER TABLE `outbox_event`
+  ADD UNIQUE KEY `ix_outbox_event_seq` (`seq`);
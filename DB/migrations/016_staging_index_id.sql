@@ -0,0 +1,18 @@
+-- Staging filter indexes end with id: /staging/filter pages by id
+-- (?after_id=&limit=), so within one received_on the rows come off the index
+-- already in keyset order instead of being sorted per page.
+-- Matches the Index() declarations on the Staging model.
+--   mysql np < DB/migrations/016_staging_index_id.sql
+
+ALTER TABLE `staging`
+  DROP INDEX `ix_staging_product_received`,
+  ADD INDEX `ix_staging_product_received` (`product_id`, `received_on`, `id`),
+  DROP INDEX `ix_staging_warehouse_status_received`,
+  ADD INDEX `ix_staging_warehouse_status_received` (`warehouse_id`, `qc_status`, `received_on`, `id`),
+  DROP INDEX `ix_staging_status_received`,
+  ADD INDEX `ix_staging_status_received` (`qc_status`, `received_on`, `id`),
+  ALGORITHM=INPLACE, LOCK=NONE;
+
+-- EXPLAIN SELECT * FROM staging
+--   WHERE warehouse_id = 1 AND qc_status = 'HOLD' AND received_on = '2025-03-01'
+--     AND id > 1000 ORDER BY id LIMIT 100;
@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings
-from pydantic import Field
+from pydantic import Field, field_validator
 from pathlib import Path
+from typing import List, Literal, Optional
 
 class Settings(BaseSettings):
     JWT_SECRET: str = Field(alias="JWT_SECRET")
@@ -11,6 +12,103 @@ class Settings(BaseSettings):
     BASE_DIR: Path = Path(__file__).resolve().parent.parent.parent
     UPLOAD_FOLDER: Path = BASE_DIR / "uploads" / "products"
 
+    # Product images
+    PRODUCT_IMAGE_MAX_BYTES: int = 5 * 1024 * 1024
+    PRODUCT_IMAGE_EXTENSIONS: List[str] = ["jpg", "jpeg", "png", "gif", "webp"]
+    PRODUCT_THUMBNAIL_SIZES: List[int] = [128, 512]
+    PRODUCT_IMAGE_CACHE_SECONDS: int = 86400
+
+    # Sales allocation: "update" locks candidate rows, "skip_locked" skips rows
+    # held by other orders, "optimistic" detects conflicts after the write
+    SALES_LOCK_MODE: Literal["update", "skip_locked", "optimistic"] = "update"
+    SALES_LOCK_RETRIES: int = 3
+
+    # Each sale adds onto one of this many rows per (day, warehouse) sales
+    # rollup, so concurrent sales from a warehouse rarely upsert the same row
+    SALES_ROLLUP_SHARDS: int = Field(16, ge=1)
+
+    # Connection pool (per engine, per worker process). Recycle stays below
+    # MySQL wait_timeout so idle connections are replaced before the server drops them
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
+    # Optional read replica for read-only reporting/list routes (get_read_db).
+    # Reads fall back to the primary when lag exceeds READ_REPLICA_MAX_LAG_SECONDS,
+    # and for READ_YOUR_WRITES_SECONDS after a client's own write.
+    READ_DATABASE_URL: Optional[str] = None
+    READ_REPLICA_MAX_LAG_SECONDS: float = 5
+    READ_REPLICA_CHECK_INTERVAL_SECONDS: float = 2
+    READ_YOUR_WRITES_SECONDS: int = 10
+
+    # Authenticated user cache; USER_CACHE_URL (redis://...) shares it across workers
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_MAX_SIZE: int = 10000
+    USER_CACHE_URL: Optional[str] = None
+
+    # Current-price cache (per worker). SALES_DEFAULT_PRICE_FIELD ("mrp"/"mwp")
+    # opts in to filling sale_price on sales submitted without one; by
+    # default such sales keep a NULL price
+    PRICE_CACHE_TTL_SECONDS: int = 60
+    PRICE_CACHE_MAX_SIZE: int = 50000
+    SALES_DEFAULT_PRICE_FIELD: Optional[Literal["mrp", "mwp"]] = None
+
+    # Idempotency-Key results for POST /sales/bulk are kept this long
+    IDEMPOTENCY_KEY_TTL_HOURS: int = 24
+    IDEMPOTENCY_PURGE_INTERVAL_SECONDS: int = 3600
+
+    # Stock movement outbox. OUTBOX_SINK_URL (file:///x.ndjson, sqlite:///x.db or
+    # http(s)://...) turns on the background publisher; /events works either way
+    OUTBOX_SINK_URL: Optional[str] = None
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_PUBLISH_INTERVAL_SECONDS: float = 2
+    OUTBOX_RETENTION_HOURS: int = 168
+    # Committed events get their /events sequence number this often
+    OUTBOX_SEQUENCE_INTERVAL_SECONDS: float = 1
+    # A publisher claims a batch for this long while it delivers it; another
+    # worker may take the batch over once the claim runs out
+    OUTBOX_CLAIM_SECONDS: int = 60
+
+    # Stock ledger compaction. Snapshots stop SETTLE seconds short of now so
+    # movements from transactions still in flight land in the replayed tail
+    LEDGER_SNAPSHOT_INTERVAL_SECONDS: int = 3600
+    LEDGER_SNAPSHOT_SETTLE_SECONDS: int = 60
+    # Point-in-time stock is answerable this far back; older snapshots are
+    # pruned, keeping the newest one at or before the horizon
+    LEDGER_SNAPSHOT_RETENTION_HOURS: int = 24 * 30
+
+    # Incremental exports of timestamped tables stop this far short of the
+    # database clock, so rows of transactions still in flight (holding a
+    # lower id) are not passed by the watermark before they commit
+    EXPORT_SETTLE_SECONDS: int = 60
+
+    # Request instrumentation (/metrics). Requests issuing more SQL statements
+    # than this are logged as likely N+1 queries
+    REQUEST_QUERY_COUNT_WARN: int = 50
+
+    # Request profiler. Admins profile one request with the X-Profile header;
+    # with PROFILE_SLOW_REQUEST_SECONDS set, requests slower than that are kept
+    # too (SQL always, stack samples for PROFILE_SAMPLE_RATE of them)
+    PROFILE_SLOW_REQUEST_SECONDS: Optional[float] = None
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_SAMPLE_INTERVAL_MS: float = 5
+    PROFILE_BUFFER_SIZE: int = 50
+    PROFILE_MAX_STACKS: int = 50
+
+    # Near-expiry buckets (upper bounds in days) precomputed by a background
+    # job every EXPIRY_BUCKETS_REFRESH_SECONDS; 0 disables the job
+    EXPIRY_BUCKET_DAYS: List[int] = [7, 30, 90]
+    EXPIRY_BUCKETS_REFRESH_SECONDS: int = 900
+
+    @field_validator("EXPIRY_BUCKET_DAYS")
+    @classmethod
+    def _bucket_days(cls, value):
+        if not value or min(value) < 0:
+            raise ValueError("EXPIRY_BUCKET_DAYS needs at least one non-negative bound")
+        return value
+
     class Config:
         env_file = ".env"
 
@@ -1,15 +1,83 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 import os
 
+from app.core.config import settings
+from app.core.pool_metrics import InstrumentedQueuePool, InstrumentedAsyncQueuePool, instrument_pool
+from app.core.request_metrics import instrument_statements
+from app.core.replica import ReplicaHealth
+from fastapi import Request
+
 load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+# Sync driver -> asyncio driver for the same database
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "mysql+mysqldb": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str):
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+def pool_options(name: str) -> dict:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_logging_name": name,
+    }
+
+engine = create_engine(DATABASE_URL, poolclass=InstrumentedQueuePool, **pool_options("primary"))
+instrument_pool(engine, "primary")
+instrument_statements(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for routes that should not occupy the threadpool.
+# expire_on_commit=False: expired attributes cannot lazy-load under asyncio.
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, poolclass=InstrumentedAsyncQueuePool, **pool_options("primary_async")
+)
+instrument_pool(async_engine.sync_engine, "primary_async")
+instrument_statements(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Optional read replica (async only; the routes that opt in are async)
+read_async_engine = None
+ReadAsyncSessionLocal = None
+replica_health = None
+
+if settings.READ_DATABASE_URL:
+    read_async_engine = create_async_engine(
+        to_async_url(settings.READ_DATABASE_URL),
+        poolclass=InstrumentedAsyncQueuePool,
+        **pool_options("replica_async")
+    )
+    instrument_pool(read_async_engine.sync_engine, "replica_async")
+    instrument_statements(read_async_engine.sync_engine)
+    ReadAsyncSessionLocal = async_sessionmaker(read_async_engine, autoflush=False, expire_on_commit=False)
+    replica_health = ReplicaHealth(
+        read_async_engine,
+        max_lag=settings.READ_REPLICA_MAX_LAG_SECONDS,
+        check_interval=settings.READ_REPLICA_CHECK_INTERVAL_SECONDS
+    )
+
+# Set on responses to writes; while present the client reads from the primary
+READ_YOUR_WRITES_COOKIE = "np_read_primary"
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes"
+
 Base = declarative_base()
 
 # This is the important function 👇
@@ -18,4 +86,23 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Async variant: use from `async def` routes with `await db.execute(select(...))`
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def wants_primary(request: Request) -> bool:
+    header = request.headers.get(READ_YOUR_WRITES_HEADER, "")
+    return header.lower() in ("1", "true", "yes") or READ_YOUR_WRITES_COOKIE in request.cookies
+
+# Read-only routes: replica when configured, healthy and the client has no fresh write
+async def get_read_db(request: Request):
+    factory = AsyncSessionLocal
+    if ReadAsyncSessionLocal is not None and not wants_primary(request):
+        if await replica_health.is_usable():
+            factory = ReadAsyncSessionLocal
+
+    async with factory() as db:
+        yield db
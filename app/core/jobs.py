@@ -0,0 +1,61 @@
+# app/core/jobs.py
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicJob:
+    """Runs an async callable every interval seconds until stopped."""
+
+    def __init__(self, name: str, interval: float, func):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.task = None
+        self.last_error = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.func()
+                self.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # A failed run must not kill the loop; the next one retries
+                logger.exception("Background job %s failed", self.name)
+                self.last_error = str(e)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._loop(), name=self.name)
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+
+JOBS = []
+
+
+def register_job(name: str, interval: float, func):
+    """Register a job; interval <= 0 disables it."""
+    if interval and interval > 0:
+        JOBS.append(PeriodicJob(name, interval, func))
+
+
+def start_jobs():
+    for job in JOBS:
+        job.start()
+
+
+async def stop_jobs():
+    for job in JOBS:
+        await job.stop()
@@ -0,0 +1,214 @@
+# app/core/outbox.py
+import asyncio
+import json
+import logging
+import sqlite3
+import urllib.request
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import bindparam, delete, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.outbox import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+EVENT_COLUMNS = [
+    c.name for c in OutboxEvent.__table__.columns if c.name not in ("published_at", "claimed_until", "seq")
+]
+
+
+class FileSink:
+    """Appends events as NDJSON lines."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def send(self, events):
+        with self.path.open("a", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event, default=str) + "\n")
+
+
+class SQLiteSink:
+    """Copies events into a local SQLite table; ids make redelivery harmless."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with sqlite3.connect(self.path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS stock_events (id INTEGER PRIMARY KEY, event TEXT NOT NULL)"
+            )
+
+    def send(self, events):
+        with sqlite3.connect(self.path) as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO stock_events (id, event) VALUES (?, ?)",
+                [(e["id"], json.dumps(e, default=str)) for e in events]
+            )
+
+
+class WebhookSink:
+    """POSTs each batch as a JSON array; any non-2xx response is retried next run."""
+
+    def __init__(self, url: str, timeout: float = 10):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, events):
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(events, default=str).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+def build_sink(url: str):
+    """file:///path.ndjson, sqlite:///path.db or http(s)://... ; None disables publishing."""
+    if not url:
+        return None
+    if url.startswith("file://"):
+        return FileSink(url[len("file://"):])
+    if url.startswith("sqlite:///"):
+        return SQLiteSink(url[len("sqlite:///"):])
+    if url.startswith(("http://", "https://")):
+        return WebhookSink(url)
+    raise ValueError(f"Unsupported OUTBOX_SINK_URL: {url}")
+
+
+class OutboxPublisher:
+    """
+    Relays unpublished outbox events to a sink in id order, batch by batch.
+    A batch is claimed and committed first, then delivered with no
+    transaction or connection held. Delivery is at-least-once: a batch is
+    marked published only after the sink accepted it, and a claim that runs
+    out (a crashed or stuck worker) is delivered again, so consumers should
+    de-duplicate on event id.
+    """
+
+    def __init__(self, sink, batch_size: int, claim_seconds: int = 60):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.claim_seconds = claim_seconds
+        self.published = 0
+        self.last_run = None
+
+    async def publish_pending(self):
+        while await self._publish_batch() == self.batch_size:
+            pass
+        self.last_run = datetime.utcnow()
+
+    async def _claim_batch(self) -> list:
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            # skip_locked lets publishers in several workers share the backlog
+            rows = (await db.execute(
+                select(*[OutboxEvent.__table__.c[c] for c in EVENT_COLUMNS])
+                .where(
+                    OutboxEvent.published_at.is_(None),
+                    or_(OutboxEvent.claimed_until.is_(None), OutboxEvent.claimed_until < now)
+                )
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )).all()
+            if rows:
+                await db.execute(
+                    update(OutboxEvent)
+                    .where(OutboxEvent.id.in_([row.id for row in rows]))
+                    .values(claimed_until=now + timedelta(seconds=self.claim_seconds))
+                )
+            await db.commit()
+        return [row._asdict() for row in rows]
+
+    async def _mark(self, ids, **values):
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(OutboxEvent).where(OutboxEvent.id.in_(ids)).values(**values))
+            await db.commit()
+
+    async def _publish_batch(self) -> int:
+        events = await self._claim_batch()
+        if not events:
+            return 0
+
+        ids = [e["id"] for e in events]
+        try:
+            await asyncio.to_thread(self.sink.send, events)
+        except Exception:
+            # Hand the batch back so the next run retries it straight away
+            await self._mark(ids, claimed_until=None)
+            raise
+        await self._mark(ids, published_at=datetime.utcnow())
+
+        self.published += len(events)
+        return len(events)
+
+    def status(self) -> dict:
+        return {
+            "sink": type(self.sink).__name__,
+            "published": self.published,
+            "last_run": self.last_run
+        }
+
+
+_sink = build_sink(settings.OUTBOX_SINK_URL)
+outbox_publisher = (
+    OutboxPublisher(_sink, settings.OUTBOX_BATCH_SIZE, settings.OUTBOX_CLAIM_SECONDS) if _sink else None
+)
+
+
+async def sequence_outbox_job():
+    """
+    Number committed events in commit order (outbox_event.seq), the cursor of
+    /events. Ids come from the insert, so a transaction that commits late can
+    hold an id below events already served; its events only become visible
+    to this job at commit, so they get a seq after everything served before.
+    Every worker runs this job: two runs that read the same MAX(seq) collide
+    on the unique index and the loser leaves the batch to the next tick.
+    """
+    table = OutboxEvent.__table__
+    while True:
+        async with AsyncSessionLocal() as db:
+            ids = (await db.scalars(
+                select(OutboxEvent.id)
+                .where(OutboxEvent.seq.is_(None))
+                .order_by(OutboxEvent.id)
+                .limit(settings.OUTBOX_BATCH_SIZE)
+            )).all()
+            if not ids:
+                return
+
+            last = await db.scalar(select(func.max(OutboxEvent.seq))) or 0
+            try:
+                await db.execute(
+                    table.update()
+                    .where(table.c.id == bindparam("e_id"), table.c.seq.is_(None))
+                    .values(seq=bindparam("e_seq")),
+                    [{"e_id": event_id, "e_seq": last + n} for n, event_id in enumerate(ids, 1)]
+                )
+                await db.commit()
+            except IntegrityError:
+                await db.rollback()
+                return
+
+        if len(ids) < settings.OUTBOX_BATCH_SIZE:
+            return
+
+
+async def purge_outbox_job():
+    """Drop events older than OUTBOX_RETENTION_HOURS; with a sink, only published ones."""
+    cutoff = datetime.utcnow() - timedelta(hours=settings.OUTBOX_RETENTION_HOURS)
+    stmt = delete(OutboxEvent).where(OutboxEvent.created_at < cutoff)
+    if outbox_publisher is not None:
+        stmt = stmt.where(OutboxEvent.published_at.isnot(None))
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(stmt)
+        await db.commit()
@@ -0,0 +1,105 @@
+# app/core/pool_metrics.py
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+
+class PoolStats:
+    """Per-process counters for one connection pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.overflow_checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+
+    def record_checkout(self, waited: float, overflowed: bool):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            if overflowed:
+                self.overflow_checkouts += 1
+
+    def incr(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "overflow_checkouts": self.overflow_checkouts,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations
+            }
+
+
+# Keyed by pool_logging_name, which survives pool.recreate()/dispose()
+POOL_STATS = {}
+
+
+def stats_for(name: str) -> PoolStats:
+    return POOL_STATS.setdefault(name or "default", PoolStats())
+
+
+class _TimedCheckout:
+    def _do_get(self):
+        stats = stats_for(self._orig_logging_name)
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except PoolTimeoutError:
+            stats.incr("timeouts")
+            raise
+        stats.record_checkout(time.perf_counter() - start, self.checkedout() > self.size())
+        return record
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_pool(engine, name: str):
+    """Count new physical connections and invalidations (e.g. failed pre-ping)."""
+    stats = stats_for(name)
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, record):
+        stats.incr("connects")
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_conn, record, exc):
+        stats.incr("invalidations")
+
+
+def pool_status(engine, name: str) -> dict:
+    pool = engine.pool
+    status = {
+        "name": name,
+        "class": type(pool).__name__,
+    }
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow()
+        })
+    status.update(stats_for(name).snapshot())
+    return status
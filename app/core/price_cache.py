@@ -0,0 +1,94 @@
+# app/core/price_cache.py
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm.attributes import get_history
+
+from app.core.config import settings
+from app.core.session_hooks import after_commit
+from app.models.price import Price
+
+# Cached so "no price" is remembered too
+MISSING = object()
+
+
+class PriceCache:
+    """
+    In-process LRU of each product's current price (a plain dict, or None when
+    the product has no price yet). Local to the worker: create/update
+    invalidate it here, other workers catch up within the TTL.
+    """
+
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, product_ids):
+        """({product_id: price or None} for cached ids, [ids to load])."""
+        found, missing = {}, []
+        now = time.monotonic()
+
+        with self._lock:
+            for pid in product_ids:
+                item = self._data.get(pid)
+                if item is None or item[0] < now:
+                    self._data.pop(pid, None)
+                    missing.append(pid)
+                    continue
+                self._data.move_to_end(pid)
+                found[pid] = item[1]
+
+            self.hits += len(found)
+            self.misses += len(missing)
+
+        return found, missing
+
+    def put_many(self, prices: dict):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for pid, price in prices.items():
+                self._data[pid] = (expires_at, price)
+                self._data.move_to_end(pid)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, product_id: int):
+        with self._lock:
+            self.invalidations += 1
+            self._data.pop(product_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+price_cache = PriceCache(settings.PRICE_CACHE_MAX_SIZE, settings.PRICE_CACHE_TTL_SECONDS)
+
+
+# A new or edited price changes the product's current price; dropped on
+# commit so a reader cannot re-cache the old price between flush and commit
+@event.listens_for(Price, "after_insert")
+@event.listens_for(Price, "after_update")
+def _invalidate_price(mapper, connection, target):
+    product_ids = {target.product_id}
+    product_ids.update(get_history(target, "product_id").deleted or ())
+    for pid in product_ids:
+        if pid is not None:
+            after_commit(target, price_cache.invalidate, pid)
@@ -0,0 +1,177 @@
+# app/core/profiler.py
+import itertools
+import os
+import random
+import sys
+import threading
+from collections import Counter, deque
+from datetime import datetime
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.security import is_admin_request
+
+# Admins send this header (any value) to profile one request
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# Leaf frames of threads that are waiting, not working
+IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("base_events.py", "_run_once"),
+}
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename.split(os.sep)
+    return f"{'/'.join(path[-2:])}:{code.co_qualname}"
+
+
+class StackSampler(threading.Thread):
+    """
+    Samples the Python stacks of all busy threads every `interval` seconds.
+    Sync routes run in the threadpool and async ones on the event loop, so
+    every thread is sampled; under concurrency other requests can show up.
+    """
+
+    def __init__(self, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.interval = interval
+        self.samples = 0
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        me = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES:
+                    continue
+
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+class RequestProfile:
+    def __init__(self, trigger: str, stats, sampler, profile_id=None):
+        self.trigger = trigger  # "header" or "slow"
+        self.stats = stats
+        self.sampler = sampler
+        # Reserved up front for header profiles: the X-Profile-Id header goes
+        # out before a streamed body, and so before the profile is stored
+        self.id = profile_id
+        self.started_at = datetime.utcnow()
+
+
+class ProfileStore:
+    """Bounded ring buffer of captured profiles (per worker process)."""
+
+    def __init__(self, size: int):
+        self._items = deque(maxlen=size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def reserve(self) -> int:
+        with self._lock:
+            return next(self._ids)
+
+    def add(self, profile: dict, profile_id: int = None) -> int:
+        with self._lock:
+            profile["id"] = profile_id if profile_id is not None else next(self._ids)
+            self._items.append(profile)
+        return profile["id"]
+
+    def list(self) -> list:
+        with self._lock:
+            items = list(self._items)
+        return [
+            {k: v for k, v in p.items() if k not in ("queries", "stacks")}
+            for p in reversed(items)
+        ]
+
+    def get(self, profile_id: int):
+        with self._lock:
+            return next((p for p in self._items if p["id"] == profile_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+profile_store = ProfileStore(settings.PROFILE_BUFFER_SIZE)
+
+
+async def start_profile(request, stats):
+    """
+    A RequestProfile when this request should be profiled, else None. Off by
+    default: only the header lookup and a settings check run per request.
+    """
+    if PROFILE_HEADER in request.headers and await is_admin_request(request):
+        trigger = "header"
+    elif settings.PROFILE_SLOW_REQUEST_SECONDS is not None:
+        trigger = "slow"
+    else:
+        return None
+
+    # SQL is captured for every candidate; the stack sampler costs more, so
+    # slow-request candidates only get it at PROFILE_SAMPLE_RATE
+    stats.queries = []
+    sampler = None
+    if trigger == "header" or random.random() < settings.PROFILE_SAMPLE_RATE:
+        sampler = StackSampler(settings.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+        sampler.start()
+
+    profile_id = profile_store.reserve() if trigger == "header" else None
+    return RequestProfile(trigger, stats, sampler, profile_id)
+
+
+async def finish_profile(profile: RequestProfile, request, route: str, status: int, elapsed: float):
+    """
+    Store the profile (slow-request candidates only above the threshold) once
+    the response body has been sent; its id or None. Stopping the sampler
+    joins its thread, so that happens in the threadpool, off the event loop.
+    """
+    if profile.sampler is not None:
+        await run_in_threadpool(profile.sampler.stop)
+
+    if profile.trigger == "slow" and elapsed < settings.PROFILE_SLOW_REQUEST_SECONDS:
+        return None
+
+    stats, sampler = profile.stats, profile.sampler
+    return profile_store.add({
+        "trigger": profile.trigger,
+        "started_at": profile.started_at.isoformat(),
+        "method": request.method,
+        "path": request.url.path,
+        "route": route,
+        "status": status,
+        "duration_ms": round(elapsed * 1000, 3),
+        "db_ms": round(stats.db_seconds * 1000, 3),
+        "statements": stats.statements,
+        "samples": sampler.samples if sampler else 0,
+        "sample_interval_ms": settings.PROFILE_SAMPLE_INTERVAL_MS if sampler else None,
+        "queries": [
+            {"sql": sql, "ms": round(seconds * 1000, 3), "executemany": many}
+            for sql, seconds, many in stats.queries
+        ],
+        "stacks": [
+            {"stack": stack, "samples": count}
+            for stack, count in (sampler.stacks.most_common(settings.PROFILE_MAX_STACKS) if sampler else [])
+        ],
+    }, profile.id)
@@ -0,0 +1,74 @@
+# app/core/replica.py
+import asyncio
+import logging
+import time
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+
+async def replica_lag_seconds(conn):
+    """
+    Seconds the replica is behind its source, 0 if the server is not a
+    replica, None if replication is broken.
+    """
+    if conn.dialect.name != "mysql":
+        return 0
+
+    for stmt, column in (
+        ("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+        ("SHOW SLAVE STATUS", "Seconds_Behind_Master"),
+    ):
+        try:
+            row = (await conn.execute(text(stmt))).mappings().first()
+        except Exception:
+            continue
+        if row is None:
+            return 0
+        return row.get(column)
+
+    return None
+
+
+class ReplicaHealth:
+    """
+    Caches the replica lag for check_interval seconds so routing a request
+    costs nothing on the hot path; one coroutine refreshes it at a time.
+    """
+
+    def __init__(self, engine, max_lag: float, check_interval: float):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag = None
+        self.healthy = False
+        self.checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def is_usable(self) -> bool:
+        if time.monotonic() - self.checked_at < self.check_interval:
+            return self.healthy
+
+        async with self._lock:
+            if time.monotonic() - self.checked_at >= self.check_interval:
+                await self._probe()
+        return self.healthy
+
+    async def _probe(self):
+        try:
+            async with self.engine.connect() as conn:
+                self.lag = await replica_lag_seconds(conn)
+        except Exception as e:
+            logger.warning("Read replica unavailable, using primary: %s", e)
+            self.lag = None
+
+        self.healthy = self.lag is not None and self.lag <= self.max_lag
+        self.checked_at = time.monotonic()
+
+    def status(self) -> dict:
+        return {
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+            "max_lag_seconds": self.max_lag
+        }
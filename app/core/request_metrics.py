@@ -0,0 +1,170 @@
+# app/core/request_metrics.py
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (le) of the histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Longest SQL text kept per statement in a request profile
+MAX_SQL_CHARS = 2000
+
+
+class RequestStats:
+    """
+    SQL statements issued on behalf of the request being served. `queries`
+    is a list only while the request is being profiled (app.core.profiler).
+    """
+
+    __slots__ = ("statements", "db_seconds", "queries")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.queries = None
+
+    def add(self, statement: str, seconds: float, executemany: bool):
+        self.statements += 1
+        self.db_seconds += seconds
+        if self.queries is not None:
+            self.queries.append((statement[:MAX_SQL_CHARS], seconds, executemany))
+
+
+# Set by the middleware. Sync routes run in a threadpool copy of the request
+# context, async sessions in greenlets that inherit it, so both see this object.
+current_request: ContextVar = ContextVar("current_request", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def lines(self, name: str, labels: str) -> list:
+        out, cumulative = [], 0
+        for le, count in zip(self.buckets, self.counts):
+            cumulative += count
+            out.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+        cumulative += self.counts[-1]
+        out.append(f'{name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+        out.append(f"{name}_sum{{{labels}}} {self.sum:.6f}")
+        out.append(f"{name}_count{{{labels}}} {cumulative}")
+        return out
+
+
+class RouteMetrics:
+    """Per-process latency and SQL usage per (method, route template, status)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency = {}
+        self._statements = {}
+        self._db_seconds = {}
+        self._over_threshold = {}
+
+    def record(self, method: str, route: str, status: int, seconds: float, stats: RequestStats, over_threshold: bool):
+        key = (method, route, str(status))
+        with self._lock:
+            if key not in self._latency:
+                self._latency[key] = Histogram(LATENCY_BUCKETS)
+                self._statements[key] = Histogram(STATEMENT_BUCKETS)
+                self._db_seconds[key] = 0.0
+                self._over_threshold[key] = 0
+            self._latency[key].observe(seconds)
+            self._statements[key].observe(stats.statements)
+            self._db_seconds[key] += stats.db_seconds
+            if over_threshold:
+                self._over_threshold[key] += 1
+
+    def prometheus(self) -> str:
+        out = [
+            "# HELP np_http_request_duration_seconds Request latency by route.",
+            "# TYPE np_http_request_duration_seconds histogram",
+        ]
+        with self._lock:
+            keys = sorted(self._latency)
+            for key in keys:
+                out += self._latency[key].lines("np_http_request_duration_seconds", _labels(key))
+
+            out += [
+                "# HELP np_http_request_db_statements SQL statements issued per request.",
+                "# TYPE np_http_request_db_statements histogram",
+            ]
+            for key in keys:
+                out += self._statements[key].lines("np_http_request_db_statements", _labels(key))
+
+            out += [
+                "# HELP np_http_request_db_seconds_total Time spent executing SQL, by route.",
+                "# TYPE np_http_request_db_seconds_total counter",
+            ]
+            out += [f"np_http_request_db_seconds_total{{{_labels(k)}}} {self._db_seconds[k]:.6f}" for k in keys]
+
+            out += [
+                "# HELP np_http_requests_over_query_threshold_total Requests above REQUEST_QUERY_COUNT_WARN statements.",
+                "# TYPE np_http_requests_over_query_threshold_total counter",
+            ]
+            out += [f"np_http_requests_over_query_threshold_total{{{_labels(k)}}} {self._over_threshold[k]}" for k in keys]
+
+        return "\n".join(out) + "\n"
+
+
+def _labels(key) -> str:
+    method, route, status = key
+    route = route.replace("\\", "\\\\").replace('"', '\\"')
+    return f'method="{method}",route="{route}",status="{status}"'
+
+
+ROUTE_METRICS = RouteMetrics()
+
+
+def instrument_statements(engine):
+    """Count statements and DB time against the current request, if any."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if current_request.get() is not None:
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stats = current_request.get()
+        if stats is not None and conn.info.get("query_start"):
+            stats.add(statement, time.perf_counter() - conn.info["query_start"].pop(), executemany)
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(exception_context):
+        starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+        stats = current_request.get()
+        if stats is not None and starts:
+            stats.add(exception_context.statement or "", time.perf_counter() - starts.pop(), False)
+
+
+async def observe_body(body_iterator, done):
+    """
+    Pass a response body through and await done() once it has been sent, or
+    the client went away. Streaming routes (NDJSON lists, /exports) do most
+    of their work, SQL included, while the body is being iterated.
+    """
+    try:
+        async for chunk in body_iterator:
+            yield chunk
+    finally:
+        await done()
+
+
+def route_template(request) -> str:
+    # Templates, not raw paths, keep the label set bounded
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
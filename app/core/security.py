@@ -4,11 +4,13 @@ from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db, AsyncSessionLocal
 from app.models.user import User  # make sure User model exists
+from app.core.user_cache import user_cache
 
 # Load environment variables
 load_dotenv()
@@ -62,10 +64,11 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 # 👤 Auth Dependency for Routes
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> User:
     """
     Extract the current logged-in user from JWT token.
     Raises 401 if invalid or expired.
+    The user row is served from user_cache when possible.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -81,8 +84,48 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     if username is None:
         raise credentials_exception
 
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
+    user = await user_cache.aget(username)
+    if user is None:
+        result = await db.execute(select(User).where(User.username == username))
+        user = result.scalars().first()
+        if not user:
+            raise credentials_exception
+        await user_cache.aput(user)
+
+    # Deactivated users are rejected (cache entry is dropped on deactivation)
+    if user.is_active is False:
         raise credentials_exception
 
     return user
+
+
+async def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
+    """Like get_current_user, but only for users with the admin role (403 otherwise)."""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin role required")
+    return current_user
+
+
+async def is_admin_request(request: Request) -> bool:
+    """
+    Whether the request's bearer token belongs to an active admin, for code
+    that runs before dependencies (middleware). Never raises.
+    """
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+
+    payload = decode_access_token(token)
+    username = payload.get("sub") if payload else None
+    if username is None:
+        return False
+
+    user = await user_cache.aget(username)
+    if user is None:
+        async with AsyncSessionLocal() as db:
+            user = (await db.execute(select(User).where(User.username == username))).scalars().first()
+        if user is None:
+            return False
+        await user_cache.aput(user)
+
+    return user.is_active is not False and user.role == "admin"
@@ -0,0 +1,40 @@
+# app/core/session_hooks.py
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+logger = logging.getLogger(__name__)
+
+_CALLBACKS = "after_commit_callbacks"
+
+
+def after_commit(target, callback, *args):
+    """
+    Run callback(*args) once the session holding `target` commits; dropped
+    if it rolls back. For cache invalidation from mapper events: those fire
+    at flush, before the commit, so a concurrent reader could still load and
+    re-cache the old row afterwards.
+    """
+    session = object_session(target)
+    if session is None:
+        callback(*args)
+        return
+    session.info.setdefault(_CALLBACKS, []).append((callback, args))
+
+
+@event.listens_for(Session, "after_commit")
+def _run_callbacks(session):
+    for callback, args in session.info.pop(_CALLBACKS, ()):
+        # The data is committed; a failed invalidation must not turn that into an error
+        try:
+            callback(*args)
+        except Exception:
+            logger.exception("after-commit callback %r failed", callback)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_callbacks(session, previous_transaction):
+    # Only the outermost rollback discards the work; a savepoint's does not
+    if previous_transaction.parent is None:
+        session.info.pop(_CALLBACKS, None)
@@ -0,0 +1,172 @@
+# app/core/user_cache.py
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm.attributes import get_history
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.session_hooks import after_commit
+from app.models.user import User
+
+# Columns kept for the authenticated principal (never the password hash)
+PRINCIPAL_FIELDS = ("id", "username", "email", "is_active", "role")
+
+
+class LocalUserCache:
+    """In-process LRU with per-entry TTL."""
+
+    blocking = False
+
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: dict):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisUserCache:
+    """Shared cache so invalidations reach every worker. Needs the redis package."""
+
+    # Network round trips: async callers go through the threadpool
+    blocking = True
+
+    def __init__(self, url: str, ttl: int, prefix: str = "np:user:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("USER_CACHE_URL is set but the redis package is not installed") from e
+
+        self.ttl = ttl
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str):
+        raw = self._client.get(self.prefix + key)
+        return json.loads(raw) if raw else None
+
+    def set(self, key: str, value: dict):
+        self._client.setex(self.prefix + key, self.ttl, json.dumps(value))
+
+    def delete(self, key: str):
+        self._client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self._client.scan_iter(self.prefix + "*"):
+            self._client.delete(key)
+
+    def __len__(self):
+        return sum(1 for _ in self._client.scan_iter(self.prefix + "*"))
+
+
+class UserCache:
+    """
+    Caches the authenticated user keyed by token subject (username).
+    Returned users are detached snapshots; do not add them to a session.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(self, username: str):
+        value = self.backend.get(username)
+        if value is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return User(**value)
+
+    def put(self, user: User):
+        self.backend.set(user.username, {f: getattr(user, f) for f in PRINCIPAL_FIELDS})
+
+    # For async code: a blocking backend must not stall the event loop
+    async def aget(self, username: str):
+        if self.backend.blocking:
+            return await run_in_threadpool(self.get, username)
+        return self.get(username)
+
+    async def aput(self, user: User):
+        if self.backend.blocking:
+            await run_in_threadpool(self.put, user)
+        else:
+            self.put(user)
+
+    def invalidate(self, username: str):
+        self._count("invalidations")
+        self.backend.delete(username)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "size": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+def _build_backend():
+    if settings.USER_CACHE_URL:
+        return RedisUserCache(settings.USER_CACHE_URL, settings.USER_CACHE_TTL_SECONDS)
+    return LocalUserCache(settings.USER_CACHE_MAX_SIZE, settings.USER_CACHE_TTL_SECONDS)
+
+
+user_cache = UserCache(_build_backend())
+
+
+# Any ORM change to a user (deactivation, role change, rename) drops it from
+# the cache once committed, so a concurrent login cannot re-cache the old row
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(mapper, connection, target):
+    names = {target.username}
+    names.update(get_history(target, "username").deleted or ())
+    for name in names:
+        if name:
+            after_commit(target, user_cache.invalidate, name)
@@ -0,0 +1,49 @@
+"""
+Export a table to a file without going through the API:
+
+    python -m app.export sales --format parquet --after-id 120000 -o sales.parquet
+
+Prints the watermark to pass to the next incremental run. sales and
+batch_pallet runs stop EXPORT_SETTLE_SECONDS short of now; batches and
+products have no timestamp, so their runs must overlap (see export_utils).
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+
+from app.core.database import AsyncSessionLocal
+from app.routers.export_utils import EXPORTS, FORMATS, Export, ExportError
+import app.main  # noqa: F401  (registers every model)
+
+
+async def run(args):
+    export = Export(args.table, args.format, since=args.since, after_id=args.after_id)
+
+    async with AsyncSessionLocal() as db:
+        await export.prepare(db)
+        with open(args.output or export.filename, "wb") as out:
+            async for data in export.stream(db):
+                out.write(data)
+
+    for name, value in export.watermark_headers().items():
+        print(f"{name}: {value}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a table as CSV, Parquet or Arrow")
+    parser.add_argument("table", choices=list(EXPORTS))
+    parser.add_argument("--format", choices=list(FORMATS), default="parquet")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="only rows with a timestamp after this")
+    parser.add_argument("--after-id", type=int, default=0, help="only rows with id greater than this")
+    parser.add_argument("-o", "--output", help="output file (default: <table>.<format>)")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(run(args))
+    except ExportError as e:
+        sys.exit(str(e))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,113 @@
-from fastapi import FastAPI
-from app.core.database import engine, Base
-from app.routers import auth,products,batch_pallet,batch,brand,category,company,consumer,pallet,staging,subcategory,warehouse,price,sales
+from contextlib import asynccontextmanager
+import logging
+import time
+
+from fastapi import FastAPI, Request
+from app.core.config import settings
+from app.core.database import engine, Base, read_async_engine, READ_YOUR_WRITES_COOKIE
+from app.core.jobs import register_job, start_jobs, stop_jobs
+from app.core.request_metrics import ROUTE_METRICS, RequestStats, current_request, observe_body, route_template
+from app.core.profiler import PROFILE_ID_HEADER, start_profile, finish_profile
+from app.routers import auth,products,batch_pallet,batch,brand,category,company,consumer,pallet,staging,subcategory,warehouse,price,sales,monitoring,export,events,ledger
 from app.models.batch_pallet import *
 from app.models.batch import *
 from app.models.brand import *
 from app.models.category import *
 from app.models.company import *
 from app.models.consumer import *
+from app.models.outbox import *
+from app.models.idempotency_key import *
+from app.models.expiry_bucket import *
 from app.models.pallet import *
 from app.models.price import *
 from app.models.products import *
+from app.models.product_stock import *
 from app.models.role import *
 from app.models.sales import *
+from app.models.sales_rollup import *
+from app.models.stock_ledger import *
 from app.models.staging import *
 from app.models.subcategory import *
 from app.models.user import *
 from app.models.warehouse import *
 
-app = FastAPI(title="FastAPI Backend")
+from app.routers.expiry_utils import refresh_expiry_buckets_job
+from app.routers.idempotency_utils import purge_idempotency_keys_job
+from app.core.outbox import outbox_publisher, purge_outbox_job, sequence_outbox_job
+from app.routers.ledger_utils import take_snapshot_job
+
+# Background jobs run in every worker process for the lifetime of the app
+register_job("expiry-buckets", settings.EXPIRY_BUCKETS_REFRESH_SECONDS, refresh_expiry_buckets_job)
+register_job("idempotency-purge", settings.IDEMPOTENCY_PURGE_INTERVAL_SECONDS, purge_idempotency_keys_job)
+register_job("outbox-purge", 3600, purge_outbox_job)
+register_job("outbox-sequencer", settings.OUTBOX_SEQUENCE_INTERVAL_SECONDS, sequence_outbox_job)
+register_job("ledger-snapshot", settings.LEDGER_SNAPSHOT_INTERVAL_SECONDS, take_snapshot_job)
+if outbox_publisher is not None:
+    register_job("outbox-publisher", settings.OUTBOX_PUBLISH_INTERVAL_SECONDS, outbox_publisher.publish_pending)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_jobs()
+    yield
+    await stop_jobs()
+
+app = FastAPI(title="FastAPI Backend", lifespan=lifespan)
 Base.metadata.create_all(bind=engine)
 
+# Pin a client to the primary for a short while after it writes (read-your-writes)
+if read_async_engine is not None:
+    @app.middleware("http")
+    async def read_your_writes(request: Request, call_next):
+        response = await call_next(request)
+        if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+            response.set_cookie(
+                READ_YOUR_WRITES_COOKIE, "1",
+                max_age=settings.READ_YOUR_WRITES_SECONDS, httponly=True
+            )
+        return response
+
+logger = logging.getLogger("app.requests")
+
+# Latency, SQL statement count and DB time per route, served at /metrics;
+# opt-in profiles of single requests, served at /monitoring/profiles
+@app.middleware("http")
+async def request_metrics(request: Request, call_next):
+    stats = RequestStats()
+    profile = await start_profile(request, stats)
+    token = current_request.set(stats)
+    start = time.perf_counter()
+
+    async def finished(status: int):
+        elapsed = time.perf_counter() - start
+        route = route_template(request)
+
+        over_threshold = stats.statements > settings.REQUEST_QUERY_COUNT_WARN
+        if over_threshold:
+            logger.warning(
+                "%s %s issued %d SQL statements (%.1f ms in DB, %.1f ms total); possible N+1",
+                request.method, route, stats.statements, stats.db_seconds * 1000, elapsed * 1000
+            )
+        ROUTE_METRICS.record(request.method, route, status, elapsed, stats, over_threshold)
+        if profile is not None:
+            await finish_profile(profile, request, route, status, elapsed)
+
+    try:
+        response = await call_next(request)
+    except BaseException:
+        await finished(500)
+        raise
+    finally:
+        current_request.reset(token)
+
+    # Header profiles have their id reserved, so it goes out before the body
+    if profile is not None and profile.id is not None:
+        response.headers[PROFILE_ID_HEADER] = str(profile.id)
+
+    # Metrics and profiles once the body has been sent: streamed responses
+    # run their queries and serialization after call_next has returned
+    response.body_iterator = observe_body(response.body_iterator, lambda: finished(response.status_code))
+    return response
+
 app.include_router(auth.router)
 app.include_router(batch_pallet.router)
 app.include_router(batch.router)
@@ -34,6 +122,11 @@ app.include_router(sales.router)
 app.include_router(staging.router)
 app.include_router(subcategory.router)
 app.include_router(warehouse.router)
+app.include_router(monitoring.router)
+app.include_router(monitoring.metrics_router)
+app.include_router(export.router)
+app.include_router(events.router)
+app.include_router(ledger.router)
 
 # from fastapi.staticfiles import StaticFiles
 # app.mount("/static", StaticFiles(directory="static"), name="static")
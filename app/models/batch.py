@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Boolean, Index
 from app.core.database import Base
 
 class Batch(Base):
@@ -11,4 +11,11 @@ class Batch(Base):
     expiry_date = Column(Date)
     quantity = Column(Integer)
     status = Column(Boolean, default=True)
-    sku = Column(String(50), nullable=False)
\ No newline at end of file
+    sku = Column(String(50), nullable=False)
+
+    __table_args__ = (
+        # FEFO candidates: product's batches in expiry order
+        Index("ix_batch_product_expiry", "product_id", "expiry_date"),
+        # Expiry windows across all products
+        Index("ix_batch_expiry", "expiry_date"),
+    )
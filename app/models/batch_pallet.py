@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -8,5 +8,18 @@ class BatchPallet(Base):
     id = Column(Integer, primary_key=True, index=True)
     batch_id = Column(Integer, ForeignKey("batch.id"), nullable=False)
     pallet_id = Column(Integer, ForeignKey("pallet.id"), nullable=False)
+    # Copy of batch.product_id, kept in step by every write path, so FIFO
+    # candidates come from one index without a join or a sort
+    product_id = Column(Integer)
     quantity_left = Column(Integer)
     stored_on = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Covers the FIFO/FEFO candidate lookup from batch without touching rows
+        Index("ix_batch_pallet_batch_stock", "batch_id", "quantity_left", "stored_on", "pallet_id"),
+        Index("ix_batch_pallet_pallet_batch", "pallet_id", "batch_id"),
+        # FIFO candidates in (product, stored_on, id) order, covering
+        Index("ix_batch_pallet_product_fifo", "product_id", "stored_on", "id", "quantity_left", "batch_id", "pallet_id"),
+        # Per-pallet load for putaway, summed from the index alone
+        Index("ix_batch_pallet_pallet_stock", "pallet_id", "quantity_left"),
+    )
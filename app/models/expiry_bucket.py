@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class ExpiryBucket(Base):
+    """Stock per warehouse x product x near-expiry bucket, rebuilt by a background job."""
+    __tablename__ = "expiry_bucket"
+
+    id = Column(Integer, primary_key=True, index=True)
+    warehouse_id = Column(Integer, ForeignKey("warehouse.id"))
+    product_id = Column(Integer, ForeignKey("product.id"), nullable=False)
+    bucket = Column(String(20), nullable=False)  # "expired", "0-7", "8-30", ...
+    quantity = Column(Integer, nullable=False, default=0)
+    batch_count = Column(Integer, nullable=False, default=0)
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_expiry_bucket_warehouse_product", "warehouse_id", "product_id", "bucket"),
+    )
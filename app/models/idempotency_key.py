@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from sqlalchemy.dialects.mysql import MEDIUMTEXT
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class IdempotencyKey(Base):
+    """Committed result of a request sent with an Idempotency-Key header."""
+    __tablename__ = "idempotency_key"
+
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer)
+    response_body = Column(Text().with_variant(MEDIUMTEXT(), "mysql"))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Expiry sweep
+        Index("ix_idempotency_key_created", "created_at"),
+    )
@@ -0,0 +1,32 @@
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, Index
+from app.core.database import Base
+
+class OutboxEvent(Base):
+    """
+    Stock movement written in the same transaction as the change itself.
+    quantity is signed: + stock in, - stock out.
+    """
+    __tablename__ = "outbox_event"
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_type = Column(String(30), nullable=False)  # sale, placement, adjustment, removal, batch_created, qc
+    product_id = Column(Integer)
+    batch_id = Column(Integer)
+    pallet_id = Column(Integer)
+    warehouse_id = Column(Integer)
+    quantity = Column(Integer, nullable=False, default=0)
+    ref_id = Column(Integer)  # sale / batch_pallet / staging id, by event_type
+    created_at = Column(DateTime, nullable=False)
+    published_at = Column(DateTime)
+    # Commit order: numbered by the sequencer once the event is committed;
+    # the /events cursor. NULL until then.
+    seq = Column(BigInteger)
+    # Set by the publisher delivering the event; NULL or past means free to claim
+    claimed_until = Column(DateTime)
+
+    __table_args__ = (
+        # Publisher: oldest unpublished first
+        Index("ix_outbox_event_unpublished", "published_at", "id"),
+        # /events paging; unique, so two sequencers racing cannot both commit
+        Index("ix_outbox_event_seq", "seq", unique=True),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
 from app.core.database import Base
 
 class Pallet(Base):
@@ -10,3 +10,8 @@ class Pallet(Base):
     dimensions = Column(String(100))
     capacity = Column(Float)
     warehouse_id = Column(Integer, ForeignKey("warehouse.id"))
+
+    __table_args__ = (
+        # Putaway scans a warehouse's pallets with their capacity
+        Index("ix_pallet_warehouse_capacity", "warehouse_id", "capacity"),
+    )
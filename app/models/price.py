@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, Index
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -11,3 +11,8 @@ class Price(Base):
     mwp = Column(Float, nullable=False)   # Minimum Wholesale Price
     effective_from = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        # Effective price lookup: latest effective_from per product
+        Index("ix_price_product_effective", "product_id", "effective_from"),
+    )
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class ProductStock(Base):
+    __tablename__ = "product_stock"
+
+    # One row per product, kept in step with batch_pallet.quantity_left
+    product_id = Column(Integer, ForeignKey("product.id"), primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Float, String
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Float, String, Index
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -14,3 +14,10 @@ class Sales(Base):
     quantity_sold = Column(Integer, nullable=False)
     sale_price = Column(Float, nullable=True)
     sale_timestamp = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_sales_product_time", "product_id", "sale_timestamp"),
+        Index("ix_sales_consumer_time", "consumer_id", "sale_timestamp"),
+        # Incremental exports (since= watermark)
+        Index("ix_sales_time", "sale_timestamp"),
+    )
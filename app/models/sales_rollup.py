@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, ForeignKey, Date, Float
+from app.core.database import Base
+
+# Pre-aggregated sales, maintained in the same transaction as each sale.
+# /sales/analytics reads only these tables.
+
+class SalesDaily(Base):
+    __tablename__ = "sales_daily"
+
+    day = Column(Date, primary_key=True)
+    product_id = Column(Integer, ForeignKey("product.id"), primary_key=True)
+    consumer_id = Column(Integer, ForeignKey("consumer.id"), primary_key=True)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+    lines = Column(Integer, nullable=False, default=0)
+
+
+class SalesDailyWarehouse(Base):
+    __tablename__ = "sales_daily_warehouse"
+
+    day = Column(Date, primary_key=True)
+    # Warehouse of the pallet sold from; 0 when the pallet has none
+    warehouse_id = Column(Integer, primary_key=True)
+    # Sales spread over SALES_ROLLUP_SHARDS rows per day and warehouse; readers sum them
+    shard = Column(Integer, primary_key=True, default=0)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+    lines = Column(Integer, nullable=False, default=0)
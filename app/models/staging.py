@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum, Date
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum, Date, Index
 from sqlalchemy.sql import func
 from app.core.database import Base
 import enum
@@ -34,4 +34,13 @@ class Staging(Base):
     rejected_quantity = Column(Integer, default=0) # Damaged products included
 
     # First entry timestamp (always auto-set on creation)
-    first_entered_on = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
\ No newline at end of file
+    first_entered_on = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # /staging/filter: product, warehouse and/or QC status with a
+        # received_on range; id last so keyset pages (ORDER BY id) within
+        # one received_on are read in index order
+        Index("ix_staging_product_received", "product_id", "received_on", "id"),
+        Index("ix_staging_warehouse_status_received", "warehouse_id", "qc_status", "received_on", "id"),
+        Index("ix_staging_status_received", "qc_status", "received_on", "id"),
+    )
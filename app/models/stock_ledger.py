@@ -0,0 +1,44 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from app.core.database import Base
+
+class StockMovement(Base):
+    """
+    Append-only stock ledger, written next to each outbox event and never
+    updated. Pallet stock at time T is the sum of quantity up to T per
+    (product, pallet); receipts carry no pallet and only record arrivals.
+    """
+    __tablename__ = "stock_movement"
+
+    id = Column(Integer, primary_key=True, index=True)
+    movement_type = Column(String(20), nullable=False)  # receipt, placement, sale, adjustment
+    product_id = Column(Integer)
+    batch_id = Column(Integer)
+    pallet_id = Column(Integer)
+    quantity = Column(Integer, nullable=False)
+    ref_id = Column(Integer)
+    occurred_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # Tail replay after a snapshot, for all products or a few
+        Index("ix_stock_movement_time", "occurred_at"),
+        Index("ix_stock_movement_product_time", "product_id", "occurred_at"),
+    )
+
+
+class StockSnapshot(Base):
+    """Compacted ledger: stock per (product, pallet) for movements up to cutoff."""
+    __tablename__ = "stock_snapshot"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cutoff = Column(DateTime, nullable=False, index=True)
+    taken_at = Column(DateTime, nullable=False)
+    lines = Column(Integer, nullable=False, default=0)
+
+
+class StockSnapshotLine(Base):
+    __tablename__ = "stock_snapshot_line"
+
+    snapshot_id = Column(Integer, ForeignKey("stock_snapshot.id", ondelete="CASCADE"), primary_key=True)
+    product_id = Column(Integer, primary_key=True)
+    pallet_id = Column(Integer, primary_key=True)
+    quantity = Column(Integer, nullable=False)
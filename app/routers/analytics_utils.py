@@ -0,0 +1,180 @@
+import random
+from collections import defaultdict
+
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.pallet import Pallet
+from app.models.sales_rollup import SalesDaily, SalesDailyWarehouse
+
+MEASURES = ("units", "revenue", "lines")
+
+
+def _increment_rollup(db: Session, model, keys, rows, day=None):
+    """
+    Add rows ({key..., units, revenue, lines}) onto a rollup table with one
+    executemany upsert. day=None stamps the database's CURRENT_DATE, the
+    same clock as Sales.sale_timestamp.
+    """
+    if not rows:
+        return
+
+    table = model.__table__
+    values = {"day": day if day is not None else func.current_date()}
+    values.update({col: bindparam(col) for col in keys + MEASURES})
+
+    if db.get_bind().dialect.name == "mysql":
+        stmt = mysql_insert(table).values(values)
+        stmt = stmt.on_duplicate_key_update({
+            col: table.c[col] + stmt.inserted[col] for col in MEASURES
+        })
+    else:
+        stmt = sqlite_insert(table).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[col] for col in ("day",) + keys],
+            set_={col: table.c[col] + stmt.excluded[col] for col in MEASURES}
+        )
+
+    # Sorted so concurrent writers take row locks in the same order
+    db.execute(stmt, sorted(rows, key=lambda r: tuple(r[k] for k in keys)))
+
+
+def _shard() -> int:
+    return random.randrange(settings.SALES_ROLLUP_SHARDS)
+
+
+def record_sales_rollups(db: Session, sales_records):
+    """
+    Fold Sales rows (not yet flushed is fine) into sales_daily and
+    sales_daily_warehouse inside the caller's transaction. The warehouse
+    totals go to a random shard row, so concurrent sales from the same
+    warehouse do not queue on one row lock until commit.
+    """
+    by_product = defaultdict(lambda: [0, 0.0, 0])
+    by_warehouse = defaultdict(lambda: [0, 0.0, 0])
+
+    pallet_ids = {s.pallet_id for s in sales_records if s.pallet_id is not None}
+    warehouses = dict(
+        db.execute(select(Pallet.id, Pallet.warehouse_id).where(Pallet.id.in_(pallet_ids))).all()
+    ) if pallet_ids else {}
+
+    for s in sales_records:
+        revenue = (s.quantity_sold or 0) * (s.sale_price or 0)
+        for totals in (
+            by_product[(s.product_id, s.consumer_id)],
+            by_warehouse[warehouses.get(s.pallet_id) or 0]
+        ):
+            totals[0] += s.quantity_sold or 0
+            totals[1] += revenue
+            totals[2] += 1
+
+    _increment_rollup(db, SalesDaily, ("product_id", "consumer_id"), [
+        {"product_id": pid, "consumer_id": cid, "units": u, "revenue": r, "lines": n}
+        for (pid, cid), (u, r, n) in by_product.items()
+    ])
+    shard = _shard()
+    _increment_rollup(db, SalesDailyWarehouse, ("warehouse_id", "shard"), [
+        {"warehouse_id": wid, "shard": shard, "units": u, "revenue": r, "lines": n}
+        for wid, (u, r, n) in by_warehouse.items()
+    ])
+
+
+def record_sale_change(db: Session, sale, old_consumer_id, old_price):
+    """Move an edited sale (consumer and/or price) between its day's rollup rows."""
+    units = sale.quantity_sold or 0
+    old_revenue = units * (old_price or 0)
+    new_revenue = units * (sale.sale_price or 0)
+    if old_consumer_id == sale.consumer_id and old_revenue == new_revenue:
+        return
+
+    day = sale.sale_timestamp.date()
+
+    # Take the line off its old row and add it to the new one
+    if old_consumer_id == sale.consumer_id:
+        changes = [(sale.consumer_id, 0, new_revenue - old_revenue, 0)]
+    else:
+        changes = [
+            (old_consumer_id, -units, -old_revenue, -1),
+            (sale.consumer_id, units, new_revenue, 1),
+        ]
+    _increment_rollup(db, SalesDaily, ("product_id", "consumer_id"), [
+        {"product_id": sale.product_id, "consumer_id": cid, "units": u, "revenue": r, "lines": n}
+        for cid, u, r, n in changes
+    ], day)
+
+    if new_revenue != old_revenue:
+        warehouse_id = None
+        if sale.pallet_id is not None:
+            warehouse_id = db.scalar(select(Pallet.warehouse_id).where(Pallet.id == sale.pallet_id))
+        _increment_rollup(db, SalesDailyWarehouse, ("warehouse_id", "shard"), [
+            {"warehouse_id": warehouse_id or 0, "shard": _shard(), "units": 0,
+             "revenue": new_revenue - old_revenue, "lines": 0}
+        ], day)
+
+
+# Read side: every query below touches only the rollup tables, and sums
+# over sales_daily_warehouse shards
+
+def _totals(model):
+    return (
+        func.coalesce(func.sum(model.units), 0).label("units"),
+        func.coalesce(func.sum(model.revenue), 0).label("revenue"),
+        func.coalesce(func.sum(model.lines), 0).label("lines"),
+    )
+
+
+async def sales_summary(db: AsyncSession, start, end, product_id=None, consumer_id=None, group_by=None):
+    columns = {
+        "day": SalesDaily.day,
+        "product": SalesDaily.product_id,
+        "consumer": SalesDaily.consumer_id,
+    }
+    group = [columns[group_by].label(group_by)] if group_by else []
+
+    stmt = select(*group, *_totals(SalesDaily)).where(SalesDaily.day.between(start, end))
+    if product_id:
+        stmt = stmt.where(SalesDaily.product_id == product_id)
+    if consumer_id:
+        stmt = stmt.where(SalesDaily.consumer_id == consumer_id)
+    if group:
+        stmt = stmt.group_by(*group).order_by(*group)
+
+    return [row._asdict() for row in await db.execute(stmt)]
+
+
+async def top_products(db: AsyncSession, start, end, n: int, by: str, consumer_id=None):
+    units, revenue, lines = _totals(SalesDaily)
+    order = revenue if by == "revenue" else units
+
+    stmt = (
+        select(SalesDaily.product_id, units, revenue, lines)
+        .where(SalesDaily.day.between(start, end))
+        .group_by(SalesDaily.product_id)
+        .order_by(order.desc(), SalesDaily.product_id)
+        .limit(n)
+    )
+    if consumer_id:
+        stmt = stmt.where(SalesDaily.consumer_id == consumer_id)
+
+    return [row._asdict() for row in await db.execute(stmt)]
+
+
+async def warehouse_sales(db: AsyncSession, start, end, warehouse_id=None, by_day: bool = False):
+    group = [SalesDailyWarehouse.warehouse_id]
+    if by_day:
+        group.append(SalesDailyWarehouse.day)
+
+    stmt = (
+        select(*group, *_totals(SalesDailyWarehouse))
+        .where(SalesDailyWarehouse.day.between(start, end))
+        .group_by(*group)
+        .order_by(*group)
+    )
+    if warehouse_id is not None:
+        stmt = stmt.where(SalesDailyWarehouse.warehouse_id == warehouse_id)
+
+    return [row._asdict() for row in await db.execute(stmt)]
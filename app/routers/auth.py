@@ -2,7 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.models.user import User
-from app.core.security import hash_password, verify_password
+from app.core.security import hash_password, verify_password, get_admin_user
+from app.core.user_cache import user_cache
 from app.core.jwt import create_access_token
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel
@@ -38,3 +39,8 @@ def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = D
 
     access_token = create_access_token({"sub": db_user.username})
     return {"access_token": access_token, "token_type": "bearer"}
+
+#  Authenticated-user cache statistics (admin only)
+@router.get("/cache/stats")
+def user_cache_stats(current_user: User = Depends(get_admin_user)):
+    return user_cache.stats()
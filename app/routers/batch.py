@@ -1,11 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response, Query
 from sqlalchemy.orm import Session
 from app.models import batch as models
 from app.models.products import Product
 from app.schemas import batch as schemas
 from app.core.database import get_db
 from app.core.security import get_current_user
-from typing import List
+from app.routers.list_utils import PageParams, page_params
+from app.routers.stock_utils import adjust_product_stock
+from app.routers.outbox_utils import record_events, stock_event
+from app.models.batch_pallet import BatchPallet
+from typing import List, Optional
+from datetime import date, timedelta
+
+from app.models.expiry_bucket import ExpiryBucket
+from app.schemas.expiry import ExpiringStock, ExpiryBucketResponse
+from app.routers.expiry_utils import expiring_stock, refresh_expiry_buckets
 
 router = APIRouter(
     prefix="/batches",
@@ -33,6 +42,11 @@ def create_batches(
             db.add(new_batch)
             created_batches.append(new_batch)
 
+        db.flush()
+        record_events(db, [
+            stock_event("batch_created", b.product_id, b.quantity or 0, batch_id=b.id)
+            for b in created_batches
+        ])
         db.commit()
 
         # Refresh all new objects to return their IDs
@@ -49,10 +63,59 @@ def create_batches(
 #  Get all batches
 @router.get("/", response_model=list[schemas.BatchResponse])
 def get_batches(
+    response: Response,
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    return page.apply(db.query(models.Batch), models.Batch, schemas.BatchResponse, response)
+
+
+#  Stock expiring within a window, per batch and warehouse
+@router.get("/expiring", response_model=List[ExpiringStock])
+def get_expiring_stock(
+    days: int = Query(30, ge=0, le=3650, description="Window length from today (or from_date)"),
+    from_date: Optional[date] = Query(None, description="Window start, defaults to today"),
+    to_date: Optional[date] = Query(None, description="Window end, overrides days"),
+    include_expired: bool = Query(False, description="Also return stock already past expiry"),
+    product_id: Optional[int] = Query(None),
+    warehouse_id: Optional[int] = Query(None),
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    start = from_date or date.today()
+    end = to_date or start + timedelta(days=days)
+
+    return expiring_stock(db, None if include_expired else start, end, product_id=product_id, warehouse_id=warehouse_id, limit=limit)
+
+
+#  Precomputed near-expiry buckets for dashboards
+@router.get("/expiring/buckets", response_model=List[ExpiryBucketResponse])
+def get_expiry_buckets(
+    product_id: Optional[int] = Query(None),
+    warehouse_id: Optional[int] = Query(None),
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    return db.query(models.Batch).all()
+    query = db.query(ExpiryBucket)
+    if product_id:
+        query = query.filter(ExpiryBucket.product_id == product_id)
+    if warehouse_id:
+        query = query.filter(ExpiryBucket.warehouse_id == warehouse_id)
+
+    return query.order_by(ExpiryBucket.warehouse_id, ExpiryBucket.product_id, ExpiryBucket.bucket).all()
+
+
+#  Rebuild the buckets now instead of waiting for the background job
+@router.post("/expiring/buckets/refresh")
+def refresh_buckets(
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    rows = refresh_expiry_buckets(db)
+    db.commit()
+    return {"buckets": rows}
 
 
 #  Get batch by ID
@@ -80,6 +143,30 @@ def update_batch(
     if not batch:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Batch not found")
 
+    # Re-assigning a batch moves its pallet stock to the new product
+    if updated_data.product_id != batch.product_id:
+        placed = (
+            db.query(BatchPallet.pallet_id, BatchPallet.quantity_left)
+            .filter(BatchPallet.batch_id == batch_id)
+            .all()
+        )
+        on_pallets = sum(qty or 0 for _, qty in placed)
+        adjust_product_stock(db, {
+            batch.product_id: -on_pallets,
+            updated_data.product_id: on_pallets
+        })
+
+        # Per pallet, so pallet-level stock history follows the move
+        events = []
+        for pallet_id, qty in placed:
+            events.append(stock_event("adjustment", batch.product_id, -(qty or 0), batch_id=batch_id, pallet_id=pallet_id))
+            events.append(stock_event("adjustment", updated_data.product_id, qty or 0, batch_id=batch_id, pallet_id=pallet_id))
+        record_events(db, events)
+
+        db.query(BatchPallet).filter(BatchPallet.batch_id == batch_id).update(
+            {BatchPallet.product_id: updated_data.product_id}, synchronize_session=False
+        )
+
     for key, value in updated_data.dict().items():
         setattr(batch, key, value)
 
@@ -1,13 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List
 
 from app.models.batch_pallet import BatchPallet
 from app.models.batch import Batch
 from app.models.pallet import Pallet
-from app.schemas.batch_pallet import BatchPalletCreate, BatchPalletResponse
+from app.models.warehouse import Warehouse
+from app.schemas.batch_pallet import (
+    BatchPalletCreate, BatchPalletResponse, BatchPalletBulkCreate,
+    PutawayRequest, PutawayResponse
+)
 from app.core.database import get_db
 from app.core.security import get_current_user
+from app.routers.list_utils import PageParams, page_params
+from app.routers.stock_utils import adjust_product_stock
+from app.routers.placement_utils import place_batches, plan_putaway
+from app.routers.outbox_utils import record_events, stock_event
 
 router = APIRouter(
     prefix="/batch-pallet",
@@ -45,21 +54,101 @@ def create_batch_pallet(
     if data.quantity_left > batch.quantity:
         raise HTTPException(400, "Quantity exceeds batch total")
 
-    new_entry = BatchPallet(**data.dict())
+    new_entry = BatchPallet(**data.dict(), product_id=batch.product_id)
     db.add(new_entry)
+    adjust_product_stock(db, {batch.product_id: data.quantity_left})
+    db.flush()
+    record_events(db, [stock_event(
+        "placement", batch.product_id, data.quantity_left,
+        batch_id=data.batch_id, pallet_id=data.pallet_id, ref_id=new_entry.id
+    )])
     db.commit()
     db.refresh(new_entry)
 
     return new_entry
 
 
+#  Bulk placement: many batches onto many pallets in one transaction
+@router.post("/bulk", response_model=List[BatchPalletResponse])
+def create_batch_pallets_bulk(
+    data: BatchPalletBulkCreate,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    if not data.placements:
+        raise HTTPException(400, "No placements given")
+
+    entries = place_batches(db, data.placements)
+    entry_ids = [e.id for e in entries]
+    db.commit()
+
+    # Reload committed rows (stored_on default) in one query
+    db.query(BatchPallet).filter(BatchPallet.id.in_(entry_ids)).all()
+    return entries
+
+
+#  Putaway: propose (and optionally store) pallets for a batch by free capacity
+@router.post("/putaway", response_model=PutawayResponse)
+def putaway_batch(
+    data: PutawayRequest,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    batch = db.query(Batch).filter(Batch.id == data.batch_id).first()
+    if not batch:
+        raise HTTPException(400, "Batch does not exist")
+
+    warehouse = db.query(Warehouse).filter(Warehouse.id == data.warehouse_id).first()
+    if not warehouse:
+        raise HTTPException(400, "Warehouse does not exist")
+
+    quantity = data.quantity
+    if quantity is None:
+        placed = (
+            db.query(func.coalesce(func.sum(BatchPallet.quantity_left), 0))
+            .filter(BatchPallet.batch_id == batch.id)
+            .scalar()
+        )
+        quantity = (batch.quantity or 0) - placed
+    if quantity <= 0:
+        raise HTTPException(400, "Nothing left to place for this batch")
+
+    plan, unplaced = plan_putaway(db, batch, warehouse.id, quantity, data.strategy)
+
+    if data.commit:
+        if unplaced:
+            raise HTTPException(400, f"Warehouse has free capacity for only {quantity - unplaced} of {quantity} units")
+
+        # Re-validated under lock, so a concurrent putaway cannot overfill
+        place_batches(db, [
+            BatchPalletCreate(batch_id=batch.id, pallet_id=pallet_id, quantity_left=qty)
+            for pallet_id, qty, _ in plan
+        ])
+        db.commit()
+
+    return {
+        "batch_id": batch.id,
+        "warehouse_id": warehouse.id,
+        "strategy": data.strategy,
+        "quantity": quantity,
+        "unplaced": unplaced,
+        "committed": data.commit,
+        "placements": [
+            {"pallet_id": pallet_id, "quantity": qty, "free_capacity": room}
+            for pallet_id, qty, room in plan
+        ]
+    }
+
+
 #  Get all
 @router.get("/", response_model=List[BatchPalletResponse])
 def get_all(
+    response: Response,
+    page: PageParams = Depends(page_params),
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    return db.query(BatchPallet).all()
+    return page.apply(db.query(BatchPallet), BatchPallet, BatchPalletResponse, response)
 
 
 #  Get by ID
@@ -92,8 +181,31 @@ def update(
     if data.quantity_left > batch.quantity:
         raise HTTPException(400, "Quantity exceeds batch available")
 
+    # Move the old quantity out and the new one in (batch may have changed)
+    old_product_id = (
+        db.query(Batch.product_id).filter(Batch.id == bp.batch_id).scalar()
+    )
+    deltas = {old_product_id: -(bp.quantity_left or 0)}
+    deltas[batch.product_id] = deltas.get(batch.product_id, 0) + data.quantity_left
+    adjust_product_stock(db, deltas)
+
+    if (bp.batch_id, bp.pallet_id) == (data.batch_id, data.pallet_id):
+        events = [stock_event(
+            "adjustment", batch.product_id, data.quantity_left - (bp.quantity_left or 0),
+            batch_id=bp.batch_id, pallet_id=bp.pallet_id, ref_id=bp.id
+        )]
+    else:
+        events = [
+            stock_event("removal", old_product_id, -(bp.quantity_left or 0),
+                        batch_id=bp.batch_id, pallet_id=bp.pallet_id, ref_id=bp.id),
+            stock_event("placement", batch.product_id, data.quantity_left,
+                        batch_id=data.batch_id, pallet_id=data.pallet_id, ref_id=bp.id),
+        ]
+    record_events(db, events)
+
     for k, v in data.dict().items():
         setattr(bp, k, v)
+    bp.product_id = batch.product_id
 
     db.commit()
     db.refresh(bp)
@@ -111,6 +223,13 @@ def delete(
     if not bp:
         raise HTTPException(404, "Record not found")
 
+    product_id = db.query(Batch.product_id).filter(Batch.id == bp.batch_id).scalar()
+    adjust_product_stock(db, {product_id: -(bp.quantity_left or 0)})
+    record_events(db, [stock_event(
+        "removal", product_id, -(bp.quantity_left or 0),
+        batch_id=bp.batch_id, pallet_id=bp.pallet_id, ref_id=bp.id
+    )])
+
     db.delete(bp)
     db.commit()
     return {"detail": "Deleted"}
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
 
 from app.models.consumer import Consumer
 from app.schemas.consumer import ConsumerCreate, ConsumerResponse
 from app.core.database import get_db
 from app.core.security import get_current_user
+from app.routers.list_utils import PageParams, page_params
 from typing import List
 
 router = APIRouter(
@@ -27,10 +28,12 @@ def create_consumer(
 
 @router.get("/", response_model=List[ConsumerResponse])
 def get_consumers(
+    response: Response,
+    page: PageParams = Depends(page_params),
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    return db.query(Consumer).all()
+    return page.apply(db.query(Consumer), Consumer, ConsumerResponse, response)
 
 
 @router.get("/{consumer_id}", response_model=ConsumerResponse)
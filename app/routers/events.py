@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import Optional
+
+from app.models.outbox import OutboxEvent
+from app.schemas.events import StockEventPage
+from app.core.database import get_read_db
+from app.core.outbox import outbox_publisher
+from app.core.security import get_current_user
+
+router = APIRouter(
+    prefix="/events",
+    tags=["Events"]
+)
+
+#  Stock movement events after a cursor; pass next_after back as ?after=
+#  The cursor is the commit-ordered seq, not the id: ids are assigned at
+#  insert, so a late commit could land below a cursor already passed. Events
+#  appear once the sequencer has numbered them, within a second or so
+@router.get("/", response_model=StockEventPage)
+async def get_events(
+    after: int = Query(0, ge=0, description="Last event seq already processed"),
+    limit: int = Query(500, ge=1, le=5000),
+    event_type: Optional[str] = Query(None),
+    product_id: Optional[int] = Query(None),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user)
+):
+    stmt = (
+        select(OutboxEvent)
+        .where(OutboxEvent.seq > after)
+        .order_by(OutboxEvent.seq)
+        .limit(limit)
+    )
+    if event_type:
+        stmt = stmt.where(OutboxEvent.event_type == event_type)
+    if product_id:
+        stmt = stmt.where(OutboxEvent.product_id == product_id)
+
+    events = (await db.scalars(stmt)).all()
+
+    return {
+        "events": events,
+        "next_after": events[-1].seq if events else after
+    }
+
+
+#  Publisher status for this worker
+@router.get("/publisher")
+def get_publisher_status(current_user: dict = Depends(get_current_user)):
+    return outbox_publisher.status() if outbox_publisher else {"sink": None}
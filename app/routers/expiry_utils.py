@@ -0,0 +1,124 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.batch import Batch
+from app.models.batch_pallet import BatchPallet
+from app.models.expiry_bucket import ExpiryBucket
+from app.models.pallet import Pallet
+
+
+def expiring_stock(db: Session, start: date, end: date, product_id=None, warehouse_id=None, limit=None):
+    """
+    Stock per batch and warehouse with expiry_date in [start, end], summed
+    from batch_pallet in one grouped query, soonest expiry first. start=None
+    includes everything already expired.
+    """
+    query = (
+        select(
+            Batch.id.label("batch_id"),
+            Batch.batch_no,
+            Batch.product_id,
+            Pallet.warehouse_id,
+            Batch.expiry_date,
+            func.sum(BatchPallet.quantity_left).label("quantity")
+        )
+        .join(BatchPallet, BatchPallet.batch_id == Batch.id)
+        .join(Pallet, Pallet.id == BatchPallet.pallet_id)
+        .where(
+            Batch.product_id.isnot(None),
+            Batch.expiry_date <= end,
+            BatchPallet.quantity_left > 0
+        )
+        .group_by(Batch.id, Batch.batch_no, Batch.product_id, Pallet.warehouse_id, Batch.expiry_date)
+        .order_by(Batch.expiry_date, Batch.id, Pallet.warehouse_id)
+    )
+    if start is not None:
+        query = query.where(Batch.expiry_date >= start)
+    if product_id:
+        query = query.where(Batch.product_id == product_id)
+    if warehouse_id:
+        query = query.where(Pallet.warehouse_id == warehouse_id)
+    if limit:
+        query = query.limit(limit)
+
+    today = date.today()
+    return [
+        {**row._asdict(), "days_left": (row.expiry_date - today).days}
+        for row in db.execute(query)
+    ]
+
+
+def bucket_label(days_left: int, bounds) -> str:
+    if days_left < 0:
+        return "expired"
+    low = 0
+    for high in bounds:
+        if days_left <= high:
+            return f"{low}-{high}"
+        low = high + 1
+    return None
+
+
+def refresh_expiry_buckets(db: Session):
+    """
+    Rebuild expiry_bucket from batch_pallet: one grouped query per run,
+    bucketed in Python and rewritten together. Returns the row count; the
+    caller owns the commit.
+    """
+    bounds = sorted(settings.EXPIRY_BUCKET_DAYS)
+    today = date.today()
+
+    rows = db.execute(
+        select(
+            Pallet.warehouse_id,
+            Batch.product_id,
+            Batch.expiry_date,
+            func.sum(BatchPallet.quantity_left).label("quantity"),
+            func.count(func.distinct(Batch.id)).label("batch_count")
+        )
+        .join(BatchPallet, BatchPallet.batch_id == Batch.id)
+        .join(Pallet, Pallet.id == BatchPallet.pallet_id)
+        .where(
+            Batch.product_id.isnot(None),
+            Batch.expiry_date <= today + timedelta(days=bounds[-1]),
+            BatchPallet.quantity_left > 0
+        )
+        .group_by(Pallet.warehouse_id, Batch.product_id, Batch.expiry_date)
+    )
+
+    buckets = {}
+    for row in rows:
+        label = bucket_label((row.expiry_date - today).days, bounds)
+        key = (row.warehouse_id, row.product_id, label)
+        quantity, batch_count = buckets.get(key, (0, 0))
+        buckets[key] = (quantity + row.quantity, batch_count + row.batch_count)
+
+    now = datetime.utcnow()
+    db.execute(delete(ExpiryBucket))
+    if buckets:
+        db.execute(insert(ExpiryBucket), [
+            {
+                "warehouse_id": warehouse_id,
+                "product_id": product_id,
+                "bucket": label,
+                "quantity": quantity,
+                "batch_count": batch_count,
+                "computed_at": now
+            }
+            for (warehouse_id, product_id, label), (quantity, batch_count) in buckets.items()
+        ])
+    return len(buckets)
+
+
+async def refresh_expiry_buckets_job():
+    async with AsyncSessionLocal() as db:
+        # Every worker runs this job; skip while another one's rebuild is fresh
+        recent = datetime.utcnow() - timedelta(seconds=settings.EXPIRY_BUCKETS_REFRESH_SECONDS / 2)
+        if await db.scalar(select(ExpiryBucket.id).where(ExpiryBucket.computed_at >= recent).limit(1)):
+            return
+        await db.run_sync(refresh_expiry_buckets)
+        await db.commit()
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Literal, Optional
+from datetime import datetime
+
+from app.core.database import get_read_db
+from app.core.security import get_current_user
+from app.routers.export_utils import Export, ExportError
+
+router = APIRouter(
+    prefix="/exports",
+    tags=["Exports"]
+)
+
+#  Stream a table as CSV, Parquet or an Arrow IPC stream
+#  The X-Export-Max-* headers are the watermark for the next incremental run;
+#  sales/batch_pallet stop EXPORT_SETTLE_SECONDS short of now, batches/products
+#  runs must overlap (see export_utils.EXPORTS)
+@router.get("/{table}")
+async def export_table(
+    table: Literal["sales", "batches", "batch_pallet", "products"],
+    format: Literal["csv", "parquet", "arrow"] = "csv",
+    since: Optional[datetime] = Query(None, description="Only rows with a timestamp after this (sales, batch_pallet)"),
+    after_id: int = Query(0, ge=0, description="Only rows with id greater than this"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user)
+):
+    try:
+        export = Export(table, format, since=since, after_id=after_id)
+    except ExportError as e:
+        raise HTTPException(400, str(e))
+
+    await export.prepare(db)
+
+    headers = export.watermark_headers()
+    headers["Content-Disposition"] = f'attachment; filename="{export.filename}"'
+
+    return StreamingResponse(export.stream(db), media_type=export.media_type, headers=headers)
@@ -0,0 +1,212 @@
+import csv
+import enum
+import io
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.batch import Batch
+from app.models.batch_pallet import BatchPallet
+from app.models.products import Product
+from app.models.sales import Sales
+
+# Rows fetched and converted per round trip
+EXPORT_CHUNK_SIZE = 10000
+
+# Parquet is built in a temp file, then streamed out in pieces of this size
+EXPORT_READ_SIZE = 1024 * 1024
+
+# Exportable tables and the timestamp column since= filters on (None: id only).
+# batch_pallet rows change after they are stored, so stored_on only finds new placements.
+# Ids are assigned at insert, not commit: a watermark on a table without a
+# timestamp can pass a row whose transaction commits later, so incremental
+# runs of those must overlap (after_id a margin below the last watermark)
+# and upsert by id.
+EXPORTS = {
+    "sales": (Sales, Sales.sale_timestamp),
+    "batches": (Batch, None),
+    "batch_pallet": (BatchPallet, BatchPallet.stored_on),
+    "products": (Product, None),
+}
+
+FORMATS = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+class ExportError(ValueError):
+    """Bad export request (unknown table/format, missing pyarrow, ...)."""
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise ExportError("pyarrow is not installed; only format=csv is available")
+    return pyarrow
+
+
+def _arrow_schema(pa, columns):
+    def arrow_type(sql_type):
+        if isinstance(sql_type, Boolean):
+            return pa.bool_()
+        if isinstance(sql_type, Integer):
+            return pa.int64()
+        if isinstance(sql_type, Float):
+            return pa.float64()
+        if isinstance(sql_type, DateTime):
+            return pa.timestamp("us")
+        if isinstance(sql_type, Date):
+            return pa.date32()
+        return pa.string()
+
+    return pa.schema([pa.field(c.name, arrow_type(c.type)) for c in columns])
+
+
+def _plain(value):
+    # Enum members (e.g. QC status) are exported by value
+    return value.value if isinstance(value, enum.Enum) else value
+
+
+class Export:
+    """
+    One export run: rows of a table with id in (after_id, max_id] and, if
+    given, timestamp > since. max_id/max_timestamp are fixed up front so a
+    run is a stable snapshot and can be the next run's watermark. Timestamped
+    tables only export rows older than EXPORT_SETTLE_SECONDS, so the
+    watermark stays behind transactions that may still commit a lower id.
+    """
+
+    def __init__(self, table: str, fmt: str, since: datetime = None, after_id: int = 0,
+                 chunk_size: int = EXPORT_CHUNK_SIZE):
+        if table not in EXPORTS:
+            raise ExportError(f"Unknown export '{table}', choose from {', '.join(EXPORTS)}")
+        if fmt not in FORMATS:
+            raise ExportError(f"Unknown format '{fmt}', choose from {', '.join(FORMATS)}")
+
+        self.model, self.time_column = EXPORTS[table]
+        if since is not None and self.time_column is None:
+            raise ExportError(f"'{table}' has no timestamp; use after_id as the watermark")
+        if fmt != "csv":
+            _pyarrow()
+
+        self.table = table
+        self.fmt = fmt
+        self.since = since
+        self.after_id = after_id
+        self.chunk_size = chunk_size
+        self.columns = list(self.model.__table__.columns)
+        self.max_id = None
+        self.max_timestamp = None
+        self.settled = None
+
+    @property
+    def media_type(self):
+        return FORMATS[self.fmt]
+
+    @property
+    def filename(self):
+        return f"{self.table}.{self.fmt}"
+
+    def _filters(self):
+        filters = [self.model.id > self.after_id]
+        if self.since is not None:
+            filters.append(self.time_column > self.since)
+        if self.settled is not None:
+            filters.append(self.time_column <= self.settled)
+        return filters
+
+    async def prepare(self, db: AsyncSession):
+        """Fix the upper watermark; call before streaming."""
+        if self.time_column is not None:
+            # The database clock: the timestamps are its server defaults
+            now = await db.scalar(select(func.now()))
+            self.settled = now - timedelta(seconds=settings.EXPORT_SETTLE_SECONDS)
+
+        columns = [func.max(self.model.id)]
+        if self.time_column is not None:
+            columns.append(func.max(self.time_column))
+
+        row = (await db.execute(select(*columns).where(*self._filters()))).one()
+        self.max_id = row[0]
+        if self.time_column is not None:
+            self.max_timestamp = row[1]
+
+    def watermark_headers(self):
+        headers = {"X-Export-Max-Id": str(self.max_id or self.after_id)}
+        if self.max_timestamp is not None:
+            headers["X-Export-Max-Timestamp"] = self.max_timestamp.isoformat()
+        return headers
+
+    async def _chunks(self, db: AsyncSession):
+        if self.max_id is None:
+            return
+
+        stmt = (
+            select(*self.columns)
+            .where(*self._filters(), self.model.id <= self.max_id)
+            .order_by(self.model.id)
+            .execution_options(yield_per=self.chunk_size)
+        )
+        result = await db.stream(stmt)
+        async for rows in result.partitions():
+            yield rows
+
+    async def stream(self, db: AsyncSession):
+        """Encoded output, one piece per chunk of rows."""
+        writer = {"csv": self._csv, "arrow": self._arrow, "parquet": self._parquet}[self.fmt]
+        async for data in writer(db):
+            if data:
+                yield data
+
+    async def _csv(self, db):
+        buf = io.StringIO()
+        out = csv.writer(buf)
+        out.writerow([c.name for c in self.columns])
+
+        async for rows in self._chunks(db):
+            out.writerows([_plain(v) for v in row] for row in rows)
+            yield buf.getvalue().encode()
+            buf.seek(0)
+            buf.truncate()
+
+        yield buf.getvalue().encode()
+
+    def _record_batch(self, pa, schema, rows):
+        names = [c.name for c in self.columns]
+        data = {name: [_plain(row[i]) for row in rows] for i, name in enumerate(names)}
+        return pa.RecordBatch.from_pydict(data, schema=schema)
+
+    async def _arrow(self, db):
+        pa = _pyarrow()
+        schema = _arrow_schema(pa, self.columns)
+        sink = io.BytesIO()
+
+        with pa.ipc.new_stream(sink, schema) as writer:
+            async for rows in self._chunks(db):
+                writer.write_batch(self._record_batch(pa, schema, rows))
+                yield sink.getvalue()
+                sink.seek(0)
+                sink.truncate()
+
+        yield sink.getvalue()
+
+    async def _parquet(self, db):
+        pa = _pyarrow()
+        schema = _arrow_schema(pa, self.columns)
+
+        # The Parquet footer comes last, so spool to disk instead of memory
+        with tempfile.TemporaryFile() as f:
+            with pa.parquet.ParquetWriter(f, schema) as writer:
+                async for rows in self._chunks(db):
+                    writer.write_batch(self._record_batch(pa, schema, rows))
+
+            f.seek(0)
+            while data := f.read(EXPORT_READ_SIZE):
+                yield data
@@ -0,0 +1,67 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.idempotency_key import IdempotencyKey
+
+# Set on responses served from a stored result
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def request_hash(payload) -> str:
+    """Stable digest of the request body, to catch a key reused for another request."""
+    body = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+async def stored_response(db: AsyncSession, user_id: int, key: str, digest: str):
+    """The committed response for this key as a JSONResponse, or None."""
+    row = (await db.execute(
+        select(IdempotencyKey.request_hash, IdempotencyKey.status_code, IdempotencyKey.response_body)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+    )).first()
+
+    if row is None or row.response_body is None:
+        return None
+    if row.request_hash != digest:
+        raise HTTPException(422, "Idempotency-Key was already used with a different request")
+
+    return JSONResponse(
+        content=json.loads(row.response_body),
+        status_code=row.status_code,
+        headers={REPLAYED_HEADER: "true"}
+    )
+
+
+async def claim_key(db: AsyncSession, user_id: int, key: str, digest: str):
+    """
+    Insert the key inside the caller's transaction, before any stock is touched.
+    A concurrent request with the same key blocks on this row until the first
+    one commits (then hits IntegrityError and replays) or rolls back (then
+    claims it itself).
+    """
+    await db.execute(insert(IdempotencyKey).values(user_id=user_id, key=key, request_hash=digest))
+
+
+async def save_response(db: AsyncSession, user_id: int, key: str, status_code: int, body):
+    """Store the response in the same transaction as the work it describes."""
+    await db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        .values(status_code=status_code, response_body=json.dumps(jsonable_encoder(body)))
+    )
+
+
+async def purge_idempotency_keys_job():
+    cutoff = datetime.utcnow() - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < cutoff))
+        await db.commit()
@@ -0,0 +1,154 @@
+import logging
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from uuid import uuid4
+
+from fastapi import HTTPException, Request, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+THUMBNAIL_FOLDER = settings.UPLOAD_FOLDER / "thumbs"
+
+def image_file(image_path: str) -> Path:
+    return settings.BASE_DIR / "uploads" / image_path
+
+
+def thumbnail_file(image_path: str, size: int) -> Path:
+    name = Path(image_path)
+    return THUMBNAIL_FOLDER / f"{name.stem}_{size}{name.suffix}"
+
+
+def stat_image(image_path: str, size: int = None):
+    """
+    (path, stat) of the image, or of its thumbnail when size is given and one
+    exists; None when the file is missing. Blocking: call via the threadpool.
+    """
+    if size is not None:
+        try:
+            thumb = thumbnail_file(image_path, size)
+            return thumb, os.stat(thumb)
+        except FileNotFoundError:
+            pass
+
+    path = image_file(image_path)
+    try:
+        return path, os.stat(path)
+    except FileNotFoundError:
+        return None
+
+
+def verify_image(path: Path):
+    """400 unless path holds an image Pillow can read. Blocking."""
+    try:
+        from PIL import Image
+    except ImportError:
+        logger.warning("Pillow is not installed; accepting %s unverified", path)
+        return
+
+    try:
+        with Image.open(path) as img:
+            img.verify()
+    except Exception:
+        raise HTTPException(400, "Uploaded file is not a valid image")
+
+
+async def save_upload(file: UploadFile, dest: Path, max_bytes: int) -> int:
+    """
+    Stream the upload to a temp file next to dest in chunks, enforcing
+    max_bytes, check it is an image, then atomically rename it into place.
+    """
+    tmp = dest.with_name(f".{dest.name}.{uuid4().hex}.tmp")
+    size = 0
+    f = await run_in_threadpool(open, tmp, "wb")
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(413, f"Image exceeds the {max_bytes} byte limit")
+            await run_in_threadpool(f.write, chunk)
+        await run_in_threadpool(f.close)
+        await run_in_threadpool(verify_image, tmp)
+        await run_in_threadpool(os.replace, tmp, dest)
+    except BaseException:
+        f.close()
+        tmp.unlink(missing_ok=True)
+        raise
+    return size
+
+
+def remove_thumbnails(image_path: str):
+    for size in settings.PRODUCT_THUMBNAIL_SIZES:
+        thumbnail_file(image_path, size).unlink(missing_ok=True)
+
+
+def generate_thumbnails(image_path: str):
+    """
+    Write one thumbnail per PRODUCT_THUMBNAIL_SIZES entry. Needs Pillow. When
+    they cannot be made, thumbnails of an earlier image under the same name
+    are removed so ?size= falls back to the new original.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        logger.warning("Pillow is not installed; skipping product thumbnails")
+        remove_thumbnails(image_path)
+        return
+
+    THUMBNAIL_FOLDER.mkdir(parents=True, exist_ok=True)
+    source = image_file(image_path)
+    try:
+        with Image.open(source) as img:
+            for size in settings.PRODUCT_THUMBNAIL_SIZES:
+                thumb = img.copy()
+                thumb.thumbnail((size, size))
+                if thumb.mode not in ("RGB", "L") and source.suffix.lower() in (".jpg", ".jpeg"):
+                    thumb = thumb.convert("RGB")
+                dest = thumbnail_file(image_path, size)
+                tmp = dest.with_name(f".{dest.name}.{uuid4().hex}.tmp")
+                thumb.save(tmp, format=img.format)
+                os.replace(tmp, dest)
+    except (OSError, ValueError) as e:
+        logger.warning("Could not create thumbnails for %s: %s", source, e)
+        remove_thumbnails(image_path)
+
+
+def remove_image(image_path: str):
+    image_file(image_path).unlink(missing_ok=True)
+    remove_thumbnails(image_path)
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip() for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    return False
+
+
+def cached_file_response(request: Request, path: Path, stat_result: os.stat_result):
+    """FileResponse with strong ETag/Last-Modified/Cache-Control; 304 when the client copy is current."""
+    etag = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Cache-Control": f"private, max-age={settings.PRODUCT_IMAGE_CACHE_SECONDS}"
+    }
+
+    if _not_modified(request, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(path, headers=headers, stat_result=stat_result)
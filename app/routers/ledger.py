@@ -0,0 +1,79 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import List, Optional
+from datetime import datetime, timezone
+
+from app.models.stock_ledger import StockMovement
+from app.schemas.ledger import StockMovementResponse, StockSnapshotResponse, StockAtResponse
+from app.core.database import get_async_db, get_read_db
+from app.core.security import get_current_user, get_admin_user
+from app.routers.list_utils import PageParams, page_params
+from app.routers.ledger_utils import prune_snapshots, stock_at, take_snapshot
+
+router = APIRouter(
+    prefix="/ledger",
+    tags=["Stock Ledger"]
+)
+
+#  Append-only stock movements, keyset paginated
+@router.get("/movements", response_model=List[StockMovementResponse])
+async def get_movements(
+    response: Response,
+    product_id: Optional[int] = None,
+    pallet_id: Optional[int] = None,
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user)
+):
+    stmt = select(StockMovement)
+    if product_id:
+        stmt = stmt.where(StockMovement.product_id == product_id)
+    if pallet_id:
+        stmt = stmt.where(StockMovement.pallet_id == pallet_id)
+
+    return await page.apply_async(db, stmt, StockMovement, StockMovementResponse, response)
+
+
+#  Pallet stock as of a point in time: nearest snapshot + ledger tail
+#  404 for a time before the oldest snapshot kept
+@router.get("/stock", response_model=StockAtResponse)
+async def get_stock_at(
+    at: datetime = Query(..., description="Point in time (UTC)"),
+    product_ids: Optional[str] = Query(None, description="Comma-separated product IDs, e.g. 1,2,3"),
+    pallet_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user)
+):
+    ids = None
+    if product_ids:
+        try:
+            ids = list(dict.fromkeys(int(p) for p in product_ids.split(",") if p.strip()))
+        except ValueError:
+            raise HTTPException(400, "product_ids must be a comma-separated list of integers")
+
+    # Ledger times are naive UTC
+    if at.tzinfo is not None:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+
+    snapshot, totals = await stock_at(db, at, ids, pallet_id)
+
+    products = {}
+    for (product_id, pid), qty in sorted(totals.items()):
+        product = products.setdefault(product_id, {"product_id": product_id, "total": 0, "pallets": []})
+        product["pallets"].append({"pallet_id": pid, "quantity": qty})
+        product["total"] += qty
+
+    return {"at": at, "snapshot": snapshot, "products": list(products.values())}
+
+
+#  Compact the ledger now instead of waiting for the background job (admin only)
+@router.post("/snapshots", response_model=StockSnapshotResponse)
+async def create_snapshot(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_admin_user)
+):
+    snapshot = await take_snapshot(db)
+    await prune_snapshots(db)
+    await db.commit()
+    return snapshot
@@ -0,0 +1,157 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.batch import Batch
+from app.models.batch_pallet import BatchPallet
+from app.models.stock_ledger import StockMovement, StockSnapshot, StockSnapshotLine
+
+
+async def latest_snapshot(db: AsyncSession, at: datetime):
+    """Newest snapshot covering no movement after `at`, or None."""
+    return (await db.scalars(
+        select(StockSnapshot)
+        .where(StockSnapshot.cutoff <= at)
+        .order_by(StockSnapshot.cutoff.desc(), StockSnapshot.id.desc())
+        .limit(1)
+    )).first()
+
+
+async def stock_at(db: AsyncSession, at: datetime, product_ids=None, pallet_id=None):
+    """
+    Pallet stock per (product, pallet) as of `at`: the nearest snapshot plus
+    the ledger tail after its cutoff. Returns (snapshot, {key: qty}). Stock
+    before the oldest snapshot is unknown (the ledger starts at the first
+    baseline, older snapshots are pruned), so that is a 404.
+    """
+    snapshot = await latest_snapshot(db, at)
+    if snapshot is None:
+        oldest = await db.scalar(select(func.min(StockSnapshot.cutoff)))
+        if oldest is None:
+            raise HTTPException(404, "No stock snapshot has been taken yet")
+        raise HTTPException(404, f"No stock history before {oldest.isoformat()}")
+
+    totals = defaultdict(int)
+
+    lines = select(StockSnapshotLine.product_id, StockSnapshotLine.pallet_id, StockSnapshotLine.quantity).where(
+        StockSnapshotLine.snapshot_id == snapshot.id
+    )
+    if product_ids:
+        lines = lines.where(StockSnapshotLine.product_id.in_(product_ids))
+    if pallet_id:
+        lines = lines.where(StockSnapshotLine.pallet_id == pallet_id)
+    for product_id, pid, qty in await db.execute(lines):
+        totals[(product_id, pid)] += qty
+
+    tail = (
+        select(StockMovement.product_id, StockMovement.pallet_id, func.sum(StockMovement.quantity))
+        .where(
+            StockMovement.pallet_id.isnot(None),
+            StockMovement.occurred_at > snapshot.cutoff,
+            StockMovement.occurred_at <= at
+        )
+        .group_by(StockMovement.product_id, StockMovement.pallet_id)
+    )
+    if product_ids:
+        tail = tail.where(StockMovement.product_id.in_(product_ids))
+    if pallet_id:
+        tail = tail.where(StockMovement.pallet_id == pallet_id)
+    for product_id, pid, qty in await db.execute(tail):
+        totals[(product_id, pid)] += int(qty or 0)
+
+    return snapshot, {key: qty for key, qty in totals.items() if qty}
+
+
+async def _baseline(db: AsyncSession, cutoff: datetime):
+    """
+    Stock as of cutoff without a previous snapshot: live batch_pallet minus
+    the movements after cutoff that it already contains. Both are read in one
+    transaction, so they agree; movements after cutoff still in flight land
+    in the replayed tail once they commit.
+    """
+    totals = defaultdict(int)
+    live = await db.execute(
+        select(Batch.product_id, BatchPallet.pallet_id, func.sum(BatchPallet.quantity_left))
+        .join(Batch, Batch.id == BatchPallet.batch_id)
+        .group_by(Batch.product_id, BatchPallet.pallet_id)
+    )
+    for product_id, pallet_id, qty in live:
+        totals[(product_id, pallet_id)] += int(qty or 0)
+
+    after = await db.execute(
+        select(StockMovement.product_id, StockMovement.pallet_id, func.sum(StockMovement.quantity))
+        .where(StockMovement.pallet_id.isnot(None), StockMovement.occurred_at > cutoff)
+        .group_by(StockMovement.product_id, StockMovement.pallet_id)
+    )
+    for product_id, pallet_id, qty in after:
+        totals[(product_id, pallet_id)] -= int(qty or 0)
+
+    return {key: qty for key, qty in totals.items() if qty}
+
+
+async def take_snapshot(db: AsyncSession):
+    """
+    Compact the ledger up to now - LEDGER_SNAPSHOT_SETTLE_SECONDS into a new
+    snapshot: previous snapshot + tail. The first snapshot is derived from
+    live batch_pallet instead, as the baseline for stock placed before the
+    ledger; it settles the same way, so a movement committed late is still
+    replayed from the tail. The caller owns the commit.
+    """
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=settings.LEDGER_SNAPSHOT_SETTLE_SECONDS)
+    previous = await latest_snapshot(db, now)
+
+    if previous is None:
+        totals = await _baseline(db, cutoff)
+    else:
+        if cutoff <= previous.cutoff:
+            return previous
+        _, totals = await stock_at(db, cutoff)
+
+    snapshot = StockSnapshot(cutoff=cutoff, taken_at=now, lines=len(totals))
+    db.add(snapshot)
+    await db.flush()
+
+    if totals:
+        await db.execute(insert(StockSnapshotLine), [
+            {"snapshot_id": snapshot.id, "product_id": product_id, "pallet_id": pallet_id, "quantity": qty}
+            for (product_id, pallet_id), qty in totals.items()
+        ])
+    return snapshot
+
+
+async def prune_snapshots(db: AsyncSession) -> int:
+    """
+    Drop snapshots superseded before LEDGER_SNAPSHOT_RETENTION_HOURS ago. The
+    newest snapshot at or before that horizon is kept, so every `at` inside
+    the window still has one to replay from. Returns the number dropped; the
+    caller owns the commit.
+    """
+    horizon = datetime.utcnow() - timedelta(hours=settings.LEDGER_SNAPSHOT_RETENTION_HOURS)
+    keep = await latest_snapshot(db, horizon)
+    if keep is None:
+        return 0
+
+    superseded = (await db.scalars(
+        select(StockSnapshot.id).where(StockSnapshot.cutoff <= keep.cutoff, StockSnapshot.id != keep.id)
+    )).all()
+    if superseded:
+        await db.execute(delete(StockSnapshotLine).where(StockSnapshotLine.snapshot_id.in_(superseded)))
+        await db.execute(delete(StockSnapshot).where(StockSnapshot.id.in_(superseded)))
+    return len(superseded)
+
+
+async def take_snapshot_job():
+    async with AsyncSessionLocal() as db:
+        # Every worker runs this job; one fresh snapshot per interval is enough
+        recent = datetime.utcnow() - timedelta(seconds=settings.LEDGER_SNAPSHOT_INTERVAL_SECONDS / 2)
+        if await db.scalar(select(StockSnapshot.id).where(StockSnapshot.taken_at >= recent).limit(1)):
+            return
+        await take_snapshot(db)
+        await prune_snapshots(db)
+        await db.commit()
@@ -0,0 +1,86 @@
+from typing import Optional
+
+from fastapi import Query, Response
+from fastapi.responses import StreamingResponse
+
+# Rows fetched per round trip when streaming
+STREAM_CHUNK_SIZE = 1000
+# Page size when ?after_id= is sent without ?limit=
+DEFAULT_PAGE_SIZE = 100
+
+
+class PageParams:
+    """
+    Keyset pagination for list endpoints: ?after_id=<last id seen>&limit=N.
+    Without either parameter the whole list is returned, as before paging.
+    A page that stops short of the end sets X-Next-After-Id for the next one.
+    With ?stream=true every row after after_id is streamed as NDJSON instead.
+    """
+
+    def __init__(self, after_id: Optional[int] = None, limit: Optional[int] = None, stream: bool = False):
+        self.paged = after_id is not None or limit is not None
+        self.after_id = after_id or 0
+        self.limit = limit or DEFAULT_PAGE_SIZE
+        self.stream = stream
+
+    def apply(self, query, model, schema, response: Response):
+        query = query.filter(model.id > self.after_id).order_by(model.id.asc())
+
+        if self.stream:
+            return stream_ndjson(query, schema)
+        if not self.paged:
+            return query.all()
+
+        # One extra row tells us whether another page exists
+        rows = query.limit(self.limit + 1).all()
+        if len(rows) > self.limit:
+            rows = rows[:self.limit]
+            response.headers["X-Next-After-Id"] = str(rows[-1].id)
+
+        return rows
+
+    async def apply_async(self, db, stmt, model, schema, response: Response):
+        """Same as apply() for an AsyncSession and a select() statement."""
+        stmt = stmt.where(model.id > self.after_id).order_by(model.id.asc())
+
+        if self.stream:
+            return stream_ndjson_async(db, stmt, schema)
+        if not self.paged:
+            return (await db.scalars(stmt)).all()
+
+        rows = (await db.scalars(stmt.limit(self.limit + 1))).all()
+        if len(rows) > self.limit:
+            rows = rows[:self.limit]
+            response.headers["X-Next-After-Id"] = str(rows[-1].id)
+
+        return rows
+
+
+async def page_params(
+    after_id: Optional[int] = Query(None, ge=0, description="Return rows with id greater than this"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description=f"Page size ({DEFAULT_PAGE_SIZE} with after_id)"),
+    stream: bool = Query(False, description="Stream all rows as NDJSON"),
+) -> PageParams:
+    """
+    The PageParams dependency: `page: PageParams = Depends(page_params)`. A
+    coroutine, as FastAPI would run a class dependency in the threadpool.
+    """
+    return PageParams(after_id, limit, stream)
+
+
+def stream_ndjson(query, schema, chunk_size: int = STREAM_CHUNK_SIZE):
+    # yield_per uses a server-side cursor, so memory stays at one chunk
+    def rows():
+        for obj in query.yield_per(chunk_size):
+            yield schema.model_validate(obj, from_attributes=True).model_dump_json() + "\n"
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+
+def stream_ndjson_async(db, stmt, schema, chunk_size: int = STREAM_CHUNK_SIZE):
+    async def rows():
+        result = await db.stream_scalars(stmt.execution_options(yield_per=chunk_size))
+        async for obj in result:
+            yield schema.model_validate(obj, from_attributes=True).model_dump_json() + "\n"
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+import os
+
+from app.core.database import engine, async_engine, read_async_engine, replica_health
+from app.core.pool_metrics import pool_status
+from app.core.request_metrics import ROUTE_METRICS
+from app.core.security import get_current_user, get_admin_user
+from app.core.profiler import profile_store
+
+router = APIRouter(
+    prefix="/monitoring",
+    tags=["Monitoring"]
+)
+
+# Unprefixed: Prometheus scrapes /metrics
+metrics_router = APIRouter(tags=["Monitoring"])
+
+#  Connection pool statistics for this worker process
+@router.get("/db-pool")
+def get_db_pool_stats(current_user: dict = Depends(get_current_user)):
+    pools = [
+        pool_status(engine, "primary"),
+        pool_status(async_engine.sync_engine, "primary_async")
+    ]
+    if read_async_engine is not None:
+        pools.append(pool_status(read_async_engine.sync_engine, "replica_async"))
+
+    return {
+        "pid": os.getpid(),
+        "pools": pools,
+        "replica": replica_health.status() if replica_health else None
+    }
+
+
+#  Captured request profiles, newest first (summaries only)
+@router.get("/profiles")
+def get_profiles(current_user: dict = Depends(get_admin_user)):
+    return {"pid": os.getpid(), "profiles": profile_store.list()}
+
+
+#  One profile with its SQL statements and sampled stacks
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: int, current_user: dict = Depends(get_admin_user)):
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(404, "Profile not found (evicted, or captured by another worker)")
+    return profile
+
+
+#  Drop all captured profiles
+@router.delete("/profiles", status_code=status.HTTP_204_NO_CONTENT)
+def clear_profiles(current_user: dict = Depends(get_admin_user)):
+    profile_store.clear()
+
+
+#  Per-route latency and SQL usage for this worker process, Prometheus text format
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(ROUTE_METRICS.prometheus(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.outbox import OutboxEvent
+from app.models.stock_ledger import StockMovement
+
+EVENT_FIELDS = ("product_id", "batch_id", "pallet_id", "warehouse_id", "quantity", "ref_id")
+
+# Outbox event type -> ledger movement type; others (qc) move no stock
+LEDGER_MOVEMENTS = {
+    "batch_created": "receipt",
+    "placement": "placement",
+    "sale": "sale",
+    "adjustment": "adjustment",
+    "removal": "adjustment",
+}
+
+
+def stock_event(event_type: str, product_id, quantity: int, **fields) -> dict:
+    event = dict.fromkeys(EVENT_FIELDS)
+    event.update(fields, event_type=event_type, product_id=product_id, quantity=quantity)
+    return event
+
+
+def record_events(db: Session, events):
+    """
+    Append stock movement events to the outbox, and the stock-moving ones to
+    the ledger, inside the caller's transaction (one executemany insert each).
+    """
+    if not events:
+        return
+
+    # Python UTC clock, the same one /events and ledger snapshots use
+    now = datetime.utcnow()
+    db.execute(insert(OutboxEvent), [{**e, "created_at": now} for e in events])
+
+    movements = [
+        {
+            "movement_type": LEDGER_MOVEMENTS[e["event_type"]],
+            "product_id": e["product_id"],
+            "batch_id": e["batch_id"],
+            "pallet_id": e["pallet_id"],
+            "quantity": e["quantity"],
+            "ref_id": e["ref_id"],
+            "occurred_at": now
+        }
+        for e in events
+        if e["event_type"] in LEDGER_MOVEMENTS
+    ]
+    if movements:
+        db.execute(insert(StockMovement), movements)
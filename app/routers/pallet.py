@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
 from typing import List
 
@@ -7,6 +7,7 @@ from app.models.warehouse import Warehouse
 from app.schemas.pallet import PalletCreate, PalletResponse
 from app.core.database import get_db
 from app.core.security import get_current_user
+from app.routers.list_utils import PageParams, page_params
 
 router = APIRouter(
     prefix="/pallets",
@@ -41,10 +42,12 @@ def create_pallet(
 #  Get all Pallets
 @router.get("/", response_model=List[PalletResponse])
 def get_pallets(
+    response: Response,
+    page: PageParams = Depends(page_params),
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    return db.query(Pallet).all()
+    return page.apply(db.query(Pallet), Pallet, PalletResponse, response)
 
 
 #  Get Pallet by ID
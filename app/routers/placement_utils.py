@@ -0,0 +1,219 @@
+from bisect import bisect_left
+from collections import defaultdict
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.batch import Batch
+from app.models.batch_pallet import BatchPallet
+from app.models.pallet import Pallet
+from app.routers.stock_utils import adjust_product_stock
+from app.routers.outbox_utils import record_events, stock_event
+
+
+def pallet_load(db: Session, pallet_ids):
+    """Units currently stored per pallet, in one grouped query."""
+    return dict(
+        db.query(BatchPallet.pallet_id, func.coalesce(func.sum(BatchPallet.quantity_left), 0))
+        .filter(BatchPallet.pallet_id.in_(pallet_ids))
+        .group_by(BatchPallet.pallet_id)
+    )
+
+
+def place_batches(db: Session, placements, events: list = None):
+    """
+    Validate and insert many (batch_id, pallet_id, quantity_left) placements
+    as one unit. Batch totals and pallet capacity are checked set-based
+    against what is already stored; all problems are reported together.
+    Returns the flushed BatchPallet rows; the caller owns the commit.
+
+    The placement events are recorded here, or appended to `events` for a
+    caller that records all of its events at the end of the transaction.
+    """
+    batch_ids = sorted({p.batch_id for p in placements})
+    pallet_ids = sorted({p.pallet_id for p in placements})
+
+    # Lock the batches and pallets so concurrent placements cannot overfill them
+    batches = {
+        b.id: b for b in
+        db.query(Batch.id, Batch.quantity, Batch.product_id)
+        .filter(Batch.id.in_(batch_ids))
+        .order_by(Batch.id)
+        .with_for_update()
+    }
+    pallets = {
+        p.id: p for p in
+        db.query(Pallet.id, Pallet.capacity)
+        .filter(Pallet.id.in_(pallet_ids))
+        .order_by(Pallet.id)
+        .with_for_update()
+    }
+
+    placed_per_batch = dict(
+        db.query(BatchPallet.batch_id, func.coalesce(func.sum(BatchPallet.quantity_left), 0))
+        .filter(BatchPallet.batch_id.in_(batch_ids))
+        .group_by(BatchPallet.batch_id)
+    )
+    load_per_pallet = pallet_load(db, pallet_ids)
+    existing_pairs = set(
+        db.query(BatchPallet.batch_id, BatchPallet.pallet_id)
+        .filter(
+            BatchPallet.batch_id.in_(batch_ids),
+            BatchPallet.pallet_id.in_(pallet_ids)
+        )
+    )
+
+    errors = []
+    new_per_batch = defaultdict(int)
+    new_per_pallet = defaultdict(int)
+    seen_pairs = set()
+
+    for i, p in enumerate(placements):
+        if p.batch_id not in batches:
+            errors.append(f"Placement {i}: batch {p.batch_id} does not exist")
+            continue
+        if p.pallet_id not in pallets:
+            errors.append(f"Placement {i}: pallet {p.pallet_id} does not exist")
+            continue
+        if p.quantity_left <= 0:
+            errors.append(f"Placement {i}: quantity must be positive")
+            continue
+
+        pair = (p.batch_id, p.pallet_id)
+        if pair in existing_pairs or pair in seen_pairs:
+            errors.append(f"Placement {i}: batch {p.batch_id} already stored in pallet {p.pallet_id}")
+            continue
+        seen_pairs.add(pair)
+
+        new_per_batch[p.batch_id] += p.quantity_left
+        new_per_pallet[p.pallet_id] += p.quantity_left
+
+    for batch_id, qty in new_per_batch.items():
+        total = placed_per_batch.get(batch_id, 0) + qty
+        available = batches[batch_id].quantity or 0
+        if total > available:
+            errors.append(f"Batch {batch_id}: placing {total} exceeds batch quantity {available}")
+
+    for pallet_id, qty in new_per_pallet.items():
+        capacity = pallets[pallet_id].capacity
+        load = load_per_pallet.get(pallet_id, 0) + qty
+        if capacity is not None and load > capacity:
+            errors.append(f"Pallet {pallet_id}: load {load} exceeds capacity {capacity:g}")
+
+    if errors:
+        raise HTTPException(400, errors)
+
+    entries = [
+        BatchPallet(
+            batch_id=p.batch_id, pallet_id=p.pallet_id, quantity_left=p.quantity_left,
+            product_id=batches[p.batch_id].product_id
+        )
+        for p in placements
+    ]
+    db.add_all(entries)
+
+    product_deltas = defaultdict(int)
+    for batch_id, qty in new_per_batch.items():
+        product_deltas[batches[batch_id].product_id] += qty
+    adjust_product_stock(db, product_deltas)
+
+    db.flush()
+    placed = [
+        stock_event("placement", batches[e.batch_id].product_id, e.quantity_left,
+                    batch_id=e.batch_id, pallet_id=e.pallet_id, ref_id=e.id)
+        for e in entries
+    ]
+    if events is None:
+        record_events(db, placed)
+    else:
+        events.extend(placed)
+    return entries
+
+
+def pallet_free_capacity(db: Session, warehouse_id: int):
+    """
+    (pallet id, free units) for every pallet in the warehouse with room left,
+    from one grouped query. Pallets without a capacity are left out.
+    """
+    load = func.coalesce(func.sum(BatchPallet.quantity_left), 0)
+
+    rows = db.execute(
+        select(Pallet.id, Pallet.capacity - load)
+        .outerjoin(BatchPallet, BatchPallet.pallet_id == Pallet.id)
+        .where(
+            Pallet.warehouse_id == warehouse_id,
+            Pallet.capacity.isnot(None)
+        )
+        .group_by(Pallet.id, Pallet.capacity)
+        .having(Pallet.capacity - load >= 1)
+    )
+    # Plain tuples: a large warehouse returns one row per pallet
+    return [(pallet_id, int(room)) for pallet_id, room in rows]
+
+
+def _fill(free, quantity, strategy):
+    """
+    Spread quantity over [(pallet_id, free)]. first_fit walks pallets in id
+    order; best_fit takes the tightest pallet that holds the whole remainder,
+    otherwise the roomiest one, so a batch is split over as few pallets as
+    possible. Returns ([(pallet_id, qty, free)], quantity still unplaced).
+    """
+    plan = []
+
+    if strategy == "first_fit":
+        for pallet_id, room in sorted(free):
+            if quantity <= 0:
+                break
+            qty = min(room, quantity)
+            plan.append((pallet_id, qty, room))
+            quantity -= qty
+        return plan, quantity
+
+    # Sorted by free room; bisect finds the tightest fit
+    pallets = sorted(free, key=lambda p: (p[1], p[0]))
+    rooms = [room for _, room in pallets]
+
+    while quantity > 0 and pallets:
+        i = bisect_left(rooms, quantity)
+        if i == len(rooms):
+            i -= 1
+        pallet_id, room = pallets.pop(i)
+        rooms.pop(i)
+
+        qty = min(room, quantity)
+        plan.append((pallet_id, qty, room))
+        quantity -= qty
+
+    return plan, quantity
+
+
+def plan_putaway(db: Session, batch, warehouse_id: int, quantity: int, strategy: str = "best_fit"):
+    """
+    Propose pallets in a warehouse for quantity units of batch. Pallets that
+    already hold the same product are filled first so a product stays
+    together; pallets already holding this batch are skipped.
+    """
+    free = pallet_free_capacity(db, warehouse_id)
+
+    # Pallets in this warehouse that hold the product / this batch already
+    holders = db.execute(
+        select(BatchPallet.pallet_id, BatchPallet.batch_id)
+        .join(Batch, Batch.id == BatchPallet.batch_id)
+        .join(Pallet, Pallet.id == BatchPallet.pallet_id)
+        .where(
+            Batch.product_id == batch.product_id,
+            Pallet.warehouse_id == warehouse_id
+        )
+    ).all()
+    has_batch = {pallet_id for pallet_id, batch_id in holders if batch_id == batch.id}
+    has_product = {pallet_id for pallet_id, _ in holders}
+
+    free = [p for p in free if p[0] not in has_batch]
+    same_product = [p for p in free if p[0] in has_product]
+    others = [p for p in free if p[0] not in has_product]
+
+    plan, unplaced = _fill(same_product, quantity, strategy)
+    more, unplaced = _fill(others, unplaced, strategy)
+
+    return plan + more, unplaced
@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 
 from app.models.price import Price
 from app.models.products import Product
-from app.schemas.price import PriceCreate, PriceUpdate, PriceResponse
+from app.schemas.price import PriceCreate, PriceUpdate, PriceResponse, CurrentPriceResponse
 from app.core.database import get_db
 from app.core.security import get_current_user
+from app.core.price_cache import price_cache
+from app.routers.list_utils import PageParams, page_params
+from app.routers.price_utils import current_prices, load_effective_prices
 
 router = APIRouter(
     prefix="/prices",
@@ -35,10 +39,48 @@ def create_price(
 #  Get all prices
 @router.get("/", response_model=List[PriceResponse])
 def get_prices(
+    response: Response,
+    page: PageParams = Depends(page_params),
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    return db.query(Price).all()
+    return page.apply(db.query(Price), Price, PriceResponse, response)
+
+
+# Upper bound for /prices/current?product_ids=...
+MAX_CURRENT_PRICE_PRODUCTS = 1000
+
+#  Effective price per product, now (cached) or as of a timestamp
+@router.get("/current", response_model=CurrentPriceResponse)
+def get_current_prices(
+    product_ids: str = Query(..., description="Comma-separated product IDs, e.g. 1,2,3"),
+    at: Optional[datetime] = Query(None, description="Resolve as of this time instead of now"),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    try:
+        ids = list(dict.fromkeys(int(p) for p in product_ids.split(",") if p.strip()))
+    except ValueError:
+        raise HTTPException(400, "product_ids must be a comma-separated list of integers")
+
+    if not ids:
+        raise HTTPException(400, "product_ids is required")
+    if len(ids) > MAX_CURRENT_PRICE_PRODUCTS:
+        raise HTTPException(400, f"At most {MAX_CURRENT_PRICE_PRODUCTS} product_ids per request")
+
+    prices = load_effective_prices(db, ids, at) if at else current_prices(db, ids)
+
+    return {
+        "at": at,
+        "prices": [prices[pid] for pid in ids if prices.get(pid)],
+        "not_found": [pid for pid in ids if not prices.get(pid)]
+    }
+
+
+#  Current-price cache counters for this worker
+@router.get("/cache/stats")
+def price_cache_stats(current_user: dict = Depends(get_current_user)):
+    return price_cache.stats()
 
 
 #  Get price by ID
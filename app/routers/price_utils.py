@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.price_cache import price_cache
+from app.models.price import Price
+
+PRICE_FIELDS = ("id", "product_id", "mrp", "mwp", "effective_from", "updated_at")
+
+
+def load_effective_prices(db: Session, product_ids, at: datetime = None):
+    """
+    The price in effect at `at` (default: now, by the database clock) for
+    each product: latest effective_from not after it, ties to the newest row.
+    One grouped query over ix_price_product_effective.
+    """
+    as_of = at if at is not None else func.now()
+
+    latest = (
+        select(Price.product_id, func.max(Price.effective_from).label("effective_from"))
+        .where(Price.product_id.in_(product_ids), Price.effective_from <= as_of)
+        .group_by(Price.product_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(*[getattr(Price, f) for f in PRICE_FIELDS])
+        .join(latest, (Price.product_id == latest.c.product_id) & (Price.effective_from == latest.c.effective_from))
+        .order_by(Price.product_id, Price.id)
+    )
+
+    # Rows come in id order, so the last one per product wins a tie
+    return {row.product_id: row._asdict() for row in rows}
+
+
+def current_prices(db: Session, product_ids):
+    """Current price per product (None if it has none), through price_cache."""
+    prices, missing = price_cache.get_many(set(product_ids))
+    if missing:
+        loaded = load_effective_prices(db, missing)
+        loaded = {pid: loaded.get(pid) for pid in missing}
+        price_cache.put_many(loaded)
+        prices.update(loaded)
+    return prices
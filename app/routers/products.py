@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Response, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from app.models.products import Product
 from app.models.brand import Brand
 from app.models.category import Category
@@ -7,10 +8,15 @@ from app.models.subcategory import SubCategory
 from app.schemas import products as schemas
 from app.core.config import settings
 from app.core.security import get_current_user  #  assuming you already have JWT auth here
-from app.core.database import get_db
-from typing import List
+from app.routers.list_utils import PageParams, page_params
+from app.routers.products_utils import ProductImporter, iter_import_rows
+from app.routers.images_utils import (
+    save_upload, generate_thumbnails, remove_image, stat_image, cached_file_response
+)
+from app.core.database import get_async_db
+from typing import List, Optional
 import os
-from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
 
 router = APIRouter(
     prefix="/products",
@@ -19,54 +25,68 @@ router = APIRouter(
 
 #  Create a new product
 @router.post("/", response_model=List[schemas.ProductResponse])
-def create_products(
+async def create_products(
     products: List[schemas.ProductCreate],
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
-    new_products = []
-    for product in products:
-        
-        # Validate brand
-        brand = db.query(Brand).filter(Brand.id == product.brand_id).first()
-        if not brand:
-            raise HTTPException(400, "Brand does not exist")
-
-        # Ensure uniqueness
-        exists = db.query(Product).filter(
-            (Product.prod_id == product.prod_id) |
-            (Product.sku == product.sku) |
-            (Product.upc == product.upc)
-        ).first()
-
-        if exists:
-            raise HTTPException(400, "Product with same prod_id/sku/upc exists")
-
-        new_prod = Product(**product.dict())
-        db.add(new_prod)
-        new_products.append(new_prod)
-        
-    db.commit()
-    for prod in new_products:
-        db.refresh(prod)
+    # Validate brands in one query
+    brand_ids = {p.brand_id for p in products}
+    known_brands = set((await db.scalars(select(Brand.id).where(Brand.id.in_(brand_ids)))).all())
+    if brand_ids - known_brands:
+        raise HTTPException(400, "Brand does not exist")
+
+    # Ensure uniqueness against the table and within the request, in one query
+    prod_ids = [p.prod_id for p in products]
+    skus = [p.sku for p in products]
+    upcs = [p.upc for p in products if p.upc is not None]
+
+    if len(set(prod_ids)) < len(prod_ids) or len(set(skus)) < len(skus) or len(set(upcs)) < len(upcs):
+        raise HTTPException(400, "Product with same prod_id/sku/upc exists")
+
+    exists = (await db.scalars(select(Product.id).where(
+        Product.prod_id.in_(prod_ids) |
+        Product.sku.in_(skus) |
+        Product.upc.in_(upcs)
+    ).limit(1))).first()
+
+    if exists:
+        raise HTTPException(400, "Product with same prod_id/sku/upc exists")
+
+    new_products = [Product(**product.dict()) for product in products]
+    db.add_all(new_products)
+
+    # Session does not expire on commit, so no per-row refresh is needed
+    await db.commit()
     return new_products
 
+#  Bulk import: JSON array, NDJSON (application/x-ndjson) or CSV (text/csv) body,
+#  parsed as it streams in. Rows are validated and inserted in chunks; bad rows
+#  (invalid JSON or UTF-8 included) are reported, good rows kept.
+@router.post("/import")
+async def import_products(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user)
+):
+    importer = ProductImporter(db)
+    return await importer.run(iter_import_rows(request))
+
 #  Get all products
 @router.get("/", response_model=list[schemas.ProductResponse])
-def get_products(db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
-    products = db.query(Product).all()
-    return products
+async def get_products(response: Response, page: PageParams = Depends(page_params), db: AsyncSession = Depends(get_async_db), current_user: dict = Depends(get_current_user)):
+    return await page.apply_async(db, select(Product), Product, schemas.ProductResponse, response)
 
 #  Get single product or filtered search
 @router.get("/filter", response_model=List[schemas.ProductResponse])
-def get_products(
+async def get_products(
     prod_id: str = None,
     brand_id: int = None,
     name: str = None,
     category_id: int = None,
     subcategory_id: int = None,
     sku: str = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -75,22 +95,22 @@ def get_products(
     Example: /products/filter?brand_id=1&category_id=2
     """
 
-    query = db.query(Product)
+    query = select(Product)
 
     if prod_id:
-        query = query.filter(Product.prod_id == prod_id)
+        query = query.where(Product.prod_id == prod_id)
     if brand_id:
-        query = query.filter(Product.brand_id == brand_id)
+        query = query.where(Product.brand_id == brand_id)
     if name:
-        query = query.filter(Product.name.ilike(f"%{name}%"))
+        query = query.where(Product.name.ilike(f"%{name}%"))
     if category_id:
-        query = query.filter(Product.category_id == category_id)
+        query = query.where(Product.category_id == category_id)
     if subcategory_id:
-        query = query.filter(Product.subcategory_id == subcategory_id)
+        query = query.where(Product.subcategory_id == subcategory_id)
     if sku:
-        query = query.filter(Product.sku == sku)
+        query = query.where(Product.sku == sku)
 
-    products = query.all()
+    products = (await db.scalars(query)).all()
 
     if not products:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No products found matching criteria")
@@ -99,25 +119,25 @@ def get_products(
 
 #  Update product by ID
 @router.put("/{product_id}", response_model=schemas.ProductResponse)
-def update_product(product_id: int, updated_data: schemas.ProductCreate, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
-    product = db.query(Product).filter(Product.id == product_id).first()
+async def update_product(product_id: int, updated_data: schemas.ProductCreate, db: AsyncSession = Depends(get_async_db), current_user: dict = Depends(get_current_user)):
+    product = await db.get(Product, product_id)
     if not product:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
     for key, value in updated_data.dict().items():
         setattr(product, key, value)
-    db.commit()
-    db.refresh(product)
+    await db.commit()
+    await db.refresh(product)
     return product
 
 
 #  Delete product
 @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_product(product_id: int, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
-    product = db.query(Product).filter(Product.id == product_id).first()
+async def delete_product(product_id: int, db: AsyncSession = Depends(get_async_db), current_user: dict = Depends(get_current_user)):
+    product = await db.get(Product, product_id)
     if not product:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
-    db.delete(product)
-    db.commit()
+    await db.delete(product)
+    await db.commit()
     return {"detail": "Product deleted successfully"}
 
 # Upload product image
@@ -125,50 +145,67 @@ def delete_product(product_id: int, db: Session = Depends(get_db), current_user:
 async def upload_product_image(
     product_id: int,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     # Find product
-    product = db.query(Product).filter(Product.id == product_id).first()
+    product = await db.get(Product, product_id)
     if not product:
         raise HTTPException(404, "Product not found")
 
     # Extract file extension
-    ext = file.filename.split(".")[-1]
+    ext = file.filename.rsplit(".", 1)[-1].lower()
+    if ext not in settings.PRODUCT_IMAGE_EXTENSIONS:
+        raise HTTPException(400, f"Unsupported image type '.{ext}'")
     filename = f"product_{product_id}.{ext}"
 
     # Correct upload folder from config
     file_path = settings.UPLOAD_FOLDER / filename
 
-    # Save the file
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
+    # Stream to a temp file (size-capped, must be an image), then rename into place
+    await save_upload(file, file_path, settings.PRODUCT_IMAGE_MAX_BYTES)
+
+    image_path = f"products/{filename}"
+    await run_in_threadpool(generate_thumbnails, image_path)
 
     # Store relative URL path in DB (best practice)
-    product.image_path = f"products/{filename}"
-    db.commit()
+    previous = product.image_path
+    product.image_path = image_path
+    await db.commit()
+
+    # Drop the previous image if the extension changed, once nothing points at it
+    if previous and previous != image_path:
+        await run_in_threadpool(remove_image, previous)
 
     return {
         "message": "Image uploaded successfully",
-        "image_url": f"/products/{product_id}/image"
+        "image_url": f"/products/{product_id}/image",
+        "thumbnail_urls": {
+            size: f"/products/{product_id}/image?size={size}"
+            for size in settings.PRODUCT_THUMBNAIL_SIZES
+        }
     }
 
-#retrieve product image
+#retrieve product image (or a pre-generated thumbnail with ?size=)
 @router.get("/{product_id}/image")
-def get_product_image(
+async def get_product_image(
     product_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    size: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
-    product = db.query(Product).filter(Product.id == product_id).first()
+    if size is not None and size not in settings.PRODUCT_THUMBNAIL_SIZES:
+        raise HTTPException(400, f"size must be one of {settings.PRODUCT_THUMBNAIL_SIZES}")
 
+    # Always from the row: a per-worker path cache would miss other workers' changes
+    product = await db.get(Product, product_id)
     if not product or not product.image_path:
         raise HTTPException(404, "Image not found")
 
-    # Build full absolute path
-    file_path = settings.BASE_DIR / "uploads" / product.image_path
-
-    if not os.path.exists(file_path):
+    found = await run_in_threadpool(stat_image, product.image_path, size)
+    if found is None:
         raise HTTPException(404, "File not found on server")
+    file_path, stat_result = found
 
-    return FileResponse(file_path)
+    return cached_file_response(request, file_path, stat_result)
@@ -0,0 +1,300 @@
+import codecs
+import csv
+import json
+
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy import select, insert, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.products import Product
+from app.models.brand import Brand
+from app.models.category import Category
+from app.models.subcategory import SubCategory
+from app.schemas.products import ProductCreate
+
+# Rows validated, inserted and committed together
+IMPORT_CHUNK_SIZE = 1000
+# A JSON array item still undecodable after this much text is rejected
+IMPORT_MAX_ROW_BYTES = 1024 * 1024
+BOM = b"\xef\xbb\xbf"
+
+NDJSON_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+CSV_TYPES = {"text/csv", "application/csv"}
+
+
+async def iter_body_lines(request: Request):
+    """Raw lines of the body (bytes, without line endings or a UTF-8 BOM)."""
+    buffer = b""
+    first = True
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if first:
+                line, first = line.removeprefix(BOM), False
+            yield line.rstrip(b"\r")
+    if buffer:
+        yield (buffer.removeprefix(BOM) if first else buffer).rstrip(b"\r")
+
+
+async def iter_json_array(request: Request):
+    """
+    Yield the items of a JSON array body one at a time, decoding as the body
+    streams in; only the item being parsed is buffered. Yields an error string
+    and stops at the first undecodable item, since the rest cannot be split.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8-sig")()
+    chunks = request.stream()
+    buffer, pos, eof = "", 0, False
+
+    async def more():
+        nonlocal buffer, pos, eof
+        try:
+            chunk = await anext(chunks)
+        except StopAsyncIteration:
+            eof = True
+            chunk = b""
+        buffer = buffer[pos:] + text.decode(chunk, final=eof)
+        pos = 0
+
+    async def next_char():
+        # First non-whitespace character from pos, or "" at the end of the body
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer) or eof:
+                return buffer[pos:pos + 1]
+            await more()
+
+    try:
+        if await next_char() != "[":
+            raise HTTPException(400, "Expected a JSON array of products")
+        pos += 1
+        if await next_char() == "]":
+            return
+
+        while True:
+            try:
+                # A complete item is followed by "," or "]"; a number cut off
+                # mid-chunk would decode too, so wait for that delimiter
+                item, end = decoder.raw_decode(buffer, pos)
+                if end == len(buffer) and not eof:
+                    raise ValueError("need more data")
+            except ValueError as e:
+                if eof or len(buffer) - pos > IMPORT_MAX_ROW_BYTES:
+                    yield f"Invalid JSON: {e}"
+                    return
+                await more()
+                continue
+
+            yield item
+            pos = end
+            delimiter = await next_char()
+            if delimiter == "]":
+                return
+            if delimiter != ",":
+                yield "Invalid JSON: expected ',' or ']' after an item"
+                return
+            pos += 1
+            await next_char()
+    except UnicodeDecodeError as e:
+        yield f"Invalid UTF-8: {e.reason}"
+
+
+def _decode(line: bytes):
+    try:
+        return line.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+
+
+async def iter_import_rows(request: Request):
+    """
+    Yield (row_number, data) from a JSON array, NDJSON or CSV body, picked by
+    Content-Type. data is a dict, or an error string for unparseable rows.
+    All three are read incrementally, never the whole body at once; CSV fields
+    must not contain newlines. A malformed JSON array item ends the import
+    there (rows before it are kept); NDJSON and CSV carry on with the next line.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    if content_type in NDJSON_TYPES:
+        row = 0
+        async for line in iter_body_lines(request):
+            if not line.strip():
+                continue
+            row += 1
+            text = _decode(line)
+            if text is None:
+                yield row, "Invalid UTF-8"
+                continue
+            try:
+                yield row, json.loads(text)
+            except ValueError as e:
+                yield row, f"Invalid JSON: {e}"
+
+    elif content_type in CSV_TYPES:
+        header = None
+        row = 0
+        async for line in iter_body_lines(request):
+            if not line.strip():
+                continue
+            text = _decode(line)
+            if header is None:
+                if text is None:
+                    raise HTTPException(400, "CSV header is not valid UTF-8")
+                header = [h.strip() for h in next(csv.reader([text]))]
+                continue
+            row += 1
+            if text is None:
+                yield row, "Invalid UTF-8"
+                continue
+            values = next(csv.reader([text]))
+            if len(values) != len(header):
+                yield row, "Column count does not match header"
+                continue
+            yield row, {k: (v if v != "" else None) for k, v in zip(header, values)}
+
+    else:
+        row = 0
+        async for item in iter_json_array(request):
+            row += 1
+            yield row, item
+
+
+def _validation_message(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+    )
+
+
+class ProductImporter:
+    """
+    Validates and inserts products chunk by chunk. Reference IDs and
+    duplicate keys are checked with one IN query per chunk; each chunk is
+    committed on its own, so good rows land even when others fail.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.total = 0
+        self.inserted = 0
+        self.errors = []
+        # Reference IDs already confirmed to exist
+        self.known = {Brand: set(), Category: set(), SubCategory: set()}
+        # Unique keys seen earlier in this import
+        self.seen = {"prod_id": set(), "sku": set(), "upc": set()}
+
+    async def run(self, rows):
+        chunk = []
+        async for row, data in rows:
+            self.total += 1
+            if isinstance(data, str):
+                self.errors.append({"row": row, "error": data})
+                continue
+            try:
+                chunk.append((row, ProductCreate.model_validate(data)))
+            except ValidationError as e:
+                self.errors.append({"row": row, "error": _validation_message(e)})
+                continue
+
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                await self._process(chunk)
+                chunk = []
+
+        if chunk:
+            await self._process(chunk)
+
+        return {
+            "total": self.total,
+            "inserted": self.inserted,
+            "failed": len(self.errors),
+            "errors": sorted(self.errors, key=lambda e: e["row"])
+        }
+
+    async def _known_ids(self, model, ids):
+        missing = {i for i in ids if i is not None} - self.known[model]
+        if missing:
+            found = await self.db.scalars(select(model.id).where(model.id.in_(missing)))
+            self.known[model].update(found.all())
+        return self.known[model]
+
+    async def _process(self, chunk):
+        brands = await self._known_ids(Brand, {p.brand_id for _, p in chunk})
+        categories = await self._known_ids(Category, {p.category_id for _, p in chunk})
+        subcategories = await self._known_ids(SubCategory, {p.subcategory_id for _, p in chunk})
+
+        keys = {
+            field: {getattr(p, field) for _, p in chunk if getattr(p, field) is not None}
+            for field in self.seen
+        }
+        existing = {field: set() for field in self.seen}
+        result = await self.db.execute(
+            select(Product.prod_id, Product.sku, Product.upc).where(or_(
+                Product.prod_id.in_(keys["prod_id"]),
+                Product.sku.in_(keys["sku"]),
+                Product.upc.in_(keys["upc"])
+            ))
+        )
+        for r in result:
+            for field in self.seen:
+                existing[field].add(getattr(r, field))
+
+        valid = []
+        for row, product in chunk:
+            error = None
+            if product.brand_id not in brands:
+                error = f"Brand {product.brand_id} does not exist"
+            elif product.category_id not in categories:
+                error = f"Category {product.category_id} does not exist"
+            elif product.subcategory_id not in subcategories:
+                error = f"Subcategory {product.subcategory_id} does not exist"
+            else:
+                for field in self.seen:
+                    value = getattr(product, field)
+                    if value is None:
+                        continue
+                    if value in existing[field]:
+                        error = f"Product with same {field} '{value}' exists"
+                        break
+                    if value in self.seen[field]:
+                        error = f"Duplicate {field} '{value}' earlier in this import"
+                        break
+
+            if error:
+                self.errors.append({"row": row, "prod_id": product.prod_id, "error": error})
+                continue
+
+            for field in self.seen:
+                value = getattr(product, field)
+                if value is not None:
+                    self.seen[field].add(value)
+            valid.append((row, product))
+
+        await self._insert(valid)
+
+    async def _insert(self, valid):
+        if not valid:
+            return
+
+        try:
+            await self.db.execute(insert(Product), [p.model_dump() for _, p in valid])
+            await self.db.commit()
+            self.inserted += len(valid)
+            return
+        except IntegrityError:
+            # Lost a race with a concurrent writer; find the offending rows
+            await self.db.rollback()
+
+        for row, product in valid:
+            try:
+                async with self.db.begin_nested():
+                    await self.db.execute(insert(Product), [product.model_dump()])
+                self.inserted += 1
+            except IntegrityError as e:
+                self.errors.append({"row": row, "prod_id": product.prod_id, "error": f"Rejected by database: {e.orig}"})
+        await self.db.commit()
@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Response, Query, Header
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError, IntegrityError
+from typing import List, Literal, Optional
+from datetime import date, timedelta
+import asyncio
+import random
 
 from app.models.sales import Sales
 from app.models.batch import Batch
@@ -9,12 +13,18 @@ from app.models.pallet import Pallet
 from app.models.consumer import Consumer
 from app.models.products import Product
 from app.models.batch_pallet import BatchPallet
+from app.models.product_stock import ProductStock
 
 from app.schemas.sales import SaleCreate, SaleResponse, SaleBulkRequest
-from app.core.database import get_db
-from app.core.security import get_current_user
+from app.core.config import settings
+from app.core.database import get_async_db, get_read_db
+from app.core.security import get_current_user, get_admin_user
+from app.routers.list_utils import PageParams, page_params
 
-from app.routers.sales_utils import get_batch_pallets_for_sale  # helper
+from app.routers.stock_utils import reconcile_product_stock
+from app.routers.idempotency_utils import request_hash, stored_response, claim_key, save_response
+from app.routers.analytics_utils import record_sale_change, sales_summary, top_products, warehouse_sales
+from app.routers.sales_utils import get_batch_pallets_for_sale, allocate_bulk_sale, is_lock_conflict, StockConflict  # helper
 
 router = APIRouter(
     prefix="/sales",
@@ -85,119 +95,113 @@ router = APIRouter(
 #     return sales_records
 
 @router.post("/bulk", response_model=List[SaleResponse])
-def create_bulk_sale(
+async def create_bulk_sale(
     request: SaleBulkRequest,
-    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
-    all_sales_records = []
-
-    for sale in request.sales:
-
-        # Validate product
-        product = db.query(Product).filter(Product.id == sale.product_id).first()
-        if not product:
-            raise HTTPException(404, f"Product {sale.product_id} not found")
-
-        # Validate consumer
-        consumer = db.query(Consumer).filter(Consumer.id == sale.consumer_id).first()
-        if not consumer:
-            raise HTTPException(400, f"Consumer {sale.consumer_id} not found")
-
-        # FIFO or FEFO batches/pallets
-        pallets = get_batch_pallets_for_sale(db, sale.product_id, fifo=sale.fifo)
-
-        if not pallets:
-            raise HTTPException(400, f"No stock for product {sale.product_id}")
-
-        qty_to_sell = sale.quantity_sold
-        
-        # Validate quantity does not exceed total available stock
-        available_stock = sum(bp.quantity_left for bp in pallets)
-
-        if sale.quantity_sold > available_stock:
-            raise HTTPException( 400,f"Requested quantity {sale.quantity_sold} exceeds available stock {available_stock} for product {sale.product_id}")
-
-        sales_records = []
-
-        for bp in pallets:
-            if qty_to_sell <= 0:
-                break
-
-            deduct = min(bp.quantity_left, qty_to_sell)
-
-            # Reduce pallet quantity
-            bp.quantity_left -= deduct
-
-            # Reduce batch quantity
-            batch = db.query(Batch).filter(Batch.id == bp.batch_id).first()
-            batch.quantity -= deduct
-
-            # Create sales record row
-            sale_entry = Sales(
-                batch_id=batch.id,
-                pallet_id=bp.pallet_id,
-                product_id=sale.product_id,
-                consumer_id=sale.consumer_id,
-                quantity_sold=deduct,
-                sale_price=sale.sale_price
+    # A retried request with the same Idempotency-Key gets the first result back
+    if idempotency_key:
+        digest = request_hash(request)
+        replay = await stored_response(db, current_user.id, idempotency_key, digest)
+        if replay:
+            return replay
+
+    # Retry the whole allocation when it loses a race on the same pallets
+    for attempt in range(settings.SALES_LOCK_RETRIES + 1):
+        try:
+            if idempotency_key:
+                await claim_key(db, current_user.id, idempotency_key, digest)
+
+            # Allocate every line in memory, write back with bulk statements
+            sales_records = await db.run_sync(
+                allocate_bulk_sale, request.sales,
+                lock_mode=settings.SALES_LOCK_MODE,
+                default_price_field=settings.SALES_DEFAULT_PRICE_FIELD
             )
-
-            db.add(sale_entry)
-            sales_records.append(sale_entry)
-            qty_to_sell -= deduct
-
-            # Remove empty pallet line
-            if bp.quantity_left == 0:
-                db.delete(bp)
-
-        if qty_to_sell > 0:
-            raise HTTPException(400, f"Not enough stock for product {sale.product_id}")
-
-        all_sales_records.extend(sales_records)
-
-    db.commit()
-
-    for s in all_sales_records:
-        db.refresh(s)
-
-    return all_sales_records
+            sale_ids = [s.id for s in sales_records]
+
+            # Load server defaults in one query before the result is stored
+            if sale_ids:
+                await db.execute(
+                    select(Sales)
+                    .where(Sales.id.in_(sale_ids))
+                    .execution_options(populate_existing=True)
+                )
+
+            if idempotency_key:
+                body = [SaleResponse.model_validate(s, from_attributes=True) for s in sales_records]
+                await save_response(db, current_user.id, idempotency_key, 200, body)
+
+            await db.commit()
+            break
+
+        except IntegrityError:
+            await db.rollback()
+            if not idempotency_key:
+                raise
+            # A concurrent duplicate committed first; answer with its result
+            replay = await stored_response(db, current_user.id, idempotency_key, digest)
+            if replay is None:
+                raise
+            return replay
+
+        except (OperationalError, StockConflict) as e:
+            await db.rollback()
+            if not is_lock_conflict(e):
+                raise
+            if attempt == settings.SALES_LOCK_RETRIES:
+                raise HTTPException(409, "Stock is being updated by another order, please retry")
+            await asyncio.sleep(random.uniform(0, 0.05 * 2 ** attempt))
+
+    return sales_records
 
 
 @router.get("/", response_model=List[SaleResponse])
-def get_all_sales(
-    db: Session = Depends(get_db),
+async def get_all_sales(
+    response: Response,
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)
 ):
-    return db.query(Sales).all()
+    return await page.apply_async(db, select(Sales), Sales, SaleResponse, response)
 
 @router.get("/{sale_id}", response_model=SaleResponse)
-def get_sale(
+async def get_sale(
     sale_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
-    sale = db.query(Sales).filter(Sales.id == sale_id).first()
+    sale = await db.get(Sales, sale_id)
     if not sale:
         raise HTTPException(404, "Sale not found")
     return sale
 
 @router.put("/{sale_id}", response_model=SaleResponse)
-def update_sale(
+async def update_sale(
     sale_id: int,
     updated: SaleCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
-    sale = db.query(Sales).filter(Sales.id == sale_id).first()
+    sale = await db.get(Sales, sale_id)
     if not sale:
         raise HTTPException(404, "Sale not found")
 
-    sale.consumer = updated.consumer
+    consumer = await db.get(Consumer, updated.consumer_id)
+    if not consumer:
+        raise HTTPException(400, "Consumer not found")
+
+    old_consumer_id, old_price = sale.consumer_id, sale.sale_price
+    sale.consumer_id = updated.consumer_id
     sale.sale_price = updated.sale_price
 
-    db.commit()
-    db.refresh(sale)
+    # Keep the daily rollups in step with the edit
+    await db.run_sync(record_sale_change, sale, old_consumer_id, old_price)
+
+    await db.commit()
+    await db.refresh(sale)
     return sale
 
 @router.delete("/{sale_id}", status_code=400)
@@ -206,95 +210,196 @@ def delete_sale_blocked():
 
 #get total stock for a product
 @router.get("/stock/total/{product_id}")
-def get_total_stock_only(
+async def get_total_stock_only(
     product_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
-    # Validate product
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
+    # Product name and maintained counter in one primary-key read
+    result = await db.execute(
+        select(Product.name, ProductStock.quantity)
+        .outerjoin(ProductStock, ProductStock.product_id == Product.id)
+        .where(Product.id == product_id)
+    )
+    row = result.first()
+    if not row:
         raise HTTPException(404, "Product not found")
 
-    # Get all batches
-    batches = db.query(Batch).filter(Batch.product_id == product_id).all()
-    if not batches:
-        return {
-            "product_id": product_id,
-            "product_name": product.name,
-            "total_stock": 0
-        }
+    return {
+        "product_id": product_id,
+        "product_name": row.name,
+        "total_stock": row.quantity or 0
+    }
 
-    batch_ids = [b.id for b in batches]
+# Detect (and repair) drift between product_stock and batch_pallet (admin only)
+@router.post("/stock/reconcile")
+async def reconcile_stock(
+    repair: bool = True,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_admin_user)
+):
+    return await db.run_sync(reconcile_product_stock, repair=repair)
+
+#get detailed stock for one or many products
+
+# Upper bound for /stock/details?product_ids=...
+MAX_STOCK_DETAIL_PRODUCTS = 500
+
+async def load_stock_details(db: AsyncSession, product_ids):
+    """
+    Product -> batches -> pallets for all product_ids in one joined query,
+    grouped in a single pass. Products that do not exist are left out.
+    """
+    result = await db.execute(
+        select(
+            Product.id.label("product_id"),
+            Product.name.label("product_name"),
+            Batch.id.label("batch_id"),
+            Batch.batch_no,
+            BatchPallet.id.label("batch_pallet_id"),
+            BatchPallet.pallet_id,
+            BatchPallet.quantity_left,
+            BatchPallet.stored_on
+        )
+        .outerjoin(Batch, Batch.product_id == Product.id)
+        .outerjoin(BatchPallet, BatchPallet.batch_id == Batch.id)
+        .where(Product.id.in_(product_ids))
+        .order_by(Product.id, Batch.id, BatchPallet.id)
+    )
 
-    # Get stock from BatchPallet
-    total_stock = (
-        db.query(func.sum(BatchPallet.quantity_left))
-        .filter(BatchPallet.batch_id.in_(batch_ids))
-        .scalar()
-    ) or 0
+    details = {}
+    batch = None
+
+    for row in result:
+        product = details.get(row.product_id)
+        if product is None:
+            product = details[row.product_id] = {
+                "product_id": row.product_id,
+                "product_name": row.product_name,
+                "total_stock": 0,
+                "batches": []
+            }
+            batch = None
+
+        # Product without any batch
+        if row.batch_id is None:
+            continue
+
+        if batch is None or batch["batch_id"] != row.batch_id:
+            batch = {
+                "batch_id": row.batch_id,
+                "batch_no": row.batch_no,
+                "batch_total": 0,
+                "pallets": []
+            }
+            product["batches"].append(batch)
+
+        # Batch not placed on any pallet
+        if row.batch_pallet_id is None:
+            continue
+
+        batch["pallets"].append({
+            "pallet_id": row.pallet_id,
+            "quantity_left": row.quantity_left,
+            "stored_on": row.stored_on
+        })
+        batch["batch_total"] += row.quantity_left or 0
+        product["total_stock"] += row.quantity_left or 0
+
+    return details
+
+
+@router.get("/stock/details")
+async def get_stock_details_many(
+    product_ids: str = Query(..., description="Comma-separated product IDs, e.g. 1,2,3"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user)
+):
+    try:
+        ids = list(dict.fromkeys(int(p) for p in product_ids.split(",") if p.strip()))
+    except ValueError:
+        raise HTTPException(400, "product_ids must be a comma-separated list of integers")
+
+    if not ids:
+        raise HTTPException(400, "product_ids is required")
+    if len(ids) > MAX_STOCK_DETAIL_PRODUCTS:
+        raise HTTPException(400, f"At most {MAX_STOCK_DETAIL_PRODUCTS} product_ids per request")
+
+    details = await load_stock_details(db, ids)
 
     return {
-        "product_id": product_id,
-        "product_name": product.name,
-        "total_stock": total_stock
+        "products": [details[pid] for pid in ids if pid in details],
+        "not_found": [pid for pid in ids if pid not in details]
     }
 
-#get detailed stock for a product
 
 @router.get("/stock/details/{product_id}")
-def get_stock_details(
+async def get_stock_details(
     product_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)
 ):
-    # Validate product
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
+    details = await load_stock_details(db, [product_id])
+    if product_id not in details:
         raise HTTPException(404, "Product not found")
 
-    # Fetch batches
-    batches = db.query(Batch).filter(Batch.product_id == product_id).all()
-    if not batches:
-        return {
-            "product_id": product_id,
-            "product_name": product.name,
-            "total_stock": 0,
-            "batches": []
-        }
-
-    batch_ids = [b.id for b in batches]
-
-    # Fetch pallet stock entries
-    batch_pallets = (
-        db.query(BatchPallet)
-        .filter(BatchPallet.batch_id.in_(batch_ids))
-        .all()
-    )
+    return details[product_id]
 
-    total_stock = sum(bp.quantity_left for bp in batch_pallets)
 
-    detailed = []
-    for batch in batches:
-        pallets_for_batch = [
-            {
-                "pallet_id": bp.pallet_id,
-                "quantity_left": bp.quantity_left,
-                "stored_on": bp.stored_on
-            }
-            for bp in batch_pallets if bp.batch_id == batch.id
-        ]
-
-        detailed.append({
-            "batch_id": batch.id,
-            "batch_no": batch.batch_no,
-            "batch_total": sum(p["quantity_left"] for p in pallets_for_batch),
-            "pallets": pallets_for_batch
-        })
+# Sales analytics, served from the daily rollup tables only
 
-    return {
-        "product_id": product_id,
-        "product_name": product.name,
-        "total_stock": total_stock,
-        "batches": detailed
-    }
+# Longest date range one analytics request may cover
+MAX_ANALYTICS_DAYS = 3660
+
+def analytics_range(
+    start_date: Optional[date] = Query(None, description="First day (inclusive), defaults to 30 days before end_date"),
+    end_date: Optional[date] = Query(None, description="Last day (inclusive), defaults to today"),
+):
+    end = end_date or date.today()
+    start = start_date or end - timedelta(days=30)
+    if start > end:
+        raise HTTPException(400, "start_date must not be after end_date")
+    if (end - start).days > MAX_ANALYTICS_DAYS:
+        raise HTTPException(400, f"Date range is limited to {MAX_ANALYTICS_DAYS} days")
+    return start, end
+
+
+@router.get("/analytics/summary")
+async def get_sales_summary(
+    product_id: Optional[int] = None,
+    consumer_id: Optional[int] = None,
+    group_by: Optional[Literal["day", "product", "consumer"]] = None,
+    date_range: tuple = Depends(analytics_range),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user)
+):
+    start, end = date_range
+    rows = await sales_summary(db, start, end, product_id, consumer_id, group_by)
+    return {"start_date": start, "end_date": end, "rows": rows}
+
+
+@router.get("/analytics/top-products")
+async def get_top_products(
+    n: int = Query(10, ge=1, le=1000),
+    by: Literal["revenue", "units"] = "revenue",
+    consumer_id: Optional[int] = None,
+    date_range: tuple = Depends(analytics_range),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user)
+):
+    start, end = date_range
+    rows = await top_products(db, start, end, n, by, consumer_id)
+    return {"start_date": start, "end_date": end, "by": by, "rows": rows}
+
+
+@router.get("/analytics/warehouses")
+async def get_warehouse_sales(
+    warehouse_id: Optional[int] = Query(None, description="0 = pallets without a warehouse"),
+    by_day: bool = False,
+    date_range: tuple = Depends(analytics_range),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user)
+):
+    start, end = date_range
+    rows = await warehouse_sales(db, start, end, warehouse_id, by_day)
+    return {"start_date": start, "end_date": end, "rows": rows}
@@ -1,6 +1,34 @@
+from collections import defaultdict
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, case, func
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
 from app.models.batch_pallet import BatchPallet
 from app.models.batch import Batch
+from app.models.consumer import Consumer
+from app.models.products import Product
+from app.models.sales import Sales
+from app.routers.stock_utils import adjust_product_stock
+from app.routers.analytics_utils import record_sales_rollups
+from app.routers.price_utils import current_prices
+from app.routers.outbox_utils import record_events, stock_event
+
+# MySQL error codes: lock wait timeout, deadlock
+LOCK_CONFLICT_CODES = {1205, 1213}
+
+
+class StockConflict(Exception):
+    """Stock changed underneath an allocation; the order can be retried."""
+
+
+def is_lock_conflict(exc: Exception) -> bool:
+    if isinstance(exc, StockConflict):
+        return True
+    if isinstance(exc, OperationalError) and exc.orig is not None and exc.orig.args:
+        return exc.orig.args[0] in LOCK_CONFLICT_CODES
+    return False
+
 
 def get_batch_pallets_for_sale(db: Session, product_id: int, fifo: bool):
 
@@ -29,3 +57,249 @@ def get_batch_pallets_for_sale(db: Session, product_id: int, fifo: bool):
             .order_by(Batch.expiry_date.asc())
             .all()
         )
+
+
+def batch_pallets_for_products_query(db: Session, product_ids, fifo: bool, lock_mode: str = "optimistic"):
+    """
+    Candidate pallet rows for many products in a single ordered query.
+    Rows come back grouped by product, in FIFO/FEFO order within each one.
+
+    Both orders are read straight from an index, without a sort:
+    FIFO from ix_batch_pallet_product_fifo alone, FEFO from
+    ix_batch_product_expiry joined to ix_batch_pallet_batch_stock (rows of
+    one batch share its expiry, so their order among themselves is free).
+
+    lock_mode "update" locks the rows (SELECT ... FOR UPDATE), "skip_locked"
+    leaves rows held by concurrent orders out, "optimistic" takes no locks.
+    """
+    if fifo:
+        query = (
+            db.query(
+                BatchPallet.id,
+                BatchPallet.batch_id,
+                BatchPallet.pallet_id,
+                BatchPallet.quantity_left,
+                BatchPallet.product_id
+            )
+            .filter(
+                BatchPallet.product_id.in_(product_ids),
+                BatchPallet.quantity_left > 0
+            )
+            .order_by(BatchPallet.product_id, BatchPallet.stored_on, BatchPallet.id)
+        )
+    else:
+        query = (
+            db.query(
+                BatchPallet.id,
+                BatchPallet.batch_id,
+                BatchPallet.pallet_id,
+                BatchPallet.quantity_left,
+                Batch.product_id
+            )
+            .join(Batch, Batch.id == BatchPallet.batch_id)
+            .filter(
+                Batch.product_id.in_(product_ids),
+                BatchPallet.quantity_left > 0
+            )
+            .order_by(Batch.product_id, Batch.expiry_date, Batch.id)
+        )
+
+    if lock_mode == "update":
+        query = query.with_for_update(of=BatchPallet)
+    elif lock_mode == "skip_locked":
+        query = query.with_for_update(of=BatchPallet, skip_locked=True)
+
+    return query
+
+
+def get_batch_pallets_for_products(db: Session, product_ids, fifo: bool, lock_mode: str = "optimistic"):
+    return batch_pallets_for_products_query(db, product_ids, fifo, lock_mode).all()
+
+
+def count_available_rows(db: Session, product_id: int) -> int:
+    """Pallet rows with stock for a product, read without locks."""
+    return (
+        db.query(func.count(BatchPallet.id))
+        .join(Batch, Batch.id == BatchPallet.batch_id)
+        .filter(
+            Batch.product_id == product_id,
+            BatchPallet.quantity_left > 0
+        )
+        .scalar()
+    )
+
+
+def check_skipped_rows(db: Session, product_id: int, candidates, lock_mode: str):
+    """
+    Under "skip_locked", rows held by other orders are missing from the
+    candidates. A line that looks short of stock is then contention, not a
+    shortage, so it is raised as StockConflict for the retry/409 path.
+    """
+    if lock_mode == "skip_locked" and count_available_rows(db, product_id) > len(candidates):
+        raise StockConflict(f"Stock for product {product_id} is held by a concurrent order")
+
+
+def allocate_bulk_sale(db: Session, sales, lock_mode: str = "optimistic", default_price_field: str = None):
+    """
+    Allocate every sale line against FIFO/FEFO stock in memory and write
+    the result back with bulk statements. Returns the flushed Sales rows;
+    the caller owns the commit.
+
+    Lines without a sale_price get the product's current default_price_field
+    ("mrp"/"mwp") from the price cache, when one is given.
+
+    Raises StockConflict in "optimistic" mode when a concurrent order drained
+    the same pallets first, and in "skip_locked" mode when a line is short
+    only because rows were skipped as locked.
+    """
+    product_ids = {s.product_id for s in sales}
+    consumer_ids = {s.consumer_id for s in sales}
+
+    known_products = {
+        pid for (pid,) in db.query(Product.id).filter(Product.id.in_(product_ids))
+    }
+    known_consumers = {
+        cid for (cid,) in db.query(Consumer.id).filter(Consumer.id.in_(consumer_ids))
+    }
+
+    # Default prices for lines sent without one (cache hits cost no query)
+    default_prices = {}
+    if default_price_field:
+        unpriced = {s.product_id for s in sales if s.sale_price is None} & known_products
+        if unpriced:
+            default_prices = {
+                pid: price[default_price_field]
+                for pid, price in current_prices(db, unpriced).items()
+                if price
+            }
+
+    # One ordered candidate query per allocation mode used in the request
+    candidates = defaultdict(list)
+    for fifo in {s.fifo for s in sales}:
+        ids = {s.product_id for s in sales if s.fifo == fifo} & known_products
+        if not ids:
+            continue
+        for row in get_batch_pallets_for_products(db, ids, fifo=fifo, lock_mode=lock_mode):
+            candidates[(row.product_id, fifo)].append(row)
+
+    # Shared across modes so repeated lines see earlier deductions
+    remaining = {
+        row.id: row.quantity_left
+        for rows in candidates.values()
+        for row in rows
+    }
+
+    pallet_deductions = defaultdict(int)
+    batch_deductions = defaultdict(int)
+    product_deductions = defaultdict(int)
+    sales_records = []
+
+    for sale in sales:
+
+        # Validate product
+        if sale.product_id not in known_products:
+            raise HTTPException(404, f"Product {sale.product_id} not found")
+
+        # Validate consumer
+        if sale.consumer_id not in known_consumers:
+            raise HTTPException(400, f"Consumer {sale.consumer_id} not found")
+
+        pallets = [
+            row for row in candidates[(sale.product_id, sale.fifo)]
+            if remaining[row.id] > 0
+        ]
+
+        if not pallets:
+            check_skipped_rows(db, sale.product_id, candidates[(sale.product_id, sale.fifo)], lock_mode)
+            raise HTTPException(400, f"No stock for product {sale.product_id}")
+
+        # Validate quantity does not exceed total available stock
+        available_stock = sum(remaining[row.id] for row in pallets)
+
+        if sale.quantity_sold > available_stock:
+            check_skipped_rows(db, sale.product_id, candidates[(sale.product_id, sale.fifo)], lock_mode)
+            raise HTTPException( 400,f"Requested quantity {sale.quantity_sold} exceeds available stock {available_stock} for product {sale.product_id}")
+
+        qty_to_sell = sale.quantity_sold
+        sale_price = sale.sale_price if sale.sale_price is not None else default_prices.get(sale.product_id)
+
+        for row in pallets:
+            if qty_to_sell <= 0:
+                break
+
+            deduct = min(remaining[row.id], qty_to_sell)
+
+            remaining[row.id] -= deduct
+            pallet_deductions[row.id] += deduct
+            batch_deductions[row.batch_id] += deduct
+            product_deductions[sale.product_id] -= deduct
+
+            sales_records.append(Sales(
+                batch_id=row.batch_id,
+                pallet_id=row.pallet_id,
+                product_id=sale.product_id,
+                consumer_id=sale.consumer_id,
+                quantity_sold=deduct,
+                sale_price=sale_price
+            ))
+
+            qty_to_sell -= deduct
+
+    if pallet_deductions:
+        bp_table = BatchPallet.__table__
+        batch_table = Batch.__table__
+
+        # Reduce pallet quantities
+        db.execute(
+            bp_table.update()
+            .where(bp_table.c.id == bindparam("bp_id"))
+            .values(quantity_left=bp_table.c.quantity_left - bindparam("deduct")),
+            [{"bp_id": k, "deduct": v} for k, v in pallet_deductions.items()]
+        )
+
+        # Reduce batch quantities
+        db.execute(
+            batch_table.update()
+            .where(batch_table.c.id == bindparam("b_id"))
+            .values(quantity=batch_table.c.quantity - bindparam("deduct")),
+            [{"b_id": k, "deduct": v} for k, v in batch_deductions.items()]
+        )
+
+        # Decrements are relative, so a concurrent order shows up as a negative
+        # balance, or as a missing row when it emptied the pallet and deleted
+        # it (the UPDATE then matched nothing)
+        if lock_mode == "optimistic":
+            found, oversold = (
+                db.query(
+                    func.count(BatchPallet.id),
+                    func.coalesce(func.sum(case((BatchPallet.quantity_left < 0, 1), else_=0)), 0)
+                )
+                .filter(BatchPallet.id.in_(list(pallet_deductions)))
+                .one()
+            )
+            if found != len(pallet_deductions) or oversold:
+                raise StockConflict("Pallet stock changed during allocation")
+
+        # Keep the per-product counter in the same transaction
+        adjust_product_stock(db, product_deductions)
+
+        # Remove empty pallet lines
+        db.execute(
+            bp_table.delete().where(
+                bp_table.c.id.in_(list(pallet_deductions)),
+                bp_table.c.quantity_left <= 0
+            )
+        )
+
+    # Daily rollups for /sales/analytics, committed with the sales
+    record_sales_rollups(db, sales_records)
+
+    db.add_all(sales_records)
+    db.flush()
+
+    record_events(db, [
+        stock_event("sale", s.product_id, -s.quantity_sold, batch_id=s.batch_id, pallet_id=s.pallet_id, ref_id=s.id)
+        for s in sales_records
+    ])
+
+    return sales_records
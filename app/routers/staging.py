@@ -1,15 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from typing import List, Optional, Union
 from datetime import datetime, date
 
 from app.models.staging import Staging, QCStatus as QCStatusEnum
 from app.models.products import Product
 from app.models.warehouse import Warehouse
-from app.schemas.staging import StagingCreate, StagingResponse, StagingQCUpdate, QCStatus, StagingBase
-from app.core.database import get_db
+from app.schemas.staging import StagingCreate, StagingResponse, StagingQCUpdate, StagingQCBulkUpdate, StagingCount, QCStatus, StagingBase
+from app.core.database import get_async_db, get_read_db
 from app.core.security import get_current_user
+from app.routers.list_utils import PageParams, page_params
+from app.routers.staging_utils import apply_bulk_qc
+from app.routers.outbox_utils import record_events, stock_event
 
 router = APIRouter(
     prefix="/staging",
@@ -21,18 +24,18 @@ router = APIRouter(
 # Only allows product, warehouse, invoice_no, total_quantity
 
 @router.post("/", response_model=StagingResponse, status_code=status.HTTP_201_CREATED)
-def create_staging_entry(
+async def create_staging_entry(
     staging_data: StagingBase,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
     # Validate product
-    product = db.query(Product).filter(Product.id == staging_data.product_id).first()
+    product = await db.get(Product, staging_data.product_id)
     if not product:
         raise HTTPException(status_code=400, detail="Product ID not found")
 
     # Validate warehouse
-    warehouse = db.query(Warehouse).filter(Warehouse.id == staging_data.warehouse_id).first()
+    warehouse = await db.get(Warehouse, staging_data.warehouse_id)
     if not warehouse:
         raise HTTPException(status_code=400, detail="Warehouse ID not found")
 
@@ -50,8 +53,8 @@ def create_staging_entry(
     )
 
     db.add(new_staging)
-    db.commit()
-    db.refresh(new_staging)
+    await db.commit()
+    await db.refresh(new_staging)
     return new_staging
 
 
@@ -59,13 +62,13 @@ def create_staging_entry(
 # Validates approved + rejected quantities against total_quantity from DB
 
 @router.patch("/{staging_id}/qc", response_model=StagingResponse)
-def update_qc(
+async def update_qc(
     staging_id: int,
     qc_data: StagingQCUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
-    staging = db.query(Staging).filter(Staging.id == staging_id).first()
+    staging = await db.get(Staging, staging_id)
     if not staging:
         raise HTTPException(status_code=404, detail="Staging entry not found")
 
@@ -79,29 +82,105 @@ def update_qc(
     staging.approved_quantity = qc_data.approved_quantity
     staging.rejected_quantity = qc_data.rejected_quantity
 
-    db.commit()
-    db.refresh(staging)
+    await db.run_sync(record_events, [stock_event(
+        "qc", staging.product_id, qc_data.approved_quantity,
+        warehouse_id=staging.warehouse_id, ref_id=staging.id
+    )])
+
+    await db.commit()
+    await db.refresh(staging)
     return staging
 
+# Bulk QC for many rows (e.g. a whole invoice_no) in one transaction
+# Optionally promotes approved quantities to batches and pallet placements
+
+@router.post("/qc/bulk", response_model=List[StagingResponse])
+async def bulk_update_qc(
+    qc_data: StagingQCBulkUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user)
+):
+    if qc_data.putaway and not qc_data.create_batches:
+        raise HTTPException(status_code=400, detail="putaway requires create_batches")
+
+    staging_ids = await db.run_sync(apply_bulk_qc, qc_data)
+    await db.commit()
+
+    result = await db.scalars(
+        select(Staging)
+        .where(Staging.id.in_(staging_ids))
+        .order_by(Staging.id)
+        .execution_options(populate_existing=True)
+    )
+    return result.all()
+
 # Get all staged entries
 # Returns all staging records including QC and quantities
 
 @router.get("/", response_model=List[StagingResponse])
-def get_all_staged_items(
-    db: Session = Depends(get_db),
+async def get_all_staged_items(
+    response: Response,
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user)
+):
+    return await page.apply_async(db, select(Staging), Staging, StagingResponse, response)
+
+# Filter staging entries
+# Declared before /{staging_id} so the path parameter route does not shadow it
+# Keyset paginated (?after_id=&limit=), ?count_only=true returns just the count
+
+@router.get("/filter", response_model=Union[List[StagingResponse], StagingCount])
+async def filter_staging_entries(
+    response: Response,
+    qc_status: Optional[QCStatus] = Query(None, description="Filter by QC status"),
+    invoice_no: Optional[str] = Query(None, description="Filter by invoice number"),
+    product_id: Optional[int] = Query(None, description="Filter by product ID"),
+    warehouse_id: Optional[int] = Query(None, description="Filter by warehouse ID"),
+    date: Optional[date] = Query(None, description="Filter by exact received_on date"),
+    start_date: Optional[datetime] = Query(None, description="Filter received_on from this date (inclusive)"),
+    end_date: Optional[datetime] = Query(None, description="Filter received_on up to this date (inclusive)"),
+    count_only: bool = Query(False, description="Return only the number of matching entries"),
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)
 ):
-    return db.query(Staging).all()
+    filters = []
+
+    # Apply filters
+    if qc_status:
+        filters.append(Staging.qc_status == QCStatusEnum[qc_status.name])
+    if invoice_no:
+        filters.append(Staging.invoice_no == invoice_no)
+    if product_id:
+        filters.append(Staging.product_id == product_id)
+    if warehouse_id:
+        filters.append(Staging.warehouse_id == warehouse_id)
+
+    # Date filter logic (received_on is a DATE column, so compare dates)
+    if date:
+        filters.append(Staging.received_on == date)
+    else:
+        if start_date:
+            filters.append(Staging.received_on >= start_date.date())
+        if end_date:
+            filters.append(Staging.received_on <= end_date.date())
+
+    if count_only:
+        count = await db.scalar(select(func.count(Staging.id)).where(*filters))
+        return {"count": count}
+
+    return await page.apply_async(db, select(Staging).where(*filters), Staging, StagingResponse, response)
 
 # Get a specific staging entry by ID
 
 @router.get("/{staging_id}", response_model=StagingResponse)
-def get_staging_entry(
+async def get_staging_entry(
     staging_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
-    staging = db.query(Staging).filter(Staging.id == staging_id).first()
+    staging = await db.get(Staging, staging_id)
     if not staging:
         raise HTTPException(status_code=404, detail="Staging entry not found")
     return staging
@@ -110,75 +189,35 @@ def get_staging_entry(
 # QC fields cannot be updated here
 
 @router.put("/{staging_id}", response_model=StagingResponse)
-def update_staging_entry(
+async def update_staging_entry(
     staging_id: int,
     updated_data: StagingCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
-    staging = db.query(Staging).filter(Staging.id == staging_id).first()
+    staging = await db.get(Staging, staging_id)
     if not staging:
         raise HTTPException(status_code=404, detail="Staging entry not found")
 
     for key, value in updated_data.dict().items():
         setattr(staging, key, value)
 
-    db.commit()
-    db.refresh(staging)
+    await db.commit()
+    await db.refresh(staging)
     return staging
 
 # Delete a staging entry
 
 @router.delete("/{staging_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_staging_entry(
+async def delete_staging_entry(
     staging_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user)
 ):
-    staging = db.query(Staging).filter(Staging.id == staging_id).first()
+    staging = await db.get(Staging, staging_id)
     if not staging:
         raise HTTPException(status_code=404, detail="Staging entry not found")
 
-    db.delete(staging)
-    db.commit()
+    await db.delete(staging)
+    await db.commit()
     return {"detail": "Staging entry deleted successfully"}
-
-# Filter staging entries
-@router.get("/filter", response_model=List[StagingResponse])
-def filter_staging_entries(
-    qc_status: Optional[QCStatus] = Query(None, description="Filter by QC status"),
-    invoice_no: Optional[str] = Query(None, description="Filter by invoice number"),
-    product_id: Optional[int] = Query(None, description="Filter by product ID"),
-    warehouse_id: Optional[int] = Query(None, description="Filter by warehouse ID"),
-    date: Optional[date] = Query(None, description="Filter by exact received_on date"),
-    start_date: Optional[datetime] = Query(None, description="Filter received_on from this date (inclusive)"),
-    end_date: Optional[datetime] = Query(None, description="Filter received_on up to this date (inclusive)"),
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
-):
-    query = db.query(Staging)
-
-    # Apply filters
-    if qc_status:
-        query = query.filter(Staging.qc_status == QCStatusEnum[qc_status.name])
-    if invoice_no:
-        query = query.filter(Staging.invoice_no == invoice_no)
-    if product_id:
-        query = query.filter(Staging.product_id == product_id)
-    if warehouse_id:
-        query = query.filter(Staging.warehouse_id == warehouse_id)
-
-    # Date filter logic
-    if date:
-        # Filter by exact date ignoring time
-        query = query.filter(
-            Staging.received_on == date
-        )
-    else:
-        if start_date:
-            query = query.filter(Staging.received_on >= start_date)
-        if end_date:
-            query = query.filter(Staging.received_on <= end_date)
-
-    results = query.all()
-    return results
\ No newline at end of file
@@ -0,0 +1,207 @@
+import calendar
+from datetime import datetime, date
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.batch import Batch
+from app.models.products import Product
+from app.models.staging import Staging, QCStatus as QCStatusEnum
+from app.routers.placement_utils import place_batches, plan_putaway
+from app.routers.outbox_utils import record_events, stock_event
+from app.schemas.batch_pallet import BatchPalletCreate
+
+
+def add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    year = day.year + month // 12
+    month = month % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def _qc_values(row, item, qc_status):
+    """(status, approved, rejected) for one staging row."""
+    if item is not None:
+        return QCStatusEnum[item.qc_status.name], item.approved_quantity, item.rejected_quantity
+
+    # Whole-row decision from the request-level status
+    status = QCStatusEnum[qc_status.name]
+    total = row.total_quantity or 0
+    if status == QCStatusEnum.APPROVED:
+        return status, total, 0
+    if status == QCStatusEnum.REJECTED:
+        return status, 0, total
+    return status, 0, 0
+
+
+def apply_bulk_qc(db: Session, data):
+    """
+    QC many staging rows in one pass: validate every row, write the QC
+    fields with one executemany UPDATE and, when asked, turn approved
+    quantities into batches and pallet placements. Returns the staging IDs
+    touched; the caller owns the commit.
+    """
+    items = {item.staging_id: item for item in data.items}
+
+    selectors = []
+    if data.invoice_no:
+        selectors.append(Staging.invoice_no == data.invoice_no)
+    if items:
+        selectors.append(Staging.id.in_(list(items)))
+    if not selectors:
+        raise HTTPException(400, "Give an invoice_no or staging items")
+
+    rows = db.scalars(
+        select(Staging).where(or_(*selectors)).order_by(Staging.id).with_for_update()
+    ).all()
+    if not rows:
+        raise HTTPException(404, "No staging entries found")
+
+    errors = [
+        f"Staging {sid}: not found" for sid in items
+        if sid not in {row.id for row in rows}
+    ]
+
+    # Products of the rows that may become batches, checked per row below
+    products = {}
+    if data.create_batches:
+        products = {
+            p.id: p for p in db.execute(
+                select(Product.id, Product.sku, Product.expiry_in_months)
+                .where(Product.id.in_({row.product_id for row in rows if row.product_id is not None}))
+            )
+        }
+
+    now = datetime.utcnow()
+    updates = []
+    events = []
+    promoted = []  # (staging row, item, approved quantity)
+
+    for row in rows:
+        item = items.get(row.id)
+        if item is None and data.qc_status is None:
+            errors.append(f"Staging {row.id}: no QC decision given")
+            continue
+
+        status, approved, rejected = _qc_values(row, item, data.qc_status)
+
+        if approved < 0 or rejected < 0:
+            errors.append(f"Staging {row.id}: quantities must not be negative")
+            continue
+        if approved + rejected > (row.total_quantity or 0):
+            errors.append(f"Staging {row.id}: sum of approved and rejected exceeds total quantity")
+            continue
+
+        if data.create_batches and approved > 0:
+            # Stock is only created once per receipt
+            if row.qc_status != QCStatusEnum.HOLD:
+                errors.append(f"Staging {row.id}: already QC'd, batch not created again")
+                continue
+            if row.product_id not in products:
+                errors.append(f"Staging {row.id}: product {row.product_id} not found, batch not created")
+                continue
+            promoted.append((row, item, approved))
+
+        events.append(stock_event(
+            "qc", row.product_id, approved, warehouse_id=row.warehouse_id, ref_id=row.id
+        ))
+        updates.append({
+            "s_id": row.id,
+            "qc_status": status,
+            "qc_done_on": now,
+            "approved_quantity": approved,
+            "rejected_quantity": rejected
+        })
+
+    if errors:
+        raise HTTPException(400, errors)
+
+    table = Staging.__table__
+    db.execute(
+        table.update()
+        .where(table.c.id == bindparam("s_id"))
+        .values(
+            qc_status=bindparam("qc_status"),
+            qc_done_on=bindparam("qc_done_on"),
+            approved_quantity=bindparam("approved_quantity"),
+            rejected_quantity=bindparam("rejected_quantity")
+        ),
+        updates
+    )
+
+    if promoted:
+        _promote(db, promoted, products, data.putaway, events)
+
+    # Recorded last, after every lock wait in the promotion, so event ids and
+    # created_at are stamped as close to the commit as possible
+    record_events(db, events)
+
+    return [u["s_id"] for u in updates]
+
+
+def _promote(db: Session, promoted, products, putaway: bool, events: list):
+    """
+    Create one batch per approved staging row, then place them on pallets.
+    products maps product id to (id, sku, expiry_in_months) for every row.
+    Stock events are appended to `events` for the caller to record.
+    """
+    new_batches = []
+    for row, item, approved in promoted:
+        product = products[row.product_id]
+        expiry = item.expiry_date if item and item.expiry_date else None
+        if expiry is None and product.expiry_in_months:
+            expiry = add_months(row.received_on, product.expiry_in_months)
+
+        new_batches.append({
+            "batch_no": item.batch_no if item and item.batch_no else f"{row.invoice_no}-{row.id}",
+            "product_id": row.product_id,
+            "manufacture_date": item.manufacture_date if item else None,
+            "expiry_date": expiry,
+            "quantity": approved,
+            "status": True,
+            "sku": item.sku if item and item.sku else product.sku
+        })
+
+    batch_nos = [b["batch_no"] for b in new_batches]
+    if len(set(batch_nos)) != len(batch_nos):
+        raise HTTPException(400, "Duplicate batch_no in request")
+
+    taken = db.scalars(select(Batch.batch_no).where(Batch.batch_no.in_(batch_nos))).all()
+    if taken:
+        raise HTTPException(400, [f"Batch {no} already exists" for no in taken])
+
+    # One executemany insert, then one lookup for the generated IDs
+    db.execute(insert(Batch), new_batches)
+    batch_ids = dict(db.execute(select(Batch.batch_no, Batch.id).where(Batch.batch_no.in_(batch_nos))).all())
+    events.extend(
+        stock_event("batch_created", b["product_id"], b["quantity"], batch_id=batch_ids[b["batch_no"]])
+        for b in new_batches
+    )
+
+    # Explicit pallets first, in one validated bulk placement
+    placements = [
+        BatchPalletCreate(batch_id=batch_ids[batch["batch_no"]], pallet_id=item.pallet_id, quantity_left=approved)
+        for (row, item, approved), batch in zip(promoted, new_batches)
+        if item and item.pallet_id
+    ]
+    if placements:
+        place_batches(db, placements, events)
+
+    if not putaway:
+        return
+
+    # Then plan the rest; each plan sees the placements flushed before it
+    for (row, item, approved), batch in zip(promoted, new_batches):
+        if item and item.pallet_id:
+            continue
+
+        batch_row = db.get(Batch, batch_ids[batch["batch_no"]])
+        plan, unplaced = plan_putaway(db, batch_row, row.warehouse_id, approved)
+        if unplaced:
+            raise HTTPException(400, f"Staging {row.id}: warehouse has no room for {unplaced} of {approved} units")
+
+        place_batches(db, [
+            BatchPalletCreate(batch_id=batch_row.id, pallet_id=pallet_id, quantity_left=qty)
+            for pallet_id, qty, _ in plan
+        ], events)
@@ -0,0 +1,106 @@
+from sqlalchemy import func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.models.batch_pallet import BatchPallet
+from app.models.batch import Batch
+from app.models.product_stock import ProductStock
+
+
+def _upsert_product_stock(db: Session, values: dict, increment: bool):
+    table = ProductStock.__table__
+
+    # Sorted so concurrent writers take row locks in the same order
+    rows = [
+        {"product_id": pid, "quantity": qty}
+        for pid, qty in sorted(values.items())
+    ]
+    if not rows:
+        return
+
+    if db.get_bind().dialect.name == "mysql":
+        stmt = mysql_insert(table)
+        new_qty = stmt.inserted.quantity
+        stmt = stmt.on_duplicate_key_update(
+            quantity=(table.c.quantity + new_qty) if increment else new_qty,
+            updated_at=func.now()
+        )
+    else:
+        stmt = sqlite_insert(table)
+        new_qty = stmt.excluded.quantity
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.product_id],
+            set_={
+                "quantity": (table.c.quantity + new_qty) if increment else new_qty,
+                "updated_at": func.now()
+            }
+        )
+
+    db.execute(stmt, rows)
+
+
+def adjust_product_stock(db: Session, deltas: dict):
+    """
+    Apply per-product stock deltas ({product_id: +/-qty}) to product_stock
+    inside the caller's transaction.
+    """
+    _upsert_product_stock(
+        db,
+        {pid: qty for pid, qty in deltas.items() if pid is not None and qty},
+        increment=True
+    )
+
+
+def _pallet_stock_by_product(db: Session, product_ids=None, lock: bool = False):
+    query = (
+        db.query(Batch.product_id, func.sum(BatchPallet.quantity_left))
+        .join(Batch, Batch.id == BatchPallet.batch_id)
+        .filter(Batch.product_id.isnot(None))
+    )
+    if product_ids is not None:
+        query = query.filter(Batch.product_id.in_(product_ids))
+    if lock:
+        # Current read; blocks sales on these pallets until the repair commits
+        query = query.with_for_update(read=True)
+
+    return {
+        pid: int(total or 0)
+        for pid, total in query.group_by(Batch.product_id)
+    }
+
+
+def reconcile_product_stock(db: Session, repair: bool = True):
+    """
+    Compare product_stock with the live SUM over batch_pallet and, when
+    repair is set, overwrite drifted rows with the recomputed totals.
+    """
+    actual = _pallet_stock_by_product(db)
+    stored = dict(db.query(ProductStock.product_id, ProductStock.quantity))
+
+    drift = [
+        {
+            "product_id": pid,
+            "expected": actual.get(pid, 0),
+            "stored": stored.get(pid)
+        }
+        for pid in sorted(actual.keys() | stored.keys())
+        if actual.get(pid, 0) != stored.get(pid)
+    ]
+
+    if repair and drift:
+        # Start a fresh transaction so the recount sees committed sales
+        db.rollback()
+        drifted = [d["product_id"] for d in drift]
+        recount = _pallet_stock_by_product(db, drifted, lock=True)
+        _upsert_product_stock(
+            db,
+            {pid: recount.get(pid, 0) for pid in drifted},
+            increment=False
+        )
+        db.commit()
+
+    return {
+        "checked": len(actual.keys() | stored.keys()),
+        "drift": drift,
+        "repaired": bool(repair and drift)
+    }
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List, Literal
 from datetime import datetime
 
 class BatchPalletBase(BaseModel):
@@ -10,6 +10,32 @@ class BatchPalletBase(BaseModel):
 class BatchPalletCreate(BatchPalletBase):
     pass
 
+# Place one or many batches onto many pallets in one call
+class BatchPalletBulkCreate(BaseModel):
+    placements: List[BatchPalletCreate]
+
+# Let the server pick pallets for a batch in a warehouse
+class PutawayRequest(BaseModel):
+    batch_id: int
+    warehouse_id: int
+    quantity: Optional[int] = None  # default: the batch's unplaced quantity
+    strategy: Literal["best_fit", "first_fit"] = "best_fit"
+    commit: bool = False
+
+class PutawayPlacement(BaseModel):
+    pallet_id: int
+    quantity: int
+    free_capacity: int
+
+class PutawayResponse(BaseModel):
+    batch_id: int
+    warehouse_id: int
+    strategy: str
+    quantity: int
+    unplaced: int
+    committed: bool
+    placements: List[PutawayPlacement]
+
 class BatchPalletResponse(BatchPalletBase):
     id: int
     stored_on: datetime
@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime
+
+class StockEvent(BaseModel):
+    id: int
+    seq: int
+    event_type: str
+    product_id: Optional[int] = None
+    batch_id: Optional[int] = None
+    pallet_id: Optional[int] = None
+    warehouse_id: Optional[int] = None
+    quantity: int
+    ref_id: Optional[int] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class StockEventPage(BaseModel):
+    events: List[StockEvent]
+    next_after: int
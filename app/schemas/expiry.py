@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import date, datetime
+
+# Stock of one batch in one warehouse inside an expiry window
+class ExpiringStock(BaseModel):
+    batch_id: int
+    batch_no: str
+    product_id: int
+    warehouse_id: Optional[int] = None
+    expiry_date: date
+    days_left: int
+    quantity: int
+
+# Precomputed near-expiry bucket
+class ExpiryBucketResponse(BaseModel):
+    warehouse_id: Optional[int] = None
+    product_id: int
+    bucket: str
+    quantity: int
+    batch_count: int
+    computed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,39 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime
+
+class StockMovementResponse(BaseModel):
+    id: int
+    movement_type: str
+    product_id: Optional[int] = None
+    batch_id: Optional[int] = None
+    pallet_id: Optional[int] = None
+    quantity: int
+    ref_id: Optional[int] = None
+    occurred_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class StockSnapshotResponse(BaseModel):
+    id: int
+    cutoff: datetime
+    taken_at: datetime
+    lines: int
+
+    class Config:
+        from_attributes = True
+
+class PalletStockAt(BaseModel):
+    pallet_id: int
+    quantity: int
+
+class ProductStockAt(BaseModel):
+    product_id: int
+    total: int
+    pallets: List[PalletStockAt]
+
+class StockAtResponse(BaseModel):
+    at: datetime
+    snapshot: StockSnapshotResponse
+    products: List[ProductStockAt]
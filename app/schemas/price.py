@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 class PriceBase(BaseModel):
@@ -14,6 +14,16 @@ class PriceUpdate(BaseModel):
     mrp: Optional[float] = None
     mwp: Optional[float] = None
 
+class CurrentPrice(PriceBase):
+    id: int
+    effective_from: datetime
+    updated_at: Optional[datetime] = None
+
+class CurrentPriceResponse(BaseModel):
+    at: Optional[datetime] = None
+    prices: List[CurrentPrice]
+    not_found: List[int]
+
 class PriceResponse(PriceBase):
     id: int
     effective_from: datetime
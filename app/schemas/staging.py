@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime, date
-from typing import Optional
+from typing import Optional, List
 from enum import Enum
 
 # QCStatus Enum for Pydantic
@@ -32,6 +32,28 @@ class StagingQCUpdate(BaseModel):
     approved_quantity: int
     rejected_quantity: int
 
+# One row in a bulk QC request; batch fields apply when batches are created
+class StagingQCBulkItem(StagingQCUpdate):
+    staging_id: int
+    batch_no: Optional[str] = None
+    sku: Optional[str] = None
+    manufacture_date: Optional[date] = None
+    expiry_date: Optional[date] = None
+    pallet_id: Optional[int] = None
+
+# Bulk QC: rows of an invoice and/or listed rows in one transaction
+# qc_status without an item approves/rejects the whole row quantity
+class StagingQCBulkUpdate(BaseModel):
+    invoice_no: Optional[str] = None
+    qc_status: Optional[QCStatus] = None
+    items: List[StagingQCBulkItem] = []
+    create_batches: bool = False
+    putaway: bool = False
+
+# Count-only result of /staging/filter
+class StagingCount(BaseModel):
+    count: int
+
 # Schema for API response
 # Includes all fields
 class StagingResponse(StagingBase):
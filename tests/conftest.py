@@ -0,0 +1,107 @@
+import os
+import tempfile
+
+# Settings and engines are built when app is imported, so point them at a
+# throwaway database first. TEST_DATABASE_URL runs the suite against MySQL.
+_tmp = tempfile.mkdtemp(prefix="np-tests-")
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL", f"sqlite:///{_tmp}/test.db")
+os.environ["BASE_DIR"] = _tmp
+os.environ["UPLOAD_FOLDER"] = os.path.join(_tmp, "uploads", "products")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+for name in ("ASYNC_DATABASE_URL", "READ_DATABASE_URL", "OUTBOX_SINK_URL", "USER_CACHE_URL"):
+    os.environ.pop(name, None)
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.database import Base, engine, SessionLocal
+from app.core.security import get_current_user
+from app.core.price_cache import price_cache
+from app.core.user_cache import user_cache
+from app.models.user import User
+
+
+def is_sqlite() -> bool:
+    return engine.dialect.name == "sqlite"
+
+
+@pytest.fixture(autouse=True)
+def fresh_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    price_cache.clear()
+    user_cache.clear()
+    yield
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def admin():
+    return User(id=1, username="admin", email="admin@example.com", role="admin", is_active=True)
+
+
+@pytest.fixture
+def client(admin):
+    # No `with`: the lifespan (background jobs) stays off in tests
+    app.dependency_overrides[get_current_user] = lambda: admin
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def stock(client):
+    """
+    Three products, a consumer, four pallets (capacity 100) in one warehouse
+    and three batches. Product 1: batch 1 on pallets 1 (30) and 2 (20),
+    batch 2 on pallet 3 (50). Product 2: batch 3 on pallet 1 (30).
+    """
+    client.post("/categories/", json={"name": "c"})
+    client.post("/companies/", json={"name": "co"})
+    client.post("/brands/", json={"name": "b", "company_id": 1})
+    client.post("/subcategories/", json={"name": "s", "category_id": 1})
+    client.post("/warehouse/", json={"name": "w", "location": "l", "address": "a"})
+    r = client.post("/products/", json=[
+        {"prod_id": f"P{i}", "name": f"p{i}", "brand_id": 1, "category_id": 1,
+         "subcategory_id": 1, "sku": f"S{i}", "upc": f"U{i}"}
+        for i in range(3)
+    ])
+    assert r.status_code == 200, r.text
+    client.post("/consumers/", json={"name": "x"})
+    for i in range(4):
+        r = client.post("/pallets/", json={"pallet_id": f"PL{i}", "capacity": 100, "warehouse_id": 1})
+        assert r.status_code == 201, r.text
+    r = client.post("/batches/", json=[
+        {"batch_no": "B1", "product_id": 1, "quantity": 50, "expiry_date": "2030-01-01", "sku": "S0"},
+        {"batch_no": "B2", "product_id": 1, "quantity": 50, "expiry_date": "2029-01-01", "sku": "S0"},
+        {"batch_no": "B3", "product_id": 2, "quantity": 30, "expiry_date": "2029-01-01", "sku": "S1"},
+    ])
+    assert r.status_code == 200, r.text
+    for batch_id, pallet_id, qty in [(1, 1, 30), (1, 2, 20), (2, 3, 50), (3, 1, 30)]:
+        r = client.post("/batch-pallet/", json={"batch_id": batch_id, "pallet_id": pallet_id, "quantity_left": qty})
+        assert r.status_code == 200, r.text
+
+
+def sell(client, *lines, **kwargs):
+    """POST /sales/bulk with (product_id, quantity) lines for consumer 1."""
+    return client.post("/sales/bulk", json={"sales": [
+        {"product_id": pid, "consumer_id": 1, "quantity_sold": qty, "sale_price": 1.0}
+        for pid, qty in lines
+    ]}, **kwargs)
+
+
+@pytest.fixture
+def as_user(admin):
+    """Switch the client to a non-admin user for the rest of the test."""
+    def switch():
+        user = User(id=2, username="clerk", email="clerk@example.com", role="user", is_active=True)
+        app.dependency_overrides[get_current_user] = lambda: user
+        return user
+    return switch
@@ -0,0 +1,106 @@
+"""
+EXPLAIN regression tests for the FIFO/FEFO allocation queries: each must be
+served from its composite indexes without sorting the candidates. Runs
+EXPLAIN QUERY PLAN on SQLite, or EXPLAIN on MySQL with TEST_DATABASE_URL.
+"""
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, text
+
+from app.core.database import engine
+from app.models.batch import Batch
+from app.models.batch_pallet import BatchPallet
+from app.routers.sales_utils import batch_pallets_for_products_query
+from tests.conftest import is_sqlite
+
+BATCHES_PER_PRODUCT = 300
+
+
+@pytest.fixture
+def large_stock(stock, db):
+    """Enough rows per product that the planner has a real choice to make."""
+    batch_rows, pallet_rows = [], []
+    next_batch_id = 100
+    for product_id in (1, 2, 3):
+        for i in range(BATCHES_PER_PRODUCT):
+            next_batch_id += 1
+            batch_rows.append({
+                "id": next_batch_id, "batch_no": f"L{next_batch_id}", "product_id": product_id,
+                "quantity": 30, "expiry_date": date(2030, 1, 1) + timedelta(days=i % 97), "sku": "S"
+            })
+            for pallet_id in (1, 2, 3):
+                pallet_rows.append({
+                    "batch_id": next_batch_id, "pallet_id": pallet_id, "product_id": product_id,
+                    "quantity_left": 10 if i % 5 else 0,
+                    "stored_on": datetime(2025, 1, 1) + timedelta(minutes=i * 3 + pallet_id)
+                })
+    db.execute(insert(Batch), batch_rows)
+    db.execute(insert(BatchPallet), pallet_rows)
+    db.commit()
+
+    if is_sqlite():
+        db.execute(text("ANALYZE"))
+    else:
+        db.execute(text("ANALYZE TABLE batch, batch_pallet"))
+    db.commit()
+
+
+def explain(db, query):
+    sql = str(query.statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    if is_sqlite():
+        return [row.detail for row in db.execute(text("EXPLAIN QUERY PLAN " + sql))]
+    return [dict(row._mapping) for row in db.execute(text("EXPLAIN " + sql))]
+
+
+def assert_plan(plan, indexes):
+    if is_sqlite():
+        joined = " | ".join(plan)
+        for table, index in indexes.items():
+            assert f"SEARCH {table} USING COVERING INDEX {index}" in joined, joined
+        assert "TEMP B-TREE" not in joined, joined
+    else:
+        assert {row["table"]: row["key"] for row in plan} == indexes, plan
+        for row in plan:
+            extra = row.get("Extra") or ""
+            assert "filesort" not in extra and "temporary" not in extra, plan
+
+
+@pytest.mark.parametrize("product_ids", [[1], [1, 2, 3]])
+@pytest.mark.parametrize("lock_mode", ["optimistic", "update"])
+def test_fifo_candidates_use_product_fifo_index(large_stock, db, product_ids, lock_mode):
+    plan = explain(db, batch_pallets_for_products_query(db, product_ids, fifo=True, lock_mode=lock_mode))
+    assert_plan(plan, {"batch_pallet": "ix_batch_pallet_product_fifo"})
+
+
+@pytest.mark.parametrize("product_ids", [[1], [1, 2, 3]])
+@pytest.mark.parametrize("lock_mode", ["optimistic", "update"])
+def test_fefo_candidates_use_expiry_and_stock_indexes(large_stock, db, product_ids, lock_mode):
+    plan = explain(db, batch_pallets_for_products_query(db, product_ids, fifo=False, lock_mode=lock_mode))
+    assert_plan(plan, {"batch": "ix_batch_product_expiry", "batch_pallet": "ix_batch_pallet_batch_stock"})
+
+
+def test_candidate_order_is_fifo_and_fefo_per_product(large_stock, db):
+    fifo = batch_pallets_for_products_query(db, [1, 2], fifo=True).all()
+    assert [r.product_id for r in fifo] == sorted(r.product_id for r in fifo)
+    stored = {r.id: r for r in db.query(BatchPallet.id, BatchPallet.stored_on)}
+    for product_id in (1, 2):
+        keys = [(stored[r.id].stored_on, r.id) for r in fifo if r.product_id == product_id]
+        assert keys == sorted(keys)
+
+    fefo = batch_pallets_for_products_query(db, [1, 2], fifo=False).all()
+    expiry = dict(db.query(Batch.id, Batch.expiry_date))
+    for product_id in (1, 2):
+        dates = [expiry[r.batch_id] for r in fefo if r.product_id == product_id]
+        assert dates == sorted(dates) and len(dates) > 0
+    assert all(r.quantity_left > 0 for r in fifo + fefo)
+
+
+def test_product_copy_follows_batch_reassignment(client, stock, db):
+    r = client.put("/batches/3", json={"batch_no": "B3", "product_id": 1, "quantity": 30,
+                                        "expiry_date": "2029-01-01", "sku": "S1"})
+    assert r.status_code == 200, r.text
+
+    rows = batch_pallets_for_products_query(db, [1, 2], fifo=True).all()
+    assert {r.batch_id for r in rows if r.product_id == 1} == {1, 2, 3}
+    assert not [r for r in rows if r.product_id == 2]
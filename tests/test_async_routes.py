@@ -0,0 +1,40 @@
+import anyio.to_thread
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.database import to_async_url
+from app.core.security import create_access_token
+from app.main import app
+from app.models.user import User
+
+
+@pytest.mark.parametrize("url,driver", [
+    ("sqlite:///x.db", "sqlite+aiosqlite"),
+    ("mysql+pymysql://u:p@h/np", "mysql+aiomysql"),
+    ("mysql://u:p@h/np", "mysql+aiomysql"),
+    ("postgresql+asyncpg://u:p@h/np", "postgresql+asyncpg"),
+])
+def test_async_url(url, driver):
+    assert to_async_url(url).drivername == driver
+
+
+def test_hot_routes_stay_off_the_threadpool(stock, db, monkeypatch):
+    db.add(User(username="root", email="root@x", password="x", role="admin"))
+    db.commit()
+    # Real token authentication instead of the fixture's sync override
+    monkeypatch.setattr(app, "dependency_overrides", {})
+    client = TestClient(app, headers={"Authorization": f"Bearer {create_access_token({'sub': 'root'})}"})
+
+    async def no_threadpool(*args, **kwargs):
+        raise AssertionError("request took a threadpool slot")
+
+    # Authentication, sales, stock and product routes all run on the event loop
+    monkeypatch.setattr(anyio.to_thread, "run_sync", no_threadpool)
+    assert client.get("/sales/stock/total/1").json()["total_stock"] == 100
+    assert client.get("/sales/stock/details/1").status_code == 200
+    assert len(client.get("/products/").json()) == 3
+    r = client.post("/sales/bulk", json={"sales": [
+        {"product_id": 1, "consumer_id": 1, "quantity_sold": 5, "sale_price": 1.0}
+    ]})
+    assert r.status_code == 200, r.text
+    assert client.get("/sales/stock/total/1").json()["total_stock"] == 95
@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.core.config import settings
+from app.core.database import async_engine, engine
+from app.core.pool_metrics import InstrumentedQueuePool, instrument_pool, pool_status
+
+
+def test_pool_settings_are_applied():
+    for pool in (engine.pool, async_engine.sync_engine.pool):
+        assert pool.size() == settings.DB_POOL_SIZE
+        assert pool._max_overflow == settings.DB_MAX_OVERFLOW
+        assert pool._timeout == settings.DB_POOL_TIMEOUT
+        assert pool._recycle == settings.DB_POOL_RECYCLE
+        assert pool._pre_ping == settings.DB_POOL_PRE_PING
+
+
+def test_db_pool_endpoint_counts_checkouts(client, stock):
+    def pools():
+        r = client.get("/monitoring/db-pool")
+        assert r.status_code == 200
+        return {p["name"]: p for p in r.json()["pools"]}
+
+    before = pools()
+    assert set(before) == {"primary", "primary_async"}
+    assert client.get("/sales/stock/total/1").status_code == 200
+
+    after = pools()["primary_async"]
+    assert after["checkouts"] > before["primary_async"]["checkouts"]
+    assert after["size"] == settings.DB_POOL_SIZE and after["checked_out"] == 0
+
+
+def test_overflow_and_timeouts_are_counted(tmp_path):
+    name = f"test_{tmp_path.name}"
+    small = create_engine(f"sqlite:///{tmp_path}/pool.db", poolclass=InstrumentedQueuePool,
+                          pool_size=1, max_overflow=1, pool_timeout=0.05, pool_logging_name=name)
+    instrument_pool(small, name)
+
+    first, second = small.connect(), small.connect()
+    with pytest.raises(PoolTimeoutError):
+        small.connect()
+    first.close()
+    second.close()
+
+    stats = pool_status(small, name)
+    assert (stats["checkouts"], stats["overflow_checkouts"], stats["timeouts"]) == (2, 1, 1)
+    assert stats["connects"] == 2 and stats["checked_out"] == 0
+    small.dispose()
@@ -0,0 +1,73 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import insert
+
+from app.core.config import Settings
+from app.models.batch import Batch
+from app.models.batch_pallet import BatchPallet
+from app.models.expiry_bucket import ExpiryBucket
+from app.routers.expiry_utils import refresh_expiry_buckets_job
+
+
+@pytest.fixture
+def expiring(stock, db):
+    """Batches of product 3 expiring in 5 and 20 days and one expired, plus one without a product."""
+    today = date.today()
+    rows = [(10, 3, 5, 4, 10), (11, 3, 20, 4, 7), (12, 3, -1, 4, 3), (13, None, 5, 4, 9)]
+    db.execute(insert(Batch), [
+        {"id": bid, "batch_no": f"E{bid}", "product_id": pid, "quantity": qty,
+         "expiry_date": today + timedelta(days=days), "sku": "S2"}
+        for bid, pid, days, _, qty in rows
+    ])
+    db.execute(insert(BatchPallet), [
+        {"batch_id": bid, "pallet_id": pallet_id, "product_id": pid, "quantity_left": qty}
+        for bid, pid, _, pallet_id, qty in rows
+    ])
+    db.commit()
+
+
+def buckets(client):
+    return [(b["product_id"], b["bucket"], b["quantity"], b["batch_count"])
+            for b in client.get("/batches/expiring/buckets").json()]
+
+
+def test_refresh_buckets(client, expiring):
+    r = client.post("/batches/expiring/buckets/refresh")
+    assert r.json() == {"buckets": 3}
+    assert buckets(client) == [(3, "0-7", 10, 1), (3, "8-30", 7, 1), (3, "expired", 3, 1)]
+
+
+def test_expiring_skips_batches_without_product(client, expiring):
+    r = client.get("/batches/expiring", params={"days": 30, "include_expired": True})
+    assert r.status_code == 200, r.text
+    assert [(row["batch_no"], row["days_left"]) for row in r.json()] == [("E12", -1), ("E10", 5), ("E11", 20)]
+
+
+def test_job_skips_a_fresh_rebuild(client, expiring, db):
+    def computed_at():
+        db.expire_all()
+        return {at for (at,) in db.query(ExpiryBucket.computed_at)}
+
+    asyncio.run(refresh_expiry_buckets_job())
+    first = computed_at()
+    assert len(first) == 1 and db.query(ExpiryBucket).count() == 3
+
+    # Another worker's tick right after rebuilds nothing
+    asyncio.run(refresh_expiry_buckets_job())
+    assert computed_at() == first
+
+    # Once the rebuild is stale the job runs again
+    stale = datetime.utcnow() - timedelta(hours=1)
+    db.query(ExpiryBucket).update({"computed_at": stale})
+    db.commit()
+    asyncio.run(refresh_expiry_buckets_job())
+    assert computed_at() not in ({stale}, first)
+
+
+@pytest.mark.parametrize("days", [[], [-1, 7]])
+def test_bucket_days_must_be_bounds(days):
+    with pytest.raises(ValidationError):
+        Settings(EXPIRY_BUCKET_DAYS=days)
@@ -0,0 +1,82 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.models.idempotency_key import IdempotencyKey
+from app.models.sales import Sales
+from app.routers import sales as sales_router
+from app.routers.idempotency_utils import REPLAYED_HEADER, purge_idempotency_keys_job
+from tests.conftest import sell
+
+
+def stock_of(client, product_id):
+    return client.get(f"/sales/stock/total/{product_id}").json()["total_stock"]
+
+
+def test_same_key_replays_the_first_result(client, stock, db):
+    first = sell(client, (1, 40), headers={"Idempotency-Key": "k1"})
+    assert first.status_code == 200, first.text
+    assert REPLAYED_HEADER not in first.headers
+
+    again = sell(client, (1, 40), headers={"Idempotency-Key": "k1"})
+    assert again.status_code == 200
+    assert again.headers[REPLAYED_HEADER] == "true"
+    assert again.json() == first.json()
+
+    # Stock was only taken once
+    assert stock_of(client, 1) == 60
+    assert db.query(Sales).count() == len(first.json())
+
+
+def test_key_reused_for_another_body(client, stock):
+    assert sell(client, (1, 5), headers={"Idempotency-Key": "k1"}).status_code == 200
+    r = sell(client, (1, 6), headers={"Idempotency-Key": "k1"})
+    assert r.status_code == 422
+    assert stock_of(client, 1) == 95
+
+
+def test_failed_request_does_not_use_up_the_key(client, stock, db):
+    assert sell(client, (1, 500), headers={"Idempotency-Key": "k1"}).status_code == 400
+    assert db.query(IdempotencyKey).count() == 0
+
+    r = sell(client, (1, 5), headers={"Idempotency-Key": "k1"})
+    assert r.status_code == 200 and REPLAYED_HEADER not in r.headers
+
+
+def test_keys_are_per_user(client, stock, as_user):
+    assert sell(client, (1, 5), headers={"Idempotency-Key": "k1"}).status_code == 200
+    as_user()
+    r = sell(client, (1, 5), headers={"Idempotency-Key": "k1"})
+    assert r.status_code == 200 and REPLAYED_HEADER not in r.headers
+    assert stock_of(client, 1) == 90
+
+
+def test_concurrent_duplicate_replays(client, stock, db, monkeypatch):
+    first = sell(client, (1, 40), headers={"Idempotency-Key": "k1"})
+
+    # The duplicate read the key before the first request committed, so it
+    # goes on to claim it, hits the committed row and answers with its result
+    real = sales_router.stored_response
+    calls = []
+
+    async def raced(*args):
+        calls.append(args)
+        return None if len(calls) == 1 else await real(*args)
+
+    monkeypatch.setattr(sales_router, "stored_response", raced)
+
+    r = sell(client, (1, 40), headers={"Idempotency-Key": "k1"})
+    assert r.status_code == 200, r.text
+    assert r.headers[REPLAYED_HEADER] == "true"
+    assert r.json() == first.json()
+    assert len(calls) == 2
+    assert stock_of(client, 1) == 60
+
+
+def test_purge_expired_keys(client, stock, db):
+    sell(client, (1, 1), headers={"Idempotency-Key": "old"})
+    sell(client, (1, 1), headers={"Idempotency-Key": "new"})
+    db.query(IdempotencyKey).filter_by(key="old").update({"created_at": datetime.utcnow() - timedelta(days=30)})
+    db.commit()
+
+    asyncio.run(purge_idempotency_keys_job())
+    assert [k for (k,) in db.query(IdempotencyKey.key)] == ["new"]
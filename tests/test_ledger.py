@@ -0,0 +1,114 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.models.batch_pallet import BatchPallet
+from app.models.stock_ledger import StockMovement, StockSnapshot, StockSnapshotLine
+from app.routers.ledger_utils import take_snapshot_job
+from tests.conftest import sell
+
+
+@pytest.fixture(autouse=True)
+def no_settle(monkeypatch):
+    monkeypatch.setattr(settings, "LEDGER_SNAPSHOT_SETTLE_SECONDS", 0)
+
+
+def snapshot(client):
+    r = client.post("/ledger/snapshots")
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def stock_at(client, at, **params):
+    return client.get("/ledger/stock", params={"at": at.isoformat(), **params})
+
+
+def pallets(response):
+    assert response.status_code == 200, response.text
+    return {(p["product_id"], pl["pallet_id"]): pl["quantity"]
+            for p in response.json()["products"] for pl in p["pallets"]}
+
+
+LIVE = {(1, 1): 30, (1, 2): 20, (1, 3): 50, (2, 1): 30}
+
+
+def test_replay_against_snapshots(client, stock):
+    baseline = snapshot(client)
+    assert baseline["lines"] == 4
+
+    assert sell(client, (1, 35)).status_code == 200  # pallet 1: 30, pallet 2: 5
+    mid = datetime.utcnow()
+    assert sell(client, (2, 10)).status_code == 200
+
+    r = stock_at(client, mid)
+    assert r.json()["snapshot"]["id"] == baseline["id"]
+    assert pallets(r) == {(1, 2): 15, (1, 3): 50, (2, 1): 30}
+
+    second = snapshot(client)
+    assert sell(client, (1, 5)).status_code == 200
+
+    now = datetime.utcnow()
+    r = stock_at(client, now)
+    assert r.json()["snapshot"]["id"] == second["id"]
+    assert pallets(r) == {(1, 2): 10, (1, 3): 50, (2, 1): 20}
+
+    # Earlier times still replay from the older snapshot
+    assert pallets(stock_at(client, mid)) == {(1, 2): 15, (1, 3): 50, (2, 1): 30}
+    assert pallets(stock_at(client, now, product_ids="2")) == {(2, 1): 20}
+    assert pallets(stock_at(client, now, pallet_id=3)) == {(1, 3): 50}
+
+
+def test_before_the_oldest_snapshot_is_404(client, stock):
+    assert stock_at(client, datetime.utcnow()).status_code == 404
+
+    baseline = snapshot(client)
+    r = stock_at(client, datetime.fromisoformat(baseline["cutoff"]) - timedelta(seconds=1))
+    assert r.status_code == 404
+    assert "No stock history before" in r.json()["detail"]
+    assert pallets(stock_at(client, datetime.fromisoformat(baseline["cutoff"]))) == LIVE
+
+
+def test_late_commit_behind_the_first_baseline(client, stock, db, monkeypatch):
+    monkeypatch.setattr(settings, "LEDGER_SNAPSHOT_SETTLE_SECONDS", 60)
+    taken = datetime.utcnow()
+    baseline = snapshot(client)
+    assert datetime.fromisoformat(baseline["cutoff"]) <= taken - timedelta(seconds=59)
+
+    # A sale stamped before the baseline was taken, committed only after it
+    db.query(BatchPallet).filter_by(id=1).update({"quantity_left": 25})
+    db.add(StockMovement(movement_type="sale", product_id=1, batch_id=1, pallet_id=1,
+                         quantity=-5, occurred_at=taken - timedelta(seconds=1)))
+    db.commit()
+
+    assert pallets(stock_at(client, datetime.utcnow())) == {**LIVE, (1, 1): 25}
+
+
+def test_superseded_snapshots_are_pruned(client, stock, db, monkeypatch):
+    first, second = snapshot(client), snapshot(client)
+    assert sell(client, (1, 5)).status_code == 200
+
+    # Both outside the window: only the newest of them is still needed
+    old = datetime.utcnow() - timedelta(hours=settings.LEDGER_SNAPSHOT_RETENTION_HOURS + 2)
+    db.query(StockSnapshot).filter_by(id=first["id"]).update({"cutoff": old})
+    db.query(StockSnapshot).filter_by(id=second["id"]).update({"cutoff": old + timedelta(hours=1)})
+    db.commit()
+
+    monkeypatch.setattr(settings, "LEDGER_SNAPSHOT_INTERVAL_SECONDS", 0)
+    asyncio.run(take_snapshot_job())
+
+    db.expire_all()
+    kept = [s for (s,) in db.query(StockSnapshot.id).order_by(StockSnapshot.id)]
+    assert first["id"] not in kept and second["id"] in kept and len(kept) == 2
+    assert db.query(StockSnapshotLine).filter_by(snapshot_id=first["id"]).count() == 0
+
+    assert stock_at(client, old).status_code == 404
+    r = stock_at(client, old + timedelta(hours=1))
+    assert r.json()["snapshot"]["id"] == second["id"]
+    assert pallets(r) == LIVE
+
+
+def test_snapshots_are_admin_only(client, stock, as_user):
+    as_user()
+    assert client.post("/ledger/snapshots").status_code == 403
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from app.models.pallet import Pallet
+from app.routers import list_utils
+
+TOTAL = 4 + 150
+
+
+@pytest.fixture
+def pallets(stock, db):
+    # 150 more pallets on top of the 4 in stock: more than one default page
+    db.add_all(Pallet(pallet_id=f"X{i}", capacity=10, warehouse_id=1) for i in range(150))
+    db.commit()
+
+
+def ids(r):
+    assert r.status_code == 200, r.text
+    return [row["id"] for row in r.json()]
+
+
+@pytest.mark.parametrize("route", ["/pallets/", "/products/"])
+def test_no_paging_params_return_the_whole_list(client, pallets, route):
+    r = client.get(route)
+    expected = TOTAL if route == "/pallets/" else 3
+    assert ids(r) == list(range(1, expected + 1))
+    assert "X-Next-After-Id" not in r.headers
+
+
+def test_keyset_continuation(client, pallets):
+    seen, after_id, pages = [], 0, 0
+    while True:
+        r = client.get("/pallets/", params={"after_id": after_id, "limit": 40})
+        page = ids(r)
+        seen += page
+        pages += 1
+        if "X-Next-After-Id" not in r.headers:
+            break
+        after_id = int(r.headers["X-Next-After-Id"])
+        assert after_id == page[-1] and len(page) == 40
+
+    assert seen == list(range(1, TOTAL + 1))
+    assert pages == 4
+
+
+def test_after_id_alone_uses_the_default_page_size(client, pallets):
+    r = client.get("/pallets/", params={"after_id": 10})
+    assert ids(r) == list(range(11, 11 + list_utils.DEFAULT_PAGE_SIZE))
+    assert r.headers["X-Next-After-Id"] == str(10 + list_utils.DEFAULT_PAGE_SIZE)
+
+    # The last page is exactly full: no further cursor
+    r = client.get("/pallets/", params={"after_id": TOTAL - 5, "limit": 5})
+    assert ids(r) == list(range(TOTAL - 4, TOTAL + 1))
+    assert "X-Next-After-Id" not in r.headers
+
+
+@pytest.mark.parametrize("route,expected", [("/pallets/", TOTAL), ("/products/", 3)])
+def test_stream_ndjson(client, pallets, route, expected):
+    # Sync (pallets) and async (products) streams
+    r = client.get(route, params={"stream": True, "after_id": 1})
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [row["id"] for row in rows] == list(range(2, expected + 1))
+    assert "X-Next-After-Id" not in r.headers
@@ -0,0 +1,162 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.database import async_engine
+from app.core.outbox import FileSink, OutboxPublisher, sequence_outbox_job
+from app.models.outbox import OutboxEvent
+from tests.conftest import sell
+
+
+def sequence():
+    asyncio.run(sequence_outbox_job())
+
+
+def events(client, **params):
+    r = client.get("/events/", params=params)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_unsequenced_events_are_held_back(client, stock):
+    assert sell(client, (1, 5)).status_code == 200
+    assert events(client) == {"events": [], "next_after": 0}
+    assert events(client, after=7) == {"events": [], "next_after": 7}
+
+    sequence()
+    assert events(client)["events"]
+
+
+def test_cursor_pages_through_events(client, stock):
+    assert sell(client, (1, 40), (2, 10)).status_code == 200
+    sequence()
+
+    seen, after = [], 0
+    while True:
+        page = events(client, after=after, limit=3)
+        if not page["events"]:
+            assert page["next_after"] == after
+            break
+        seen += page["events"]
+        after = page["next_after"]
+        assert after == seen[-1]["seq"]
+
+    assert [e["seq"] for e in seen] == list(range(1, len(seen) + 1))
+    assert [e["event_type"] for e in seen].count("placement") == 4
+    assert [(e["product_id"], e["quantity"]) for e in seen if e["event_type"] == "sale"] == [(1, -30), (1, -10), (2, -10)]
+
+    sales = events(client, event_type="sale", product_id=2)["events"]
+    assert [(e["pallet_id"], e["quantity"]) for e in sales] == [(1, -10)]
+
+
+def test_late_commit_below_the_cursor_is_still_delivered(client, stock, db):
+    assert sell(client, (1, 5)).status_code == 200
+    sequence()
+    after = events(client)["next_after"]
+
+    # A transaction that took its id early commits only now, below the
+    # highest id already served
+    first = db.query(OutboxEvent).order_by(OutboxEvent.id).first()
+    db.delete(first)
+    db.commit()
+    db.add(OutboxEvent(id=first.id, event_type="adjustment", product_id=3, quantity=7,
+                       created_at=datetime.utcnow() - timedelta(minutes=5)))
+    db.commit()
+    assert first.id < after
+
+    sequence()
+    late = events(client, after=after)
+    assert [(e["id"], e["event_type"]) for e in late["events"]] == [(first.id, "adjustment")]
+    assert late["next_after"] == after + 1
+
+
+def test_staging_events_recorded_together_at_the_end(client, stock, db):
+    r = client.post("/staging/", json={"product_id": 3, "warehouse_id": 1, "invoice_no": "INV1",
+                                       "received_on": "2026-01-10", "total_quantity": 120})
+    staging_id = r.json()["id"]
+    sequence()
+    before = events(client)["next_after"]
+
+    r = client.post("/staging/qc/bulk", json={"invoice_no": "INV1", "qc_status": "APPROVED",
+                                               "create_batches": True, "putaway": True})
+    assert r.status_code == 200, r.text
+
+    sequence()
+    new = events(client, after=before)["events"]
+    assert [e["event_type"] for e in new] == ["qc", "batch_created", "placement", "placement"]
+    assert new[0]["ref_id"] == staging_id
+    # One insert after the placements: consecutive ids, one timestamp
+    assert [e["id"] for e in new] == list(range(new[0]["id"], new[0]["id"] + 4))
+    assert len({e["created_at"] for e in new}) == 1
+
+
+class RecordingSink:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+        self.checked_out = []
+
+    def send(self, events):
+        self.checked_out.append(async_engine.sync_engine.pool.checkedout())
+        if self.fail:
+            raise ConnectionError("sink down")
+        self.batches.append([e["id"] for e in events])
+
+
+def outbox(db):
+    db.expire_all()
+    return {e.id: (e.published_at is not None, e.claimed_until is not None) for e in db.query(OutboxEvent)}
+
+
+def test_publisher_delivers_without_holding_a_connection(stock, db):
+    sink = RecordingSink()
+    total = db.query(OutboxEvent).count()
+    publisher = OutboxPublisher(sink, batch_size=3)
+
+    asyncio.run(publisher.publish_pending())
+    assert [i for batch in sink.batches for i in batch] == list(range(1, total + 1))
+    assert all(len(batch) <= 3 for batch in sink.batches)
+    # The claim was committed and its connection returned before every send
+    assert set(sink.checked_out) == {0}
+    assert all(published for published, _ in outbox(db).values())
+
+    asyncio.run(publisher.publish_pending())
+    assert len(sink.batches) == (total + 2) // 3
+    assert publisher.status()["published"] == total
+
+
+def test_failed_delivery_is_retried(stock, db):
+    publisher = OutboxPublisher(RecordingSink(fail=True), batch_size=100)
+    with pytest.raises(ConnectionError):
+        asyncio.run(publisher.publish_pending())
+    # The claim is handed back
+    assert set(outbox(db).values()) == {(False, False)}
+
+    publisher.sink = RecordingSink()
+    asyncio.run(publisher.publish_pending())
+    assert set(outbox(db).values()) == {(True, True)}
+
+
+def test_claimed_events_are_skipped_until_the_claim_runs_out(stock, db):
+    db.query(OutboxEvent).update({"claimed_until": datetime.utcnow() + timedelta(minutes=5)})
+    db.commit()
+
+    sink = RecordingSink()
+    asyncio.run(OutboxPublisher(sink, batch_size=100).publish_pending())
+    assert sink.batches == []
+
+    # A worker died holding the claim: another one delivers the batch again
+    db.query(OutboxEvent).update({"claimed_until": datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+    asyncio.run(OutboxPublisher(sink, batch_size=100).publish_pending())
+    assert len(sink.batches) == 1
+
+
+def test_file_sink(tmp_path, stock):
+    path = tmp_path / "events" / "out.ndjson"
+    asyncio.run(OutboxPublisher(FileSink(str(path)), batch_size=100).publish_pending())
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert lines and {"id", "event_type", "created_at"} <= set(lines[0])
+    assert "claimed_until" not in lines[0] and "seq" not in lines[0]
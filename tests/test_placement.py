@@ -0,0 +1,52 @@
+import pytest
+
+from app.models.batch_pallet import BatchPallet
+
+
+@pytest.fixture
+def new_batch(client, stock):
+    """Batch 4: 100 units of product 3, not placed yet."""
+    r = client.post("/batches/", json=[{"batch_no": "B4", "product_id": 3, "quantity": 100,
+                                        "expiry_date": "2031-01-01", "sku": "S2"}])
+    assert r.status_code == 200, r.text
+    return r.json()[0]["id"]
+
+
+def bulk(client, *placements):
+    return client.post("/batch-pallet/bulk", json={"placements": [
+        {"batch_id": b, "pallet_id": p, "quantity_left": q} for b, p, q in placements
+    ]})
+
+
+def test_bulk_placement_in_one_transaction(client, new_batch, db):
+    r = bulk(client, (new_batch, 2, 40), (new_batch, 4, 60))
+    assert r.status_code == 200, r.text
+    assert [(e["pallet_id"], e["quantity_left"]) for e in r.json()] == [(2, 40), (4, 60)]
+    assert all(e["stored_on"] for e in r.json())
+    assert client.get("/sales/stock/total/3").json()["total_stock"] == 100
+
+
+def test_all_errors_reported_and_nothing_written(client, new_batch, db):
+    before = db.query(BatchPallet).count()
+    r = bulk(client, (999, 4, 1), (new_batch, 9, 1), (new_batch, 4, 0), (1, 1, 1), (new_batch, 1, 50))
+    assert r.status_code == 400
+    errors = r.json()["detail"]
+    assert any("batch 999 does not exist" in e for e in errors)
+    assert any("pallet 9 does not exist" in e for e in errors)
+    assert any("quantity must be positive" in e for e in errors)
+    assert any("already stored" in e for e in errors)
+    # Pallet 1 holds 60 of 100 already
+    assert any("Pallet 1" in e and "exceeds capacity" in e for e in errors)
+    assert db.query(BatchPallet).count() == before
+
+
+def test_batch_total_is_checked_across_the_request(client, new_batch):
+    r = bulk(client, (new_batch, 2, 60), (new_batch, 4, 50))
+    assert r.status_code == 400
+    assert r.json()["detail"] == [f"Batch {new_batch}: placing 110 exceeds batch quantity 100"]
+
+
+def test_duplicate_pair_within_request(client, new_batch):
+    r = bulk(client, (new_batch, 4, 10), (new_batch, 4, 10))
+    assert r.status_code == 400
+    assert "already stored" in r.json()["detail"][0]
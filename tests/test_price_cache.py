@@ -0,0 +1,74 @@
+from datetime import datetime
+
+import pytest
+
+from app.core.config import settings
+from app.core.price_cache import price_cache
+from app.models.price import Price
+from app.routers.price_utils import current_prices
+from tests.conftest import sell
+
+
+def current(client, *product_ids):
+    r = client.get("/prices/current", params={"product_ids": ",".join(map(str, product_ids))})
+    assert r.status_code == 200, r.text
+    return {p["product_id"]: (p["mrp"], p["mwp"]) for p in r.json()["prices"]}
+
+
+@pytest.fixture
+def priced(client, stock):
+    r = client.post("/prices/", json={"product_id": 1, "mrp": 12.0, "mwp": 9.0})
+    assert r.status_code == 200, r.text
+    return r.json()["id"]
+
+
+def test_current_prices_are_cached(client, priced):
+    assert current(client, 1, 2) == {1: (12.0, 9.0)}
+    assert current(client, 1, 2) == {1: (12.0, 9.0)}
+    stats = client.get("/prices/cache/stats").json()
+    # Product 2 has no price; that is cached too
+    assert (stats["misses"], stats["hits"], stats["size"]) == (2, 2, 2)
+
+
+def test_create_and_update_invalidate(client, priced):
+    current(client, 1)
+
+    r = client.put(f"/prices/{priced}", json={"mrp": 15.0})
+    assert r.status_code == 200, r.text
+    assert current(client, 1) == {1: (15.0, 9.0)}
+
+    assert client.post("/prices/", json={"product_id": 1, "mrp": 20.0, "mwp": 10.0}).status_code == 200
+    assert current(client, 1) == {1: (20.0, 10.0)}
+
+
+def test_invalidated_on_commit_not_flush(client, priced, db):
+    cached = current_prices(db, [1])
+    db.rollback()
+
+    db.add(Price(product_id=1, mrp=30.0, mwp=20.0, effective_from=datetime(2000, 1, 1)))
+    db.flush()
+    # Flushed, not committed: a reader re-caching now would see the old price
+    assert price_cache.get_many([1]) == (cached, [])
+
+    db.rollback()
+    assert price_cache.get_many([1]) == (cached, [])
+
+    db.get(Price, priced).mwp = 8.0
+    db.commit()
+    assert price_cache.get_many([1]) == ({}, [1])
+
+
+def test_default_price_is_opt_in(client, priced, monkeypatch):
+    unpriced = [{"product_id": 1, "consumer_id": 1, "quantity_sold": 5}]
+
+    assert settings.SALES_DEFAULT_PRICE_FIELD is None
+    r = client.post("/sales/bulk", json={"sales": unpriced})
+    assert r.status_code == 200, r.text
+    assert [s["sale_price"] for s in r.json()] == [None]
+
+    monkeypatch.setattr(settings, "SALES_DEFAULT_PRICE_FIELD", "mwp")
+    r = client.post("/sales/bulk", json={"sales": unpriced})
+    assert [s["sale_price"] for s in r.json()] == [9.0]
+
+    # An explicit price always wins
+    assert [s["sale_price"] for s in sell(client, (1, 5)).json()] == [1.0]
@@ -0,0 +1,98 @@
+import io
+
+import pytest
+from PIL import Image
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.products import Product
+
+
+def png(color="red"):
+    buf = io.BytesIO()
+    Image.new("RGB", (600, 400), color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def upload(client, product_id, data, name="x.png"):
+    return client.post(f"/products/{product_id}/upload-image", files={"file": (name, data, "image/png")})
+
+
+def test_upload_and_conditional_fetch(client, stock):
+    assert upload(client, 1, png()).status_code == 200
+
+    r = client.get("/products/1/image")
+    assert r.status_code == 200
+    etag = r.headers["etag"]
+    assert client.get("/products/1/image", headers={"If-None-Match": etag}).status_code == 304
+
+    for size in settings.PRODUCT_THUMBNAIL_SIZES:
+        thumb = client.get(f"/products/1/image?size={size}")
+        assert thumb.status_code == 200
+        assert max(Image.open(io.BytesIO(thumb.content)).size) == min(size, 600)
+
+
+def test_replaced_image_is_served_with_a_new_etag(client, stock):
+    upload(client, 1, png("red"))
+    first = client.get("/products/1/image").headers["etag"]
+    upload(client, 1, png("blue"))
+    r = client.get("/products/1/image", headers={"If-None-Match": first})
+    assert r.status_code == 200 and r.headers["etag"] != first
+
+
+def test_changes_made_elsewhere_are_seen(client, stock, db):
+    # Another worker clears the image / deletes the product: no stale path here
+    upload(client, 1, png())
+    assert client.get("/products/1/image").status_code == 200
+
+    db.query(Product).filter(Product.id == 1).update({Product.image_path: None})
+    db.commit()
+    assert client.get("/products/1/image").status_code == 404
+
+
+def test_oversized_upload_is_rejected(client, stock, monkeypatch):
+    monkeypatch.setattr(settings, "PRODUCT_IMAGE_MAX_BYTES", 100)
+    assert upload(client, 1, png()).status_code == 413
+
+
+def test_non_image_upload_is_rejected_and_the_old_image_kept(client, stock):
+    upload(client, 1, png())
+    etag = client.get("/products/1/image").headers["etag"]
+
+    r = upload(client, 1, b"<?php echo 'not an image'; ?>")
+    assert r.status_code == 400
+    assert client.get("/products/1/image").headers["etag"] == etag
+    assert not [p for p in settings.UPLOAD_FOLDER.iterdir() if p.suffix == ".tmp"]
+
+
+def test_failed_thumbnails_drop_the_stale_ones(client, stock, monkeypatch):
+    upload(client, 1, png("red"))
+
+    def broken(self, *args, **kwargs):
+        raise OSError("encoder failed")
+
+    monkeypatch.setattr(Image.Image, "thumbnail", broken)
+    assert upload(client, 1, png("blue")).status_code == 200
+
+    # The red thumbnail is gone; ?size= serves the new original instead
+    thumb = Image.open(io.BytesIO(client.get(f"/products/1/image?size={settings.PRODUCT_THUMBNAIL_SIZES[0]}").content))
+    assert thumb.size == (600, 400)
+    assert thumb.getpixel((0, 0)) == (0, 0, 255)
+
+
+def test_old_image_is_kept_until_the_new_path_is_committed(client, stock, monkeypatch):
+    upload(client, 1, png(), name="x.png")
+    old = settings.UPLOAD_FOLDER / "product_1.png"
+    assert old.exists()
+
+    async def failing_commit(self):
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr(AsyncSession, "commit", failing_commit)
+    with pytest.raises(RuntimeError):
+        upload(client, 1, png(), name="x.jpg")
+    assert old.exists()
+
+    monkeypatch.undo()
+    assert upload(client, 1, png(), name="x.jpg").status_code == 200
+    assert not old.exists()
@@ -0,0 +1,119 @@
+import json
+
+import pytest
+
+from app.models.products import Product
+from app.routers import products_utils
+
+
+def product(i, **overrides):
+    return {"prod_id": f"I{i}", "name": f"imported {i}", "brand_id": 1, "category_id": 1,
+            "subcategory_id": 1, "sku": f"IS{i}", "upc": f"IU{i}", **overrides}
+
+
+def import_body(client, body, content_type="application/json"):
+    r = client.post("/products/import", content=body, headers={"Content-Type": content_type})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def chunked(data: bytes, size=7):
+    # Request body delivered in small pieces, splitting items and characters
+    def chunks():
+        for i in range(0, len(data), size):
+            yield data[i:i + size]
+    return chunks()
+
+
+def imported(db):
+    db.expire_all()
+    return sorted(p.prod_id for p in db.query(Product).filter(Product.prod_id.like("I%")))
+
+
+def test_json_array_partial_success_with_row_errors(client, stock, db):
+    rows = [
+        product(1),
+        product(2, brand_id=99),
+        product(3, sku="not a sku!"),
+        product(4, prod_id="P0"),           # exists already
+        product(5),
+        product(6, sku="IS5"),              # duplicate of row 5
+        product(7, name="été ☃"),
+    ]
+    result = import_body(client, chunked(json.dumps(rows, ensure_ascii=False).encode()))
+
+    assert (result["total"], result["inserted"], result["failed"]) == (7, 3, 4)
+    errors = {e["row"]: e["error"] for e in result["errors"]}
+    assert errors[2] == "Brand 99 does not exist"
+    assert errors[3].startswith("sku:")
+    assert errors[4] == "Product with same prod_id 'P0' exists"
+    assert errors[6] == "Duplicate sku 'IS5' earlier in this import"
+    assert imported(db) == ["I1", "I5", "I7"]
+
+
+def test_json_array_is_parsed_incrementally(client, stock, db, monkeypatch):
+    async def whole_body(self):
+        raise AssertionError("the import must not buffer the whole body")
+
+    monkeypatch.setattr("starlette.requests.Request.body", whole_body)
+    body = b'  [ ' + b' ,\n'.join(json.dumps(product(i)).encode() for i in range(1, 4)) + b' ]  '
+    result = import_body(client, chunked(body, size=3))
+    assert (result["total"], result["inserted"], result["failed"]) == (3, 3, 0)
+
+
+def test_malformed_json_array_keeps_the_rows_before_it(client, stock, db):
+    body = "[" + json.dumps(product(1)) + ', {"prod_id": oops}, ' + json.dumps(product(2)) + "]"
+    result = import_body(client, body.encode())
+    assert result["inserted"] == 1
+    assert result["errors"][0]["row"] == 2 and result["errors"][0]["error"].startswith("Invalid JSON")
+    assert imported(db) == ["I1"]
+
+
+def test_json_array_item_size_is_capped(client, stock, monkeypatch):
+    monkeypatch.setattr(products_utils, "IMPORT_MAX_ROW_BYTES", 50)
+    body = b'[{"prod_id": "' + b"x" * 200 + b'"'
+    result = import_body(client, chunked(body, size=10))
+    assert result["inserted"] == 0
+    assert result["errors"][0]["error"].startswith("Invalid JSON")
+
+
+@pytest.mark.parametrize("body", [b'{"prod_id": "I1"}', b"", b"nope"])
+def test_body_that_is_not_a_json_array_is_400(client, stock, body):
+    r = client.post("/products/import", content=body, headers={"Content-Type": "application/json"})
+    assert r.status_code == 400
+
+
+def test_ndjson_reports_bad_lines_per_row(client, stock, db):
+    lines = [
+        json.dumps(product(1)).encode(),
+        b"",
+        b"{not json",
+        json.dumps(product(2, name="café"), ensure_ascii=False).encode("latin-1"),
+        json.dumps(product(3)).encode(),
+        json.dumps(product(4, upc="IU1")).encode(),
+    ]
+    result = import_body(client, chunked(b"\r\n".join(lines)), "application/x-ndjson")
+
+    assert (result["total"], result["inserted"], result["failed"]) == (5, 2, 3)
+    errors = {e["row"]: e["error"] for e in result["errors"]}
+    assert errors[2].startswith("Invalid JSON")
+    assert errors[3] == "Invalid UTF-8"
+    assert errors[5] == "Duplicate upc 'IU1' earlier in this import"
+    assert imported(db) == ["I1", "I3"]
+
+
+def test_csv_import(client, stock, db):
+    body = (
+        "﻿prod_id,name,brand_id,category_id,subcategory_id,sku,upc\r\n"
+        "I1,one,1,1,1,IS1,\r\n"
+        "I2,two,1,1\r\n"
+    ).encode() + "I3,très,1,1,1,IS3,IU3\n".encode("latin-1") + b"I4,four,1,1,1,IS1,IU4\n"
+    result = import_body(client, body, "text/csv")
+
+    errors = {e["row"]: e["error"] for e in result["errors"]}
+    assert errors == {
+        2: "Column count does not match header",
+        3: "Invalid UTF-8",
+        4: "Duplicate sku 'IS1' earlier in this import",
+    }
+    assert imported(db) == ["I1"]
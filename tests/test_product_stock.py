@@ -0,0 +1,92 @@
+import pytest
+from sqlalchemy import update
+
+from app.models.batch import Batch
+from app.models.batch_pallet import BatchPallet
+from app.models.product_stock import ProductStock
+from app.models.products import Product
+from tests.conftest import sell
+
+
+def test_counter_follows_placements_and_sales(client, stock):
+    assert client.get("/sales/stock/total/1").json()["total_stock"] == 100
+    assert sell(client, (1, 40)).status_code == 200
+    assert client.get("/sales/stock/total/1").json()["total_stock"] == 60
+
+
+def test_reconcile_repairs_drift(client, stock, db):
+    db.execute(update(ProductStock).where(ProductStock.product_id == 1).values(quantity=7))
+    db.commit()
+
+    r = client.post("/sales/stock/reconcile")
+    assert r.status_code == 200
+    body = r.json()
+    assert body["repaired"] is True
+    assert body["drift"] == [{"product_id": 1, "expected": 100, "stored": 7}]
+    assert client.get("/sales/stock/total/1").json()["total_stock"] == 100
+
+
+def test_reconcile_is_admin_only(client, stock, as_user):
+    as_user()
+    assert client.post("/sales/stock/reconcile").status_code == 403
+
+
+def per_product_details(db, product_id):
+    """Stock details the way the per-product route built them before one joined query."""
+    product = db.get(Product, product_id)
+    batches = db.query(Batch).filter(Batch.product_id == product_id).order_by(Batch.id).all()
+    placements = db.query(BatchPallet).filter(BatchPallet.batch_id.in_([b.id for b in batches])).order_by(BatchPallet.id).all()
+    detailed = []
+    for batch in batches:
+        pallets = [
+            {"pallet_id": bp.pallet_id, "quantity_left": bp.quantity_left, "stored_on": bp.stored_on.isoformat()}
+            for bp in placements if bp.batch_id == batch.id
+        ]
+        detailed.append({"batch_id": batch.id, "batch_no": batch.batch_no,
+                         "batch_total": sum(p["quantity_left"] for p in pallets), "pallets": pallets})
+    return {"product_id": product_id, "product_name": product.name,
+            "total_stock": sum(bp.quantity_left for bp in placements), "batches": detailed}
+
+
+@pytest.fixture
+def unplaced_batch(client, stock):
+    # Product 3 gets a batch that is not on any pallet
+    r = client.post("/batches/", json=[{"batch_no": "B4", "product_id": 3, "quantity": 5,
+                                        "expiry_date": "2031-01-01", "sku": "S2"}])
+    assert r.status_code == 200, r.text
+
+
+def test_stock_details_keep_the_per_product_shape(client, stock, db, unplaced_batch):
+    sell(client, (1, 35))
+    for product_id in (1, 2, 3):
+        r = client.get(f"/sales/stock/details/{product_id}")
+        assert r.status_code == 200
+        assert r.json() == per_product_details(db, product_id)
+
+    product_1 = client.get("/sales/stock/details/1").json()
+    # Batches and their pallet lines in FIFO (insertion) order
+    assert [(b["batch_no"], [p["pallet_id"] for p in b["pallets"]], b["batch_total"]) for b in product_1["batches"]] == [
+        ("B1", [2], 15), ("B2", [3], 50)
+    ]
+    assert product_1["total_stock"] == 65
+    assert client.get("/sales/stock/details/3").json()["batches"] == [
+        {"batch_id": 4, "batch_no": "B4", "batch_total": 0, "pallets": []}
+    ]
+    assert client.get("/sales/stock/details/99").status_code == 404
+
+
+def test_stock_details_for_many_products(client, stock, db, unplaced_batch):
+    r = client.get("/sales/stock/details", params={"product_ids": "3,99,1,3,2"})
+    assert r.status_code == 200
+    body = r.json()
+    # Request order, duplicates dropped, each entry as the single-product route
+    assert [p["product_id"] for p in body["products"]] == [3, 1, 2]
+    assert body["products"] == [per_product_details(db, pid) for pid in (3, 1, 2)]
+    assert body["not_found"] == [99]
+
+    assert client.get("/sales/stock/details", params={"product_ids": "77"}).json() == {"products": [], "not_found": [77]}
+
+
+@pytest.mark.parametrize("product_ids", ["1,x", ",", ",".join(str(i) for i in range(1, 502))])
+def test_stock_details_rejects_bad_id_lists(client, stock, product_ids):
+    assert client.get("/sales/stock/details", params={"product_ids": product_ids}).status_code == 400
@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.core.profiler import PROFILE_HEADER, PROFILE_ID_HEADER, StackSampler, profile_store
+from app.core.security import create_access_token
+from app.models.user import User
+from app.routers.export_utils import Export
+
+
+@pytest.fixture
+def tokens(db):
+    """Bearer headers for a real admin and a real non-admin user."""
+    db.add_all([
+        User(username="root", email="root@x", password="x", role="admin"),
+        User(username="clerk", email="clerk@x", password="x", role="user"),
+    ])
+    db.commit()
+    profile_store.clear()
+    yield {name: {"Authorization": f"Bearer {create_access_token({'sub': name})}"} for name in ("root", "clerk")}
+    profile_store.clear()
+
+
+def test_admin_header_profiles_the_request(client, stock, tokens):
+    r = client.get("/sales/stock/total/1", headers={**tokens["root"], PROFILE_HEADER: "1"})
+    assert r.status_code == 200
+    profile_id = int(r.headers[PROFILE_ID_HEADER])
+
+    profile = client.get(f"/monitoring/profiles/{profile_id}").json()
+    assert profile["trigger"] == "header"
+    assert profile["route"] == "/sales/stock/total/{product_id}"
+    assert profile["path"] == "/sales/stock/total/1"
+    assert profile["statements"] == len(profile["queries"]) >= 1
+    assert any("product_stock" in q["sql"] for q in profile["queries"])
+    assert profile["sample_interval_ms"] == settings.PROFILE_SAMPLE_INTERVAL_MS
+
+    # Summaries leave the SQL and stacks out
+    [summary] = client.get("/monitoring/profiles").json()["profiles"]
+    assert summary["id"] == profile_id and "queries" not in summary
+
+
+@pytest.mark.parametrize("who", ["clerk", None])
+def test_header_ignored_for_non_admins(client, stock, tokens, who):
+    headers = {PROFILE_HEADER: "1", **(tokens[who] if who else {})}
+    r = client.get("/sales/stock/total/1", headers=headers)
+    assert r.status_code == 200
+    assert PROFILE_ID_HEADER not in r.headers
+    assert profile_store.list() == []
+
+
+def test_slow_requests_are_kept(client, stock, tokens, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_SLOW_REQUEST_SECONDS", 60)
+    client.get("/sales/stock/total/1")
+    assert profile_store.list() == []
+
+    # Slowness is only known once the body is out, so no X-Profile-Id here
+    monkeypatch.setattr(settings, "PROFILE_SLOW_REQUEST_SECONDS", 0)
+    r = client.get("/sales/stock/total/1")
+    assert PROFILE_ID_HEADER not in r.headers
+    [summary] = profile_store.list()
+    profile = profile_store.get(summary["id"])
+    assert profile["trigger"] == "slow"
+    # PROFILE_SAMPLE_RATE is 0: SQL only, no stack sampler
+    assert profile["queries"] and profile["samples"] == 0 and profile["stacks"] == []
+
+
+def test_streamed_body_is_profiled(client, stock, tokens):
+    # The NDJSON stream runs its query after the handler has returned
+    r = client.get("/batch-pallet/", params={"stream": True}, headers={**tokens["root"], PROFILE_HEADER: "1"})
+    assert len(r.text.splitlines()) == 4
+
+    profile = profile_store.get(int(r.headers[PROFILE_ID_HEADER]))
+    assert profile["route"] == "/batch-pallet/"
+    assert any("FROM batch_pallet" in q["sql"] for q in profile["queries"])
+
+
+def test_slow_stream_is_kept(client, stock, tokens, monkeypatch):
+    async def slow_stream(self, db):
+        await asyncio.sleep(0.2)
+        yield b"id\n"
+
+    monkeypatch.setattr(Export, "stream", slow_stream)
+    monkeypatch.setattr(settings, "PROFILE_SLOW_REQUEST_SECONDS", 0.1)
+
+    assert client.get("/exports/products").text == "id\n"
+    [summary] = profile_store.list()
+    assert summary["route"] == "/exports/{table}" and summary["duration_ms"] >= 200
+
+
+def test_sampler_is_stopped_off_the_event_loop(client, stock, tokens, monkeypatch):
+    stopped_on = []
+    original = StackSampler.stop
+
+    def stop(self):
+        try:
+            asyncio.get_running_loop()
+            stopped_on.append("event loop")
+        except RuntimeError:
+            stopped_on.append("thread")
+        original(self)
+
+    monkeypatch.setattr(StackSampler, "stop", stop)
+    client.get("/sales/stock/total/1", headers={**tokens["root"], PROFILE_HEADER: "1"})
+    assert stopped_on == ["thread"]
+
+
+def test_profiles_are_admin_only(client, tokens, as_user):
+    assert client.delete("/monitoring/profiles").status_code == 204
+    as_user()
+    assert client.get("/monitoring/profiles").status_code == 403
+    assert client.get("/monitoring/profiles/1").status_code == 403
+    assert client.delete("/monitoring/profiles").status_code == 403
+
+
+def test_stack_sampler_sees_busy_threads():
+    stop = threading.Event()
+
+    def busy_loop():
+        while not stop.is_set():
+            sum(range(1000))
+
+    worker = threading.Thread(target=busy_loop)
+    worker.start()
+    sampler = StackSampler(0.001)
+    sampler.start()
+    time.sleep(0.1)
+    sampler.stop()
+    stop.set()
+    worker.join()
+
+    assert sampler.samples > 0
+    assert any("busy_loop" in stack for stack in sampler.stacks)
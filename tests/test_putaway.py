@@ -0,0 +1,58 @@
+import pytest
+
+from app.routers.placement_utils import _fill
+
+FREE = [(1, 40), (2, 80), (3, 50), (4, 100)]
+
+
+@pytest.mark.parametrize("strategy, quantity, plan, unplaced", [
+    ("best_fit", 45, [(3, 45, 50)], 0),
+    ("best_fit", 150, [(4, 100, 100), (3, 50, 50)], 0),
+    ("best_fit", 300, [(4, 100, 100), (2, 80, 80), (3, 50, 50), (1, 40, 40)], 30),
+    ("first_fit", 45, [(1, 40, 40), (2, 5, 80)], 0),
+])
+def test_fill(strategy, quantity, plan, unplaced):
+    assert _fill(FREE, quantity, strategy) == (plan, unplaced)
+
+
+def new_batch(client, product_id, quantity):
+    r = client.post("/batches/", json=[{"batch_no": f"N{product_id}-{quantity}", "product_id": product_id,
+                                        "quantity": quantity, "expiry_date": "2031-01-01", "sku": "S"}])
+    assert r.status_code == 200, r.text
+    return r.json()[0]["id"]
+
+
+def putaway(client, batch_id, **kwargs):
+    return client.post("/batch-pallet/putaway", json={"batch_id": batch_id, "warehouse_id": 1, **kwargs})
+
+
+def test_pallets_with_the_product_are_filled_first(client, stock):
+    # Free room: pallet 1 = 40, 2 = 80, 3 = 50, 4 = 100; product 2 only sits on pallet 1
+    batch_id = new_batch(client, 2, 60)
+    r = putaway(client, batch_id)
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert [(p["pallet_id"], p["quantity"]) for p in body["placements"]] == [(1, 40), (3, 20)]
+    assert body["unplaced"] == 0 and body["committed"] is False
+    # Proposal only
+    assert client.get("/sales/stock/total/2").json()["total_stock"] == 30
+
+
+def test_commit_places_the_plan(client, stock):
+    batch_id = new_batch(client, 3, 120)
+    r = putaway(client, batch_id, commit=True, strategy="first_fit")
+    assert r.status_code == 200, r.text
+    assert [(p["pallet_id"], p["quantity"]) for p in r.json()["placements"]] == [(1, 40), (2, 80)]
+    assert client.get("/sales/stock/total/3").json()["total_stock"] == 120
+
+    # Everything is placed now
+    assert putaway(client, batch_id).status_code == 400
+
+
+def test_commit_refuses_a_partial_plan(client, stock):
+    batch_id = new_batch(client, 3, 300)
+    r = putaway(client, batch_id)
+    assert r.json()["unplaced"] == 30
+    r = putaway(client, batch_id, commit=True)
+    assert r.status_code == 400
+    assert client.get("/sales/stock/total/3").json()["total_stock"] == 0
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core import database
+from app.core.database import READ_YOUR_WRITES_COOKIE, READ_YOUR_WRITES_HEADER, AsyncSessionLocal, async_engine
+from app.core.replica import ReplicaHealth
+
+
+class ReplicaSessions:
+    """Stands in for the replica session factory; the test database plays the replica."""
+
+    def __init__(self):
+        self.opened = 0
+
+    def __call__(self):
+        self.opened += 1
+        return AsyncSessionLocal()
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    sessions = ReplicaSessions()
+    health = ReplicaHealth(async_engine, max_lag=5, check_interval=60)
+    monkeypatch.setattr(database, "ReadAsyncSessionLocal", sessions)
+    monkeypatch.setattr(database, "replica_health", health)
+    return sessions, health
+
+
+def test_reports_read_from_the_replica(client, stock, replica):
+    sessions, health = replica
+    assert client.get("/sales/stock/details/1").status_code == 200
+    assert client.get("/sales/").status_code == 200
+    assert sessions.opened == 2
+    assert health.status() == {"healthy": True, "lag_seconds": 0, "max_lag_seconds": 5}
+
+    # Writes and other routes stay on the primary
+    assert client.get("/products/").status_code == 200
+    assert sessions.opened == 2
+
+
+@pytest.mark.parametrize("pin", [
+    {"headers": {READ_YOUR_WRITES_HEADER: "1"}},
+    {"cookies": {READ_YOUR_WRITES_COOKIE: "1"}},
+])
+def test_read_your_writes_pins_the_primary(client, stock, replica, pin):
+    sessions, _ = replica
+    client.cookies.update(pin.get("cookies", {}))
+    assert client.get("/sales/stock/details/1", headers=pin.get("headers")).status_code == 200
+    assert sessions.opened == 0
+
+
+def test_lagging_replica_falls_back_to_the_primary(client, stock, replica):
+    sessions, health = replica
+    health.max_lag = -1
+    assert client.get("/sales/stock/details/1").status_code == 200
+    assert sessions.opened == 0
+    assert health.status()["healthy"] is False
+
+
+def test_replica_health_is_cached_between_checks(monkeypatch):
+    health = ReplicaHealth(async_engine, max_lag=5, check_interval=60)
+    probes = []
+    original = ReplicaHealth._probe
+
+    async def counting_probe(self):
+        probes.append(1)
+        await original(self)
+
+    monkeypatch.setattr(ReplicaHealth, "_probe", counting_probe)
+
+    async def check_many():
+        return await asyncio.gather(*(health.is_usable() for _ in range(5)))
+
+    assert asyncio.run(check_many()) == [True] * 5
+    assert len(probes) == 1
+
+    health.checked_at = 0
+    assert asyncio.run(health.is_usable()) is True
+    assert len(probes) == 2
+
+
+def test_unreachable_replica_is_unusable(tmp_path):
+    # A directory cannot be opened as a database
+    broken = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}")
+    health = ReplicaHealth(broken, max_lag=5, check_interval=60)
+    assert asyncio.run(health.is_usable()) is False
+    assert health.status()["lag_seconds"] is None
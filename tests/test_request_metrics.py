@@ -0,0 +1,64 @@
+import asyncio
+import logging
+import re
+
+from app.core.config import settings
+from app.routers.export_utils import Export
+
+STREAM_DELAY = 0.2
+
+
+def metric(client, name, route, method="GET", status=200):
+    """Value of one sample in /metrics, 0 when the series does not exist yet."""
+    labels = f'{{method="{method}",route="{route}",status="{status}"}}'
+    text = client.get("/metrics").text
+    match = re.search(rf"^{re.escape(name + labels)} (\S+)$", text, re.M)
+    return float(match.group(1)) if match else 0
+
+
+def test_routes_are_labelled_by_template(client, stock):
+    route = "/sales/stock/total/{product_id}"
+    requests = metric(client, "np_http_request_duration_seconds_count", route)
+    statements = metric(client, "np_http_request_db_statements_sum", route)
+    for product_id in (1, 2, 3):
+        assert client.get(f"/sales/stock/total/{product_id}").status_code == 200
+
+    assert metric(client, "np_http_request_duration_seconds_count", route) == requests + 3
+    assert metric(client, "np_http_request_db_statements_sum", route) >= statements + 3
+
+    client.get("/no/such/path")
+    assert metric(client, "np_http_request_duration_seconds_count", "unmatched", status=404) >= 1
+
+
+def test_streamed_body_is_measured(client, stock):
+    # The NDJSON stream runs its query while the body is sent
+    route = "/batch-pallet/"
+    statements = metric(client, "np_http_request_db_statements_sum", route)
+    r = client.get(route, params={"stream": True})
+    assert len(r.text.splitlines()) == 4
+    assert metric(client, "np_http_request_db_statements_sum", route) >= statements + 1
+
+
+def test_stream_latency_includes_the_body(client, stock, monkeypatch):
+    async def slow_stream(self, db):
+        await asyncio.sleep(STREAM_DELAY)
+        yield b"id\n"
+
+    monkeypatch.setattr(Export, "stream", slow_stream)
+
+    route = "/exports/{table}"
+    total = metric(client, "np_http_request_duration_seconds_sum", route)
+    assert client.get("/exports/products").text == "id\n"
+    assert metric(client, "np_http_request_duration_seconds_sum", route) >= total + STREAM_DELAY
+
+
+def test_statement_heavy_requests_are_flagged(client, stock, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "REQUEST_QUERY_COUNT_WARN", 0)
+    route = "/sales/stock/details/{product_id}"
+    flagged = metric(client, "np_http_requests_over_query_threshold_total", route)
+
+    with caplog.at_level(logging.WARNING, logger="app.requests"):
+        assert client.get("/sales/stock/details/1").status_code == 200
+
+    assert metric(client, "np_http_requests_over_query_threshold_total", route) == flagged + 1
+    assert any("possible N+1" in r.getMessage() for r in caplog.records)
@@ -0,0 +1,149 @@
+from sqlalchemy import delete, func, update
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.batch import Batch
+from app.models.batch_pallet import BatchPallet
+from app.routers import sales_utils
+from tests.conftest import sell
+
+
+def product_stock(db, product_id):
+    return (
+        db.query(func.coalesce(func.sum(BatchPallet.quantity_left), 0))
+        .join(Batch, Batch.id == BatchPallet.batch_id)
+        .filter(Batch.product_id == product_id)
+        .scalar()
+    )
+
+
+def wrap_candidates(monkeypatch, after_read):
+    """Run after_read(attempt, rows) after every candidate query; returns the call log."""
+    original = sales_utils.get_batch_pallets_for_products
+    calls = []
+
+    def wrapped(db, product_ids, fifo, lock_mode="optimistic"):
+        rows = original(db, product_ids, fifo=fifo, lock_mode=lock_mode)
+        calls.append(lock_mode)
+        return after_read(len(calls), rows)
+
+    monkeypatch.setattr(sales_utils, "get_batch_pallets_for_products", wrapped)
+    return calls
+
+
+def test_fifo_allocation_across_pallets(client, stock, db):
+    r = sell(client, (1, 40))
+    assert r.status_code == 200, r.text
+    assert [(s["pallet_id"], s["quantity_sold"]) for s in r.json()] == [(1, 30), (2, 10)]
+    assert product_stock(db, 1) == 60
+
+
+def test_real_shortage_is_400(client, stock, db):
+    r = sell(client, (1, 101))
+    assert r.status_code == 400
+    assert product_stock(db, 1) == 100
+
+
+def test_skip_locked_rows_are_contention_not_shortage(client, stock, db, monkeypatch):
+    monkeypatch.setattr(settings, "SALES_LOCK_MODE", "skip_locked")
+    monkeypatch.setattr(settings, "SALES_LOCK_RETRIES", 2)
+
+    # First attempt: pallet row 3 is held by another order and skipped
+    calls = wrap_candidates(monkeypatch, lambda attempt, rows: [r for r in rows if attempt > 1 or r.id != 3])
+
+    r = sell(client, (1, 60))
+    assert r.status_code == 200, r.text
+    assert calls == ["skip_locked", "skip_locked"]
+    assert product_stock(db, 1) == 40
+
+
+def test_skip_locked_contention_exhausts_retries_with_409(client, stock, monkeypatch):
+    monkeypatch.setattr(settings, "SALES_LOCK_MODE", "skip_locked")
+    monkeypatch.setattr(settings, "SALES_LOCK_RETRIES", 1)
+    calls = wrap_candidates(monkeypatch, lambda attempt, rows: [])
+
+    r = sell(client, (1, 10))
+    assert r.status_code == 409
+    assert len(calls) == 2
+
+
+def test_skip_locked_real_shortage_is_still_400(client, stock, monkeypatch):
+    monkeypatch.setattr(settings, "SALES_LOCK_MODE", "skip_locked")
+    calls = wrap_candidates(monkeypatch, lambda attempt, rows: rows)
+
+    r = sell(client, (1, 101))
+    assert r.status_code == 400
+    assert len(calls) == 1
+
+
+def concurrent_drain(pallet_row_id, qty):
+    # Another order, committed on its own connection
+    with SessionLocal() as other:
+        other.execute(
+            update(BatchPallet)
+            .where(BatchPallet.id == pallet_row_id)
+            .values(quantity_left=BatchPallet.quantity_left - qty)
+        )
+        other.commit()
+
+
+def concurrent_empty(pallet_row_id):
+    # Another order sold the whole pallet line and removed the empty row
+    with SessionLocal() as other:
+        other.execute(delete(BatchPallet).where(BatchPallet.id == pallet_row_id))
+        other.commit()
+
+
+def test_optimistic_conflict_on_a_deleted_row(client, stock, db, monkeypatch):
+    monkeypatch.setattr(settings, "SALES_LOCK_MODE", "optimistic")
+    monkeypatch.setattr(settings, "SALES_LOCK_RETRIES", 0)
+    wrap_candidates(monkeypatch, lambda attempt, rows: concurrent_empty(1) or rows)
+    batch_quantity = db.get(Batch, 1).quantity
+
+    r = sell(client, (1, 40))
+    assert r.status_code == 409
+    db.expire_all()
+    assert db.get(Batch, 1).quantity == batch_quantity
+    assert client.get("/sales/stock/total/1").json()["total_stock"] == 100
+
+
+def test_optimistic_retry_after_a_deleted_row(client, stock, db, monkeypatch):
+    monkeypatch.setattr(settings, "SALES_LOCK_MODE", "optimistic")
+    monkeypatch.setattr(settings, "SALES_LOCK_RETRIES", 1)
+    wrap_candidates(monkeypatch, lambda attempt, rows: (attempt == 1 and concurrent_empty(1)) or rows)
+
+    r = sell(client, (1, 40))
+    assert r.status_code == 200, r.text
+    assert [(s["pallet_id"], s["quantity_sold"]) for s in r.json()] == [(2, 20), (3, 20)]
+    assert product_stock(db, 1) == 30
+
+
+def test_optimistic_conflict_retries_against_fresh_stock(client, stock, db, monkeypatch):
+    monkeypatch.setattr(settings, "SALES_LOCK_MODE", "optimistic")
+    monkeypatch.setattr(settings, "SALES_LOCK_RETRIES", 2)
+
+    def drain_once(attempt, rows):
+        if attempt == 1:
+            concurrent_drain(1, 30)
+        return rows
+
+    calls = wrap_candidates(monkeypatch, drain_once)
+
+    # Attempt 1 takes pallet row 1 that was emptied meanwhile -> conflict
+    r = sell(client, (1, 60))
+    assert r.status_code == 200, r.text
+    assert len(calls) == 2
+    assert [(s["pallet_id"], s["quantity_sold"]) for s in r.json()] == [(2, 20), (3, 40)]
+    assert product_stock(db, 1) == 10
+    assert db.query(BatchPallet).filter(BatchPallet.quantity_left < 0).count() == 0
+
+
+def test_optimistic_conflict_without_retries_is_409(client, stock, db, monkeypatch):
+    monkeypatch.setattr(settings, "SALES_LOCK_MODE", "optimistic")
+    monkeypatch.setattr(settings, "SALES_LOCK_RETRIES", 0)
+    wrap_candidates(monkeypatch, lambda attempt, rows: concurrent_drain(1, 30) or rows)
+
+    r = sell(client, (1, 60))
+    assert r.status_code == 409
+    # The losing order was rolled back; only the concurrent drain remains
+    assert product_stock(db, 1) == 70
@@ -0,0 +1,66 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.models.sales_rollup import SalesDailyWarehouse
+from app.routers import analytics_utils
+from tests.conftest import sell
+
+
+def analytics(client, path, **params):
+    today = date.today()
+    params = {"start_date": today - timedelta(days=1), "end_date": today + timedelta(days=1), **params}
+    r = client.get(f"/sales/analytics/{path}", params=params)
+    assert r.status_code == 200, r.text
+    return r.json()["rows"]
+
+
+@pytest.fixture
+def shards(monkeypatch):
+    """Hand out shards 0, 1, 2, ... to successive rollup writes."""
+    picked = iter(range(1000))
+    monkeypatch.setattr(settings, "SALES_ROLLUP_SHARDS", 4)
+    monkeypatch.setattr(analytics_utils, "_shard", lambda: next(picked) % settings.SALES_ROLLUP_SHARDS)
+
+
+def test_sales_are_rolled_up(client, stock, shards):
+    assert sell(client, (1, 40), (2, 10)).status_code == 200
+    assert sell(client, (1, 5)).status_code == 200
+
+    assert analytics(client, "summary") == [{"units": 55, "revenue": 55.0, "lines": 4}]
+    assert analytics(client, "summary", group_by="product") == [
+        {"product": 1, "units": 45, "revenue": 45.0, "lines": 3},
+        {"product": 2, "units": 10, "revenue": 10.0, "lines": 1},
+    ]
+    assert [(r["product_id"], r["units"]) for r in analytics(client, "top-products", by="units")] == [(1, 45), (2, 10)]
+
+
+def test_warehouse_rollup_sums_shards(client, stock, shards, db):
+    for qty in (10, 20, 30):
+        assert sell(client, (1, qty)).status_code == 200
+
+    # One row per sale transaction, not one hot row per day and warehouse
+    assert sorted(s for (s,) in db.query(SalesDailyWarehouse.shard)) == [0, 1, 2]
+    # The last sale takes the rest of pallet 2 and 10 from pallet 3: two lines
+    assert analytics(client, "warehouses") == [{"warehouse_id": 1, "units": 60, "revenue": 60.0, "lines": 4}]
+
+    rows = analytics(client, "warehouses", by_day=True)
+    assert len(rows) == 1 and rows[0]["units"] == 60
+
+
+def test_shards_wrap_onto_existing_rows(client, stock, shards, db):
+    for _ in range(6):
+        assert sell(client, (2, 5)).status_code == 200
+
+    assert db.query(SalesDailyWarehouse).count() == 4
+    assert analytics(client, "warehouses", warehouse_id=1)[0]["units"] == 30
+
+
+def test_price_edit_moves_revenue(client, stock, shards):
+    sale = sell(client, (2, 10)).json()[0]
+    r = client.put(f"/sales/{sale['id']}", json={"product_id": 2, "consumer_id": 1, "quantity_sold": 10, "sale_price": 3.0})
+    assert r.status_code == 200, r.text
+
+    assert analytics(client, "summary") == [{"units": 10, "revenue": 30.0, "lines": 1}]
+    assert analytics(client, "warehouses") == [{"warehouse_id": 1, "units": 10, "revenue": 30.0, "lines": 1}]
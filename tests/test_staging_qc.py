@@ -0,0 +1,102 @@
+import pytest
+
+from app.models.batch import Batch
+from app.models.batch_pallet import BatchPallet
+from app.models.staging import Staging
+
+
+@pytest.fixture
+def receipt(client, stock):
+    """Invoice INV1: 40 and 60 units of product 3 on hold in warehouse 1."""
+    ids = []
+    for qty in (40, 60):
+        r = client.post("/staging/", json={"product_id": 3, "warehouse_id": 1, "invoice_no": "INV1",
+                                           "received_on": "2026-01-10", "total_quantity": qty})
+        assert r.status_code == 201, r.text
+        ids.append(r.json()["id"])
+    return ids
+
+
+def qc(client, **body):
+    return client.post("/staging/qc/bulk", json=body)
+
+
+def test_invoice_approved_and_put_away(client, receipt, db):
+    r = qc(client, invoice_no="INV1", qc_status="APPROVED", create_batches=True, putaway=True)
+    assert r.status_code == 200, r.text
+    assert [(s["id"], s["qc_status"], s["approved_quantity"]) for s in r.json()] == [
+        (receipt[0], "APPROVED", 40), (receipt[1], "APPROVED", 60)
+    ]
+
+    batches = db.query(Batch).filter(Batch.batch_no.like("INV1-%")).order_by(Batch.id).all()
+    assert [(b.batch_no, b.quantity, b.sku) for b in batches] == [
+        (f"INV1-{receipt[0]}", 40, "S2"), (f"INV1-{receipt[1]}", 60, "S2")
+    ]
+    assert client.get("/sales/stock/total/3").json()["total_stock"] == 100
+
+
+def test_items_with_explicit_pallets(client, receipt, db):
+    r = qc(client, create_batches=True, items=[
+        {"staging_id": receipt[0], "qc_status": "APPROVED", "approved_quantity": 35, "rejected_quantity": 5,
+         "batch_no": "LOT-A", "pallet_id": 4},
+        {"staging_id": receipt[1], "qc_status": "REJECTED", "approved_quantity": 0, "rejected_quantity": 60},
+    ])
+    assert r.status_code == 200, r.text
+
+    batch = db.query(Batch).filter_by(batch_no="LOT-A").one()
+    assert batch.quantity == 35
+    assert [(bp.pallet_id, bp.quantity_left) for bp in db.query(BatchPallet).filter_by(batch_id=batch.id)] == [(4, 35)]
+    assert db.query(Batch).count() == 4
+
+
+def test_errors_collected_and_nothing_written(client, receipt, db):
+    # A receipt whose product was removed
+    db.query(Staging).filter_by(id=receipt[1]).update({"product_id": None})
+    db.commit()
+
+    r = qc(client, create_batches=True, items=[
+        {"staging_id": receipt[0], "qc_status": "APPROVED", "approved_quantity": 30, "rejected_quantity": 20},
+        {"staging_id": receipt[1], "qc_status": "APPROVED", "approved_quantity": 60, "rejected_quantity": 0},
+        {"staging_id": 999, "qc_status": "APPROVED", "approved_quantity": 1, "rejected_quantity": 0},
+    ])
+    assert r.status_code == 400
+    errors = r.json()["detail"]
+    assert any(f"Staging {receipt[0]}" in e and "exceeds total quantity" in e for e in errors)
+    assert any(f"Staging {receipt[1]}" in e and "not found" in e for e in errors)
+    assert any("Staging 999: not found" in e for e in errors)
+
+    db.expire_all()
+    assert {s.qc_status.name for s in db.query(Staging)} == {"HOLD"}
+    assert db.query(Batch).count() == 3
+
+
+def test_missing_product_is_a_row_error(client, receipt, db):
+    db.query(Staging).filter_by(id=receipt[0]).update({"product_id": None})
+    db.commit()
+
+    r = qc(client, invoice_no="INV1", qc_status="APPROVED", create_batches=True)
+    assert r.status_code == 400
+    assert r.json()["detail"] == [f"Staging {receipt[0]}: product None not found, batch not created"]
+    assert db.query(Batch).count() == 3
+
+
+def test_batches_created_once_per_receipt(client, receipt):
+    assert qc(client, invoice_no="INV1", qc_status="APPROVED", create_batches=True).status_code == 200
+    r = qc(client, invoice_no="INV1", qc_status="APPROVED", create_batches=True)
+    assert r.status_code == 400
+    assert all("already QC'd" in e for e in r.json()["detail"])
+
+
+def test_putaway_without_room_rolls_back(client, receipt, db):
+    # 270 free units in the warehouse
+    client.put(f"/staging/{receipt[1]}", json={"product_id": 3, "warehouse_id": 1, "invoice_no": "INV1",
+                                               "received_on": "2026-01-10", "total_quantity": 400,
+                                               "qc_done_on": "2026-01-10T00:00:00"})
+    r = qc(client, invoice_no="INV1", qc_status="APPROVED", create_batches=True, putaway=True)
+    assert r.status_code == 400
+    assert "no room" in r.json()["detail"]
+    assert db.query(Batch).count() == 3
+
+
+def test_putaway_requires_create_batches(client, receipt):
+    assert qc(client, invoice_no="INV1", qc_status="APPROVED", putaway=True).status_code == 400
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.user_cache import user_cache
+from app.models.user import User
+
+
+@pytest.fixture
+def api():
+    """Client that authenticates for real (no get_current_user override)."""
+    app.dependency_overrides.clear()
+    return TestClient(app)
+
+
+def login(api, username, role="user", db=None):
+    assert api.post("/auth/register", json={"username": username, "email": f"{username}@x", "password": "pw"}).status_code == 200
+    if role != "user":
+        db.query(User).filter(User.username == username).update({User.role: role})
+        db.commit()
+    token = api.post("/auth/login", data={"username": username, "password": "pw"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_invalidation_waits_for_commit(db):
+    db.add(User(username="ann", email="ann@x", password="x", role="admin"))
+    db.commit()
+    user = db.query(User).filter(User.username == "ann").one()
+    stale = User(id=user.id, username="ann", email="ann@x", role="admin", is_active=True)
+
+    user.is_active = False
+    db.flush()
+    # A concurrent request re-caches the old row between flush and commit
+    user_cache.put(stale)
+    db.commit()
+
+    assert user_cache.get("ann") is None
+
+
+def test_rolled_back_change_keeps_cache(db):
+    db.add(User(username="bob", email="bob@x", password="x"))
+    db.commit()
+    user = db.query(User).filter(User.username == "bob").one()
+    user_cache.put(user)
+
+    user.role = "admin"
+    db.flush()
+    db.rollback()
+
+    assert user_cache.get("bob").role == "user"
+
+
+def test_deactivated_user_is_rejected_on_next_request(api, db):
+    headers = login(api, "carl")
+    assert api.get("/batches/", headers=headers).status_code == 200
+    assert user_cache.get("carl") is not None
+
+    db.query(User).filter(User.username == "carl").one().is_active = False
+    db.commit()
+
+    assert api.get("/batches/", headers=headers).status_code == 401
+
+
+def test_blocking_backend_is_read_off_the_event_loop(monkeypatch):
+    threads = []
+
+    class SlowBackend:
+        blocking = True
+
+        def get(self, key):
+            threads.append(threading.current_thread())
+            return None
+
+    monkeypatch.setattr(user_cache, "backend", SlowBackend())
+
+    async def lookup():
+        await user_cache.aget("dave")
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(lookup())
+    assert threads and threads[0] is not loop_thread
+
+
+def test_cache_stats_are_admin_only(api, db):
+    assert api.get("/auth/cache/stats", headers=login(api, "erin")).status_code == 403
+    assert api.get("/auth/cache/stats", headers=login(api, "fay", role="admin", db=db)).status_code == 200